@@ -0,0 +1,184 @@
+"""
+Interface assíncrona para o armazenamento de conversas.
+
+Este módulo expõe as operações de ConversationStore como corrotinas. O acesso a
+disco e a serialização JSON rodam em um pool de threads limitado, de modo que
+uma leitura ou escrita lenta não bloqueia o event loop nem as demais requisições.
+"""
+
+import asyncio
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.conversation_store import ConversationStore, Conversation, ConversationSummary, Message
+
+
+class AsyncConversationStore:
+    """Versão assíncrona de ConversationStore, executada em um pool de threads limitado."""
+
+    _executor = None
+
+    @staticmethod
+    def _get_executor() -> ThreadPoolExecutor:
+        """
+        Obtém (e cria na primeira chamada) o pool de threads do armazenamento.
+
+        Returns:
+            ThreadPoolExecutor com o número de threads definido em "conversation_store_workers"
+        """
+        if AsyncConversationStore._executor is None:
+            max_workers = ConfigManager.get_config("nova", "conversation_store_workers")
+            AsyncConversationStore._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="conversation_store"
+            )
+        return AsyncConversationStore._executor
+
+    @staticmethod
+    async def _run(func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            AsyncConversationStore._get_executor(),
+            functools.partial(func, *args, **kwargs)
+        )
+
+    @staticmethod
+    async def create_conversation(name: str = "") -> str:
+        """
+        Cria uma nova conversa e retorna seu ID.
+
+        Args:
+            name (str, opcional): Nome personalizado para a conversa
+
+        Returns:
+            str: ID da conversa criada
+        """
+        return await AsyncConversationStore._run(ConversationStore.create_conversation, name)
+
+    @staticmethod
+    async def add_message(conversation_id: str, role: str, content: str) -> None:
+        """
+        Adiciona uma mensagem a uma conversa existente.
+
+        Args:
+            conversation_id: ID da conversa
+            role: Papel do remetente ("user" ou "assistant")
+            content: Conteúdo da mensagem
+        """
+        await AsyncConversationStore._run(ConversationStore.add_message, conversation_id, role, content)
+
+    @staticmethod
+    async def get_conversation(conversation_id: str) -> Optional[Conversation]:
+        """
+        Recupera uma conversa pelo ID.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Conversation ou None se não encontrada
+        """
+        return await AsyncConversationStore._run(ConversationStore.get_conversation, conversation_id)
+
+    @staticmethod
+    async def get_messages_as_input_list(conversation_id: str) -> List[Dict[str, str]]:
+        """
+        Recupera as mensagens de uma conversa no formato esperado pela SDK de Agentes.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Lista de mensagens no formato esperado pela SDK
+        """
+        return await AsyncConversationStore._run(
+            ConversationStore.get_messages_as_input_list, conversation_id
+        )
+
+    @staticmethod
+    async def get_recent_messages(conversation_id: str, n: Optional[int] = None,
+                                  max_tokens: Optional[int] = None) -> List[Message]:
+        """
+        Recupera apenas as mensagens mais recentes de uma conversa.
+
+        Args:
+            conversation_id: ID da conversa
+            n: Número máximo de mensagens (None para ilimitado)
+            max_tokens: Número máximo de tokens estimados (None para ilimitado)
+
+        Returns:
+            Lista de mensagens em ordem cronológica
+        """
+        return await AsyncConversationStore._run(
+            ConversationStore.get_recent_messages, conversation_id, n, max_tokens
+        )
+
+    @staticmethod
+    async def get_metadata(conversation_id: str) -> Dict[str, Any]:
+        """
+        Recupera os metadados de uma conversa sem carregar as mensagens.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Dicionário de metadados (vazio se a conversa não existir)
+        """
+        return await AsyncConversationStore._run(ConversationStore.get_metadata, conversation_id)
+
+    @staticmethod
+    async def update_metadata(conversation_id: str, updates: Dict[str, Any]) -> None:
+        """
+        Mescla novos valores nos metadados de uma conversa.
+
+        Args:
+            conversation_id: ID da conversa
+            updates: Chaves e valores a serem gravados
+        """
+        await AsyncConversationStore._run(ConversationStore.update_metadata, conversation_id, updates)
+
+    @staticmethod
+    async def get_conversation_summary(conversation_id: str) -> Optional[ConversationSummary]:
+        """
+        Recupera o resumo (nome, prévia, número de mensagens e datas) de uma conversa.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            ConversationSummary ou None se não encontrada
+        """
+        return await AsyncConversationStore._run(ConversationStore.get_conversation_summary, conversation_id)
+
+    @staticmethod
+    async def list_conversations() -> List[str]:
+        """
+        Lista todos os IDs de conversas disponíveis.
+
+        Returns:
+            Lista de IDs de conversas
+        """
+        return await AsyncConversationStore._run(ConversationStore.list_conversations)
+
+    @staticmethod
+    async def list_conversation_summaries(limit: Optional[int] = None, offset: int = 0) -> List[ConversationSummary]:
+        """
+        Lista resumos das conversas, da mais recente para a mais antiga.
+
+        Args:
+            limit: Número máximo de resumos retornados (None para todos)
+            offset: Quantidade de resumos a pular (paginação)
+
+        Returns:
+            Lista de ConversationSummary
+        """
+        return await AsyncConversationStore._run(
+            ConversationStore.list_conversation_summaries, limit, offset
+        )
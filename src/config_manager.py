@@ -17,11 +17,82 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 CONVERSATIONS_DIR = os.path.join(Path(__file__).resolve().parent, "conversations")
 os.makedirs(CONVERSATIONS_DIR, exist_ok=True)
 
+# Banco de dados usado quando as conversas são armazenadas em SQLite
+CONVERSATIONS_DB_PATH = os.path.join(CONVERSATIONS_DIR, "conversations.db")
+
+# Diretório para os caches persistentes (respostas, veredictos etc.)
+CACHE_DIR = os.path.join(Path(__file__).resolve().parent, "cache")
+
 # Configurações da API
 API_CONFIG = {
     # Configurações da API Nova (Agents SDK)
     "nova": {
         "max_context_messages": 10,  # Número máximo de mensagens no contexto
+        "context_window_mode": "messages",  # Janela de contexto: "messages" (por número de mensagens) ou "tokens" (por orçamento de tokens)
+        "model": "gpt-4o",  # Modelo usado pelos agentes (padrão da SDK)
+        "context_token_budgets": {  # Orçamento de tokens do histórico por modelo
+            "gpt-4o": 8000,
+            "gpt-4o-mini": 8000,
+            "default": 4000,
+        },
+        "context_selection": "recency",  # Seleção do histórico: "recency" (apenas janela recente) ou "relevance" (janela + mensagens antigas relevantes)
+        "relevance_top_k": 4,  # Número de mensagens antigas selecionadas por relevância
+        "summarization_enabled": False,  # Resumir incrementalmente as mensagens que saem da janela de contexto
+        "summarization_threshold": 20,  # Número de mensagens da conversa a partir do qual o resumo é usado
+        "summarization_batch": 6,  # Mínimo de mensagens fora da janela acumuladas antes de atualizar o resumo
+        "conversation_storage": "jsonl",  # Formato de armazenamento: "json" (arquivo único), "jsonl" (log append-only) ou "sqlite"
+        "conversation_cache_size": 128,  # Número máximo de conversas mantidas no cache em memória
+        "conversation_store_workers": 4,  # Threads usadas pela interface assíncrona de armazenamento
+        "response_cache_enabled": True,  # Reutilizar respostas de perguntas já respondidas
+        "response_cache_size": 1024,  # Número máximo de respostas mantidas no cache em memória
+        "response_cache_ttl": 7 * 24 * 3600,  # Validade das respostas em cache (segundos)
+        "response_cache_persistent": True,  # Manter também as respostas em um cache SQLite em disco
+        "semantic_cache_enabled": False,  # Reutilizar respostas de perguntas quase idênticas (MinHash/LSH)
+        "semantic_cache_threshold": 0.8,  # Similaridade mínima (0 a 1) para reutilizar uma resposta
+        "guardrail_mode": "shadow",  # Guardrail de entrada: "blocking" (aguarda e bloqueia), "shadow" (auditoria em segundo plano) ou "off"
+        "guardrail_cache_size": 1024,  # Número máximo de veredictos do guardrail mantidos em cache
+        "guardrail_batch_enabled": True,  # Agrupar verificações simultâneas do guardrail em uma única chamada
+        "guardrail_batch_window_ms": 20,  # Tempo máximo de espera para formar um lote (milissegundos)
+        "guardrail_batch_max_size": 16,  # Número máximo de perguntas por lote
+        "local_triage_enabled": True,  # Classificar localmente a pergunta e chamar o especialista sem a triagem pelo modelo
+        "local_triage_threshold": 0.9,  # Confiança mínima (0 a 1) da triagem local para dispensar a triagem pelo modelo
+        "local_triage_training_conversations": 200,  # Conversas mais recentes usadas no treinamento da triagem local (em segundo plano)
+        "local_triage_training_messages": 50,  # Mensagens mais recentes lidas de cada conversa no treinamento
+        "sticky_routing_enabled": True,  # Enviar perguntas seguintes de uma conversa direto ao último especialista
+        "topic_shift_threshold": 0.75,  # Confiança da triagem local em outro especialista que indica mudança de assunto
+        "streaming_enabled": True,  # Exibir as respostas nas interfaces interativas à medida que são geradas
+        "batch_concurrency": 8,  # Perguntas processadas simultaneamente no processamento em lote
+        "request_coalescing_enabled": True,  # Agrupar perguntas idênticas processadas ao mesmo tempo em uma única execução
+        "http_max_connections": 100,  # Número máximo de conexões HTTP simultâneas com a API da OpenAI
+        "http_max_keepalive_connections": 20,  # Conexões ociosas mantidas abertas (keep-alive) para reutilização
+        "http_keepalive_expiry": 30.0,  # Tempo máximo (segundos) que uma conexão ociosa é mantida
+        "http_timeout": 60.0,  # Timeout (segundos) de leitura, escrita e espera por conexão do pool
+        "http_connect_timeout": 10.0,  # Timeout (segundos) para estabelecer uma nova conexão
+        "http2_enabled": True,  # Usar HTTP/2 quando o pacote "h2" estiver instalado
+        "openai_max_retries": 2,  # Novas tentativas do cliente da OpenAI, usadas apenas se retry_max_attempts <= 1
+        "retry_max_attempts": 3,  # Tentativas (incluindo a primeira) em falhas transitórias da API
+        "retry_base_delay": 0.5,  # Espera base (segundos) do backoff exponencial entre tentativas
+        "retry_max_delay": 8.0,  # Espera máxima (segundos) entre tentativas; Retry-After maior encerra as tentativas
+        "circuit_breaker_failure_threshold": 5,  # Falhas transitórias consecutivas que abrem o circuito do endpoint
+        "circuit_breaker_reset_timeout": 30.0,  # Tempo (segundos) com o circuito aberto antes de uma chamada de teste
+        "rate_limit_enabled": False,  # Espaçar as chamadas à API para respeitar os limites por minuto (ative após configurar os limites da conta)
+        "rate_limit_rpm": 500,  # Requisições por minuto permitidas (limite do nível da conta na OpenAI)
+        "rate_limit_tpm": 30000,  # Tokens por minuto permitidos (limite do nível da conta na OpenAI)
+        "rate_limit_burst_seconds": 60,  # Segundos de orçamento que podem ser consumidos de uma vez (rajada)
+        "rate_limit_output_tokens": 1024,  # Tokens de saída reservados sem max_tokens, até haver saídas observadas
+        "adaptive_concurrency_enabled": True,  # Ajustar o limite de execuções simultâneas pela latência e por respostas 429
+        "adaptive_concurrency_initial": 8,  # Limite inicial de execuções simultâneas dos agentes
+        "adaptive_concurrency_min": 1,  # Limite mínimo de execuções simultâneas
+        "adaptive_concurrency_max": 64,  # Limite máximo de execuções simultâneas
+        "adaptive_concurrency_latency_tolerance": 2.0,  # Razão latência recente / referência que indica congestionamento
+        "adaptive_concurrency_backoff": 0.5,  # Fator aplicado ao limite após 429 ou tempo esgotado
+        "hedging_enabled": False,  # Duplicar chamadas lentas aos especialistas (hedging)
+        "hedging_percentile": 95,  # Percentil da latência observada após o qual a cópia é enviada
+        "hedging_budget_percent": 5.0,  # Porcentagem máxima das chamadas que podem ser duplicadas
+        "hedging_min_samples": 20,  # Latências observadas necessárias antes de enviar cópias
+        "speculative_execution_enabled": False,  # Executar o especialista mais provável em paralelo com a triagem
+        "speculative_min_confidence": 0.5,  # Confiança mínima da triagem local para especular o especialista
+        "request_deadline": 120.0,  # Prazo padrão (segundos) para responder uma pergunta; None desativa
         "trace_group_id": "sistema_educacional",  # ID do grupo para traces
         "trace_workflow_name": "Sistema Educacional QA",  # Nome do fluxo de trabalho
     },
@@ -114,3 +185,39 @@ class ConfigManager:
             str: Caminho para o diretório de conversas
         """
         return CONVERSATIONS_DIR
+    
+    @staticmethod
+    def get_conversations_db_path() -> str:
+        """
+        Obtém o caminho do banco SQLite de conversas.
+        
+        Returns:
+            str: Caminho para o arquivo do banco de conversas
+        """
+        return CONVERSATIONS_DB_PATH
+    
+    @staticmethod
+    def get_cache_dir() -> str:
+        """
+        Obtém o diretório dos caches persistentes, criando-o se necessário.
+        
+        Returns:
+            str: Caminho para o diretório de caches
+        """
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return CACHE_DIR
+    
+    @staticmethod
+    def get_context_token_budget(model: Optional[str] = None) -> int:
+        """
+        Obtém o orçamento de tokens do histórico para um modelo.
+        
+        Args:
+            model: Nome do modelo (opcional, usa o modelo configurado se None)
+            
+        Returns:
+            int: Número máximo de tokens do histórico enviado ao agente
+        """
+        budgets = ConfigManager.get_config("nova", "context_token_budgets")
+        model = model or ConfigManager.get_config("nova", "model")
+        return budgets.get(model, budgets["default"])
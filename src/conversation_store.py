@@ -3,19 +3,33 @@ Módulo para gerenciamento de histórico de conversas para a SDK de Agentes da O
 
 Este módulo implementa um sistema de armazenamento de conversas que permite manter
 o contexto entre sessões diferentes, similar ao THREAD_ID da API antiga.
+
+Formatos de armazenamento disponíveis (configuração "conversation_storage"):
+- "json": um único arquivo JSON por conversa, reescrito a cada mensagem
+- "jsonl": um log append-only por conversa, com um registro de cabeçalho seguido
+  de um registro por mensagem. Adicionar uma mensagem custa O(1).
+- "sqlite": um banco SQLite em modo WAL com tabelas indexadas de conversas e
+  mensagens, adequado para muitas conversas e vários processos.
 """
 
 import json
 import os
+import sqlite3
 import sys
-from typing import Dict, List, Any, Optional
+import threading
+import weakref
+from typing import Dict, Iterator, List, Any, Optional
 from dataclasses import dataclass, field, asdict
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 
 # Adicionar o diretório raiz ao path para permitir importações dos módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.config_manager import ConfigManager
+from src.tokenizador import contar_tokens
+
 # Diretório para armazenar as conversas
 CONVERSATIONS_DIR = os.path.join(os.path.dirname(__file__), "conversations")
 os.makedirs(CONVERSATIONS_DIR, exist_ok=True)
@@ -27,6 +41,7 @@ class Message:
     role: str  # "user" ou "assistant"
     content: str
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    tokens: Optional[int] = None  # Número estimado de tokens, calculado na escrita
 
 
 @dataclass
@@ -40,90 +55,1230 @@ class Conversation:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class ConversationSummary:
+    """Resumo de uma conversa usado na listagem, sem as mensagens."""
+    id: str
+    name: str = ""
+    preview: str = ""  # Início da primeira mensagem
+    message_count: int = 0
+    created_at: str = ""
+    updated_at: str = ""
+
+
+# Número máximo de caracteres da primeira mensagem guardados no resumo
+PREVIEW_LENGTH = 100
+
+
+def _summarize(conversation: Conversation) -> ConversationSummary:
+    """Gera o resumo de uma conversa completa."""
+    preview = conversation.messages[0].content[:PREVIEW_LENGTH] if conversation.messages else ""
+    return ConversationSummary(
+        id=conversation.id,
+        name=conversation.name,
+        preview=preview,
+        message_count=len(conversation.messages),
+        created_at=conversation.created_at,
+        updated_at=conversation.updated_at
+    )
+
+
+def _sort_and_paginate(summaries: List[ConversationSummary], limit: Optional[int],
+                       offset: int) -> List[ConversationSummary]:
+    """Ordena resumos da conversa mais recente para a mais antiga e aplica a paginação."""
+    summaries = sorted(summaries, key=lambda summary: summary.updated_at, reverse=True)
+    end = None if limit is None else offset + limit
+    return summaries[offset:end]
+
+
+def _message_from_dict(data: Dict[str, Any]) -> Message:
+    """Reconstrói uma mensagem a partir de um dicionário serializado."""
+    return Message(
+        role=data['role'],
+        content=data['content'],
+        timestamp=data['timestamp'],
+        tokens=data.get('tokens')
+    )
+
+
+def _take_recent(messages_reversed: Iterator[Message], n: Optional[int],
+                 max_tokens: Optional[int]) -> List[Message]:
+    """
+    Seleciona as mensagens mais recentes respeitando os limites informados.
+
+    A mensagem mais recente é sempre incluída, mesmo que sozinha ultrapasse
+    max_tokens. A leitura do iterador é interrompida assim que um limite é
+    atingido, de modo que mensagens mais antigas nem chegam a ser lidas.
+
+    Args:
+        messages_reversed: Mensagens da mais recente para a mais antiga
+        n: Número máximo de mensagens (None para ilimitado)
+        max_tokens: Número máximo de tokens somados (None para ilimitado)
+
+    Returns:
+        Lista de mensagens em ordem cronológica
+    """
+    selected = []
+    total_tokens = 0
+    for message in messages_reversed:
+        if n is not None and len(selected) >= n:
+            break
+        if max_tokens is not None:
+            total_tokens += message_tokens(message)
+            if selected and total_tokens > max_tokens:
+                break
+        selected.append(message)
+    selected.reverse()
+    return selected
+
+
+def message_tokens(message: Message) -> int:
+    """Obtém o número de tokens da mensagem, usando o valor calculado na escrita quando disponível."""
+    if message.tokens is None:
+        return contar_tokens(message.content)
+    return message.tokens
+
+
+def _read_lines_reversed(file_path: str, block_size: int = 8192) -> Iterator[bytes]:
+    """
+    Lê as linhas de um arquivo de trás para frente, a partir do fim (seek from EOF).
+
+    Args:
+        file_path: Caminho do arquivo
+        block_size: Tamanho dos blocos lidos a cada passo
+
+    Yields:
+        Linhas do arquivo, da última para a primeira, sem a quebra de linha
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b"\n")
+            # A primeira parte pode ser uma linha incompleta; completá-la no próximo bloco
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if remainder:
+            yield remainder
+
+
+def messages_to_input_list(messages: List[Message]) -> List[Dict[str, str]]:
+    """Converte mensagens para o formato de entrada esperado pela SDK de Agentes."""
+    return [{"role": msg.role, "content": msg.content} for msg in messages]
+
+
+def _file_version(file_path: str) -> Optional[tuple]:
+    """
+    Obtém um identificador de versão de um arquivo sem lê-lo.
+
+    Args:
+        file_path: Caminho do arquivo
+
+    Returns:
+        Tupla (mtime em ns, tamanho) ou None se o arquivo não existir
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _list_file_conversations(extensions) -> List[str]:
+    """
+    Lista os IDs das conversas salvas em arquivo no diretório de conversas.
+
+    Args:
+        extensions: Extensões aceitas, em ordem de preferência
+
+    Returns:
+        Lista de IDs de conversas (sem duplicatas)
+    """
+    conversations = []
+    seen = set()
+    for filename in os.listdir(CONVERSATIONS_DIR):
+        for extension in extensions:
+            if filename.endswith(extension):
+                conversation_id = filename[:-len(extension)]  # Remover a extensão
+                if conversation_id not in seen:
+                    seen.add(conversation_id)
+                    conversations.append(conversation_id)
+                break
+    return conversations
+
+
+# Protege a criação preguiçosa dos índices de resumos dos backends em arquivo
+_index_lock = threading.Lock()
+
+
+class SummaryIndex:
+    """
+    Índice de resumos das conversas salvas em arquivo.
+
+    O índice é um log JSONL (index/summaries.jsonl no diretório de conversas) em
+    que cada escrita de conversa adiciona o resumo atualizado; o último registro
+    de cada ID prevalece. Em memória, o índice lê apenas os bytes adicionados
+    desde a última leitura, inclusive os escritos por outros processos. O log é
+    compactado quando acumula registros obsoletos demais. Se o arquivo não
+    existir, o índice é reconstruído uma única vez a partir das conversas.
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.path = os.path.join(CONVERSATIONS_DIR, "index", "summaries.jsonl")
+        self._summaries: Dict[str, ConversationSummary] = {}
+        self._offset = 0
+        self._records = 0
+        # O índice é compartilhado por todas as conversas
+        self._lock = threading.RLock()
+
+    def _rebuild(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._summaries = {}
+        for conversation_id in self._backend.list_ids():
+            conversation = self._backend.load(conversation_id)
+            if conversation:
+                self._summaries[conversation_id] = _summarize(conversation)
+        self._compact()
+
+    def _compact(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("".join(self._dumps(summary) for summary in self._summaries.values()))
+        os.replace(tmp_path, self.path)
+        self._offset = os.path.getsize(self.path)
+        self._records = len(self._summaries)
+
+    @staticmethod
+    def _dumps(summary: ConversationSummary) -> str:
+        return json.dumps(asdict(summary), ensure_ascii=False) + "\n"
+
+    def refresh(self) -> None:
+        """Aplica ao índice em memória os registros adicionados ao log desde a última leitura."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            self._rebuild()
+            return
+
+        if size < self._offset:
+            # O log foi compactado por outro processo: reler do início
+            self._summaries = {}
+            self._offset = 0
+            self._records = 0
+        if size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+
+        # Consumir apenas linhas completas; o restante é lido na próxima vez
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                summary = ConversationSummary(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+            self._summaries[summary.id] = summary
+            self._records += 1
+        self._offset += end
+
+    def put(self, summary: ConversationSummary) -> None:
+        """Registra o resumo atualizado de uma conversa."""
+        with self._lock:
+            self._refresh()
+            self._summaries[summary.id] = summary
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(self._dumps(summary))
+            self._records += 1
+
+            if self._records > 2 * len(self._summaries) + 100:
+                self._compact()
+            else:
+                self._offset = os.path.getsize(self.path)
+
+    def record_message(self, conversation_id: str, message: Message) -> None:
+        """Atualiza incrementalmente o resumo após a adição de uma mensagem."""
+        with self._lock:
+            self._refresh()
+            summary = self._summaries.get(conversation_id)
+            if summary is None:
+                summary = ConversationSummary(
+                    id=conversation_id,
+                    created_at=message.timestamp
+                )
+            self.put(ConversationSummary(
+                id=summary.id,
+                name=summary.name,
+                preview=summary.preview or message.content[:PREVIEW_LENGTH],
+                message_count=summary.message_count + 1,
+                created_at=summary.created_at,
+                updated_at=message.timestamp
+            ))
+
+    def get(self, conversation_id: str) -> Optional[ConversationSummary]:
+        with self._lock:
+            self._refresh()
+            return self._summaries.get(conversation_id)
+
+    def list(self) -> List[ConversationSummary]:
+        with self._lock:
+            self._refresh()
+            return list(self._summaries.values())
+
+
+class JsonConversationBackend:
+    """Armazena cada conversa como um único arquivo JSON (formato original)."""
+
+    extension = ".json"
+
+    def __init__(self):
+        self._index = None
+        # Última reescrita de cada conversa: (versão lida, versão gravada), ou None se
+        # o arquivo mudou durante a leitura
+        self._rewrites: Dict[str, Optional[tuple]] = {}
+
+    @property
+    def index(self) -> SummaryIndex:
+        with _index_lock:
+            if self._index is None:
+                self._index = SummaryIndex(self)
+            return self._index
+
+    def path(self, conversation_id: str) -> str:
+        return os.path.join(CONVERSATIONS_DIR, f"{conversation_id}{self.extension}")
+
+    def load(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Carrega uma conversa a partir do arquivo JSON.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Conversation ou None se o arquivo não existir
+        """
+        file_path = self.path(conversation_id)
+        if not os.path.exists(file_path):
+            return None
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # Reconstruir a conversa a partir dos dados
+        conversation = Conversation(
+            id=data['id'],
+            name=data.get('name', ''),  # Carregar o nome da conversa
+            created_at=data['created_at'],
+            updated_at=data['updated_at'],
+            metadata=data.get('metadata', {})
+        )
+
+        # Reconstruir as mensagens
+        for msg_data in data.get('messages', []):
+            conversation.messages.append(_message_from_dict(msg_data))
+
+        return conversation
+
+    def save(self, conversation: Conversation) -> None:
+        """
+        Salva a conversa completa, sobrescrevendo o arquivo existente.
+
+        Args:
+            conversation: Objeto da conversa a ser salvo
+        """
+        with open(self.path(conversation.id), 'w', encoding='utf-8') as f:
+            json.dump(asdict(conversation), f, ensure_ascii=False, indent=2)
+        self.index.put(_summarize(conversation))
+
+    def append_message(self, conversation_id: str, message: Message) -> None:
+        """
+        Adiciona uma mensagem reescrevendo o arquivo inteiro (O(tamanho da conversa)).
+
+        Args:
+            conversation_id: ID da conversa
+            message: Mensagem a ser adicionada
+        """
+        conversation, read_version = self._load_for_rewrite(conversation_id)
+        if not conversation:
+            # Se a conversa não existir, cria uma nova
+            conversation = Conversation(id=conversation_id)
+        # Importante: preservar o nome da conversa se já existir
+        conversation.messages.append(message)
+        conversation.updated_at = message.timestamp
+        self._rewrite(conversation, read_version)
+
+    def get_metadata(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        conversation = self.load(conversation_id)
+        return conversation.metadata if conversation else None
+
+    def update_metadata(self, conversation_id: str, updates: Dict[str, Any]) -> None:
+        """Mescla as atualizações nos metadados, reescrevendo o arquivo inteiro."""
+        conversation, read_version = self._load_for_rewrite(conversation_id)
+        conversation = conversation or Conversation(id=conversation_id)
+        conversation.metadata.update(updates)
+        self._rewrite(conversation, read_version)
+
+    def _load_for_rewrite(self, conversation_id: str) -> tuple:
+        # A versão só identifica o conteúdo lido se o arquivo não mudou durante a leitura
+        before = self.version(conversation_id)
+        conversation = self.load(conversation_id)
+        return conversation, before if before == self.version(conversation_id) else None
+
+    def _rewrite(self, conversation: Conversation, read_version: Optional[tuple]) -> None:
+        self.save(conversation)
+        written = self.version(conversation.id)
+        self._rewrites[conversation.id] = (read_version, written) if read_version is not None else None
+
+    def get_summary(self, conversation_id: str) -> Optional[ConversationSummary]:
+        return self.index.get(conversation_id)
+
+    def iter_messages_reversed(self, conversation_id: str) -> Iterator[Message]:
+        """Percorre as mensagens da mais recente para a mais antiga (exige ler o arquivo inteiro)."""
+        conversation = self.load(conversation_id)
+        if conversation:
+            yield from reversed(conversation.messages)
+
+    def messages_at(self, conversation_id: str, positions: List[int]) -> Dict[int, Message]:
+        """Obtém as mensagens nas posições informadas (exige ler o arquivo inteiro)."""
+        conversation = self.load(conversation_id)
+        if not conversation:
+            return {}
+        return {p: conversation.messages[p] for p in positions if 0 <= p < len(conversation.messages)}
+
+    def exists(self, conversation_id: str) -> bool:
+        return os.path.exists(self.path(conversation_id))
+
+    def version(self, conversation_id: str) -> Optional[tuple]:
+        """Retorna (mtime, tamanho) do arquivo, usado para validar o cache."""
+        return _file_version(self.path(conversation_id))
+
+    def write_was_isolated(self, conversation_id: str, previous: Any, current: Any,
+                           message: Optional[Message] = None) -> bool:
+        """
+        Verifica se a última reescrita partiu da versão anterior e se nada foi gravado depois dela.
+
+        Como o arquivo inteiro é reescrito a partir do conteúdo lido, a escrita é
+        isolada se o conteúdo lido era o da versão anterior e se a versão atual é a
+        gravada pela reescrita.
+        """
+        rewrite = self._rewrites.pop(conversation_id, None)
+        return previous is not None and rewrite is not None and rewrite == (previous, current)
+
+    def list_ids(self) -> List[str]:
+        """Lista os IDs das conversas a partir dos arquivos do diretório."""
+        return _list_file_conversations((self.extension,))
+
+    def list_summaries(self, limit: Optional[int] = None, offset: int = 0) -> List[ConversationSummary]:
+        """Lista os resumos das conversas a partir do índice, sem abrir os arquivos."""
+        return _sort_and_paginate(self.index.list(), limit, offset)
+
+
+class JsonlConversationBackend:
+    """
+    Armazena cada conversa como um log JSONL append-only.
+
+    A primeira linha é um registro de cabeçalho ({"type": "header", ...}) com id,
+    nome, datas e metadados. Cada mensagem é um registro {"type": "message", ...}
+    adicionado ao final do arquivo, de modo que uma nova mensagem nunca exige a
+    leitura ou reescrita do histórico. Conversas ainda no formato JSON antigo são
+    lidas normalmente e convertidas na primeira escrita.
+
+    Metadados alterados após a criação ficam em um pequeno arquivo auxiliar
+    (index/metadata/<id>.json), mesclado sobre os metadados do cabeçalho, para
+    que possam ser lidos e atualizados sem percorrer o log.
+    """
+
+    extension = ".jsonl"
+
+    def __init__(self):
+        self._legacy = JsonConversationBackend()
+        self._index = None
+
+    @property
+    def index(self) -> SummaryIndex:
+        with _index_lock:
+            if self._index is None:
+                self._index = SummaryIndex(self)
+            return self._index
+
+    def path(self, conversation_id: str) -> str:
+        return os.path.join(CONVERSATIONS_DIR, f"{conversation_id}{self.extension}")
+
+    def metadata_path(self, conversation_id: str) -> str:
+        return os.path.join(CONVERSATIONS_DIR, "index", "metadata", f"{conversation_id}.json")
+
+    def _read_metadata_updates(self, conversation_id: str) -> Dict[str, Any]:
+        try:
+            with open(self.metadata_path(conversation_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def _header_record(conversation: Conversation) -> Dict[str, Any]:
+        return {
+            "type": "header",
+            "id": conversation.id,
+            "name": conversation.name,
+            "created_at": conversation.created_at,
+            "updated_at": conversation.updated_at,
+            "metadata": conversation.metadata,
+        }
+
+    @staticmethod
+    def _message_record(message: Message) -> Dict[str, Any]:
+        record = {"type": "message"}
+        record.update(asdict(message))
+        return record
+
+    @staticmethod
+    def _dumps(record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _append_records(self, conversation_id: str, records: List[Dict[str, Any]]) -> None:
+        # Uma única escrita por chamada, para que registros de escritores
+        # concorrentes não se intercalem no meio de uma linha
+        data = "".join(self._dumps(record) for record in records)
+        with open(self.path(conversation_id), 'a', encoding='utf-8') as f:
+            f.write(data)
+
+    def load(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Carrega uma conversa a partir do log JSONL (ou do JSON antigo, se ainda não convertida).
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Conversation ou None se não encontrada
+        """
+        file_path = self.path(conversation_id)
+        if not os.path.exists(file_path):
+            return self._legacy.load(conversation_id)
+
+        conversation = None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha incompleta (escrita interrompida); ignorar
+                    continue
+
+                record_type = record.get("type")
+                if record_type == "header":
+                    conversation = Conversation(
+                        id=record['id'],
+                        name=record.get('name', ''),
+                        created_at=record['created_at'],
+                        updated_at=record['updated_at'],
+                        metadata=record.get('metadata', {})
+                    )
+                elif conversation is None:
+                    continue
+                elif record_type == "message":
+                    message = _message_from_dict(record)
+                    conversation.messages.append(message)
+                    conversation.updated_at = message.timestamp
+
+        if conversation is not None:
+            conversation.metadata.update(self._read_metadata_updates(conversation_id))
+        return conversation
+
+    def save(self, conversation: Conversation) -> None:
+        """
+        Grava a conversa completa como um novo log (cabeçalho + mensagens).
+
+        Usado na criação de conversas e na conversão do formato antigo; a escrita
+        é feita em um arquivo temporário e substituída atomicamente.
+
+        Args:
+            conversation: Objeto da conversa a ser salvo
+        """
+        file_path = self.path(conversation.id)
+        tmp_path = f"{file_path}.tmp"
+        records = [self._header_record(conversation)]
+        records.extend(self._message_record(message) for message in conversation.messages)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("".join(self._dumps(record) for record in records))
+        os.replace(tmp_path, file_path)
+
+        # Remover a versão antiga em JSON, se existir, para evitar duplicidade
+        if self._legacy.exists(conversation.id):
+            os.remove(self._legacy.path(conversation.id))
+        # O cabeçalho já contém os metadados completos
+        if os.path.exists(self.metadata_path(conversation.id)):
+            os.remove(self.metadata_path(conversation.id))
+        self.index.put(_summarize(conversation))
+
+    def append_message(self, conversation_id: str, message: Message) -> None:
+        """
+        Adiciona uma mensagem ao final do log sem ler o histórico (O(1)).
+
+        Args:
+            conversation_id: ID da conversa
+            message: Mensagem a ser adicionada
+        """
+        if os.path.exists(self.path(conversation_id)):
+            self._append_records(conversation_id, [self._message_record(message)])
+            self.index.record_message(conversation_id, message)
+            return
+
+        # Conversa no formato antigo: converter uma única vez para JSONL
+        conversation = self._legacy.load(conversation_id)
+        if conversation:
+            conversation.messages.append(message)
+            conversation.updated_at = message.timestamp
+            self.save(conversation)
+            return
+
+        # Se a conversa não existir, cria uma nova com cabeçalho e a mensagem
+        conversation = Conversation(id=conversation_id)
+        self._append_records(
+            conversation_id,
+            [self._header_record(conversation), self._message_record(message)]
+        )
+        self.index.record_message(conversation_id, message)
+
+    def get_metadata(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Lê os metadados do cabeçalho (primeira linha) e aplica as atualizações do arquivo auxiliar."""
+        file_path = self.path(conversation_id)
+        if not os.path.exists(file_path):
+            return self._legacy.get_metadata(conversation_id)
+
+        with open(file_path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+        metadata = header.get('metadata', {})
+        metadata.update(self._read_metadata_updates(conversation_id))
+        return metadata
+
+    def update_metadata(self, conversation_id: str, updates: Dict[str, Any]) -> None:
+        """Mescla as atualizações no arquivo auxiliar de metadados, sem tocar no log."""
+        if not os.path.exists(self.path(conversation_id)):
+            conversation = self._legacy.load(conversation_id) or Conversation(id=conversation_id)
+            conversation.metadata.update(updates)
+            self.save(conversation)
+            return
+
+        metadata = self._read_metadata_updates(conversation_id)
+        metadata.update(updates)
+        file_path = self.metadata_path(conversation_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+
+    def get_summary(self, conversation_id: str) -> Optional[ConversationSummary]:
+        return self.index.get(conversation_id)
+
+    def iter_messages_reversed(self, conversation_id: str) -> Iterator[Message]:
+        """
+        Percorre as mensagens da mais recente para a mais antiga lendo o log a partir do fim.
+
+        Apenas os blocos finais do arquivo necessários para as mensagens
+        consumidas são lidos, independentemente do tamanho da conversa.
+        """
+        file_path = self.path(conversation_id)
+        if not os.path.exists(file_path):
+            yield from self._legacy.iter_messages_reversed(conversation_id)
+            return
+
+        for line in _read_lines_reversed(file_path):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Linha incompleta (escrita interrompida); ignorar
+                continue
+            record_type = record.get("type")
+            if record_type == "header":
+                return
+            if record_type == "message":
+                yield _message_from_dict(record)
+
+    def messages_at(self, conversation_id: str, positions: List[int]) -> Dict[int, Message]:
+        """
+        Obtém as mensagens nas posições informadas.
+
+        O log é lido do início apenas até a última posição pedida, e só as
+        mensagens pedidas são reconstruídas.
+        """
+        file_path = self.path(conversation_id)
+        if not os.path.exists(file_path):
+            return self._legacy.messages_at(conversation_id, positions)
+
+        wanted = set(positions)
+        found: Dict[int, Message] = {}
+        position = 0
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if len(found) == len(wanted):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha incompleta (escrita interrompida); ignorar
+                    continue
+                if record.get("type") != "message":
+                    continue
+                if position in wanted:
+                    found[position] = _message_from_dict(record)
+                position += 1
+        return found
+
+    def exists(self, conversation_id: str) -> bool:
+        return os.path.exists(self.path(conversation_id)) or self._legacy.exists(conversation_id)
+
+    def version(self, conversation_id: str) -> Optional[tuple]:
+        """Retorna (mtime, tamanho) do log e dos metadados, ou do JSON antigo se ainda não convertido."""
+        log_version = _file_version(self.path(conversation_id))
+        if log_version is None:
+            return self._legacy.version(conversation_id)
+        return log_version + (_file_version(self.metadata_path(conversation_id)),)
+
+    def write_was_isolated(self, conversation_id: str, previous: Any, current: Any,
+                           message: Optional[Message] = None) -> bool:
+        """
+        Verifica se nenhuma outra escrita ocorreu junto com a última (versões antes e depois dela).
+
+        Args:
+            conversation_id: ID da conversa
+            previous: Versão antes da escrita
+            current: Versão depois da escrita
+            message: Mensagem adicionada, ou None para uma atualização de metadados
+
+        Returns:
+            True se a nova versão corresponde exatamente à escrita feita
+        """
+        if previous is None or current is None or len(previous) != 3 or len(current) != 3:
+            return False
+        if message is None:
+            # Atualização de metadados: o log de mensagens não pode ter mudado
+            return previous[:2] == current[:2]
+        tamanho = len(self._dumps(self._message_record(message)).encode("utf-8"))
+        return current[1] == previous[1] + tamanho and current[2] == previous[2]
+
+    def list_ids(self) -> List[str]:
+        """Lista os IDs das conversas, incluindo as ainda no formato JSON antigo."""
+        return _list_file_conversations((self.extension, self._legacy.extension))
+
+    def list_summaries(self, limit: Optional[int] = None, offset: int = 0) -> List[ConversationSummary]:
+        """Lista os resumos das conversas a partir do índice, sem abrir os arquivos."""
+        return _sort_and_paginate(self.index.list(), limit, offset)
+
+
+class SqliteConversationBackend:
+    """
+    Armazena as conversas em um banco SQLite em modo WAL.
+
+    As conversas ficam na tabela "conversations" e as mensagens na tabela
+    "messages", com índices em updated_at (listagem ordenada) e em
+    (conversation_id, seq) (leitura e inserção por conversa). O modo WAL permite
+    leituras concorrentes com um escritor, inclusive entre processos diferentes.
+    O resumo usado na listagem (prévia e número de mensagens) é mantido nas
+    próprias colunas da tabela "conversations" a cada escrita.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            metadata TEXT NOT NULL DEFAULT '{}',
+            version INTEGER NOT NULL DEFAULT 0,
+            preview TEXT NOT NULL DEFAULT '',
+            message_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id TEXT NOT NULL REFERENCES conversations(id),
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            tokens INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_conversations_updated_at
+            ON conversations(updated_at);
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_id
+            ON messages(conversation_id, seq);
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or ConfigManager.get_conversations_db_path()
+        # Uma conexão por thread: conexões sqlite3 não devem ser compartilhadas
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            self._migrate(conn)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Adiciona colunas introduzidas após a criação de bancos existentes."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(conversations)")}
+        added = {
+            "version": "INTEGER NOT NULL DEFAULT 0",
+            "preview": "TEXT NOT NULL DEFAULT ''",
+            "message_count": "INTEGER NOT NULL DEFAULT 0",
+        }
+        for column, definition in added.items():
+            if column not in columns:
+                conn.execute(f"ALTER TABLE conversations ADD COLUMN {column} {definition}")
+
+        message_columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if "tokens" not in message_columns:
+            conn.execute("ALTER TABLE messages ADD COLUMN tokens INTEGER")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _insert_conversation(conn: sqlite3.Connection, conversation: Conversation,
+                             replace: bool = False) -> None:
+        # Na substituição, o contador de versão é incrementado para invalidar caches
+        on_conflict = (
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, "
+            "created_at = excluded.created_at, updated_at = excluded.updated_at, "
+            "metadata = excluded.metadata, preview = excluded.preview, "
+            "message_count = excluded.message_count, version = conversations.version + 1"
+            if replace else "ON CONFLICT(id) DO NOTHING"
+        )
+        summary = _summarize(conversation)
+        conn.execute(
+            "INSERT INTO conversations "
+            "(id, name, created_at, updated_at, metadata, preview, message_count) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?) {on_conflict}",
+            (
+                conversation.id,
+                conversation.name,
+                conversation.created_at,
+                conversation.updated_at,
+                json.dumps(conversation.metadata, ensure_ascii=False),
+                summary.preview,
+                summary.message_count,
+            )
+        )
+
+    @staticmethod
+    def _insert_message(conn: sqlite3.Connection, conversation_id: str, message: Message) -> None:
+        conn.execute(
+            "INSERT INTO messages (conversation_id, role, content, timestamp, tokens) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (conversation_id, message.role, message.content, message.timestamp, message.tokens)
+        )
+
+    def load(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Carrega uma conversa e suas mensagens do banco.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Conversation ou None se não encontrada
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, name, created_at, updated_at, metadata FROM conversations WHERE id = ?",
+            (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        conversation = Conversation(
+            id=row[0],
+            name=row[1],
+            created_at=row[2],
+            updated_at=row[3],
+            metadata=json.loads(row[4])
+        )
+        rows = conn.execute(
+            "SELECT role, content, timestamp, tokens FROM messages "
+            "WHERE conversation_id = ? ORDER BY seq",
+            (conversation_id,)
+        )
+        conversation.messages.extend(
+            Message(role=role, content=content, timestamp=timestamp, tokens=tokens)
+            for role, content, timestamp, tokens in rows
+        )
+        return conversation
+
+    def save(self, conversation: Conversation) -> None:
+        """
+        Grava a conversa completa, substituindo mensagens existentes.
+
+        Args:
+            conversation: Objeto da conversa a ser salvo
+        """
+        conn = self._connect()
+        with conn:
+            self._insert_conversation(conn, conversation, replace=True)
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation.id,))
+            for message in conversation.messages:
+                self._insert_message(conn, conversation.id, message)
+
+    def append_message(self, conversation_id: str, message: Message) -> None:
+        """
+        Insere uma mensagem e atualiza updated_at em uma única transação.
+
+        Args:
+            conversation_id: ID da conversa
+            message: Mensagem a ser adicionada
+        """
+        conn = self._connect()
+        with conn:
+            # Se a conversa não existir, cria uma nova
+            self._insert_conversation(conn, Conversation(id=conversation_id))
+            self._insert_message(conn, conversation_id, message)
+            conn.execute(
+                "UPDATE conversations SET updated_at = ?, version = version + 1, "
+                "message_count = message_count + 1, "
+                "preview = CASE WHEN message_count = 0 THEN ? ELSE preview END "
+                "WHERE id = ?",
+                (message.timestamp, message.content[:PREVIEW_LENGTH], conversation_id)
+            )
+
+    def get_metadata(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT metadata FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_metadata(self, conversation_id: str, updates: Dict[str, Any]) -> None:
+        """Mescla as atualizações nos metadados em uma única transação."""
+        conn = self._connect()
+        with conn:
+            self._insert_conversation(conn, Conversation(id=conversation_id))
+            row = conn.execute(
+                "SELECT metadata FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            metadata = json.loads(row[0])
+            metadata.update(updates)
+            conn.execute(
+                "UPDATE conversations SET metadata = ?, version = version + 1 WHERE id = ?",
+                (json.dumps(metadata, ensure_ascii=False), conversation_id)
+            )
+
+    def get_summary(self, conversation_id: str) -> Optional[ConversationSummary]:
+        row = self._connect().execute(
+            "SELECT id, name, preview, message_count, created_at, updated_at "
+            "FROM conversations WHERE id = ?",
+            (conversation_id,)
+        ).fetchone()
+        return ConversationSummary(*row) if row else None
+
+    def iter_messages_reversed(self, conversation_id: str) -> Iterator[Message]:
+        """Percorre as mensagens da mais recente para a mais antiga usando o índice da conversa."""
+        rows = self._connect().execute(
+            "SELECT role, content, timestamp, tokens FROM messages "
+            "WHERE conversation_id = ? ORDER BY seq DESC",
+            (conversation_id,)
+        )
+        for role, content, timestamp, tokens in rows:
+            yield Message(role=role, content=content, timestamp=timestamp, tokens=tokens)
+
+    def messages_at(self, conversation_id: str, positions: List[int]) -> Dict[int, Message]:
+        """Obtém as mensagens nas posições informadas (ordem de inserção na conversa)."""
+        if not positions:
+            return {}
+        placeholders = ", ".join("?" for _ in positions)
+        rows = self._connect().execute(
+            "SELECT position, role, content, timestamp, tokens FROM ("
+            "  SELECT ROW_NUMBER() OVER (ORDER BY seq) - 1 AS position, role, content, timestamp, tokens"
+            "  FROM messages WHERE conversation_id = ?"
+            f") WHERE position IN ({placeholders})",
+            (conversation_id, *positions)
+        )
+        return {
+            position: Message(role=role, content=content, timestamp=timestamp, tokens=tokens)
+            for position, role, content, timestamp, tokens in rows
+        }
+
+    def exists(self, conversation_id: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row is not None
+
+    def version(self, conversation_id: str) -> Optional[int]:
+        """Retorna o contador de versão da conversa, incrementado a cada escrita."""
+        row = self._connect().execute(
+            "SELECT version FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def write_was_isolated(self, conversation_id: str, previous: Any, current: Any,
+                           message: Optional[Message] = None) -> bool:
+        """Cada escrita incrementa a versão em 1: qualquer outro valor indica escrita concorrente."""
+        return previous is not None and current == previous + 1
+
+    def list_ids(self) -> List[str]:
+        """Lista os IDs das conversas, das mais recentes para as mais antigas."""
+        rows = self._connect().execute(
+            "SELECT id FROM conversations ORDER BY updated_at DESC"
+        )
+        return [row[0] for row in rows]
+
+    def list_summaries(self, limit: Optional[int] = None, offset: int = 0) -> List[ConversationSummary]:
+        """Lista os resumos das conversas usando o índice de updated_at."""
+        rows = self._connect().execute(
+            "SELECT id, name, preview, message_count, created_at, updated_at "
+            "FROM conversations ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset)
+        )
+        return [ConversationSummary(*row) for row in rows]
+
+
+class ConversationCache:
+    """
+    Cache LRU limitado de objetos Conversation, com validação por versão.
+
+    Cada entrada guarda a versão do armazenamento (mtime/tamanho do arquivo ou
+    contador de versão do SQLite) do momento em que foi carregada ou escrita.
+    Uma entrada só é usada se a versão atual do armazenamento for a mesma, de
+    modo que alterações feitas por outros processos são detectadas.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str, version: Any) -> Optional[Conversation]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and version is not None and entry[0] == version:
+                self._entries.move_to_end(conversation_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, conversation: Conversation, version: Any) -> None:
+        if self.max_size <= 0 or version is None:
+            return
+        with self._lock:
+            self._entries[conversation.id] = (version, conversation)
+            self._entries.move_to_end(conversation.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def peek(self, conversation_id: str, version: Any) -> Optional[Conversation]:
+        """Obtém uma entrada válida sem alterar contadores nem a ordem LRU."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and version is not None and entry[0] == version:
+                return entry[1]
+            return None
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+
+def _copy_conversation(conversation: Conversation) -> Conversation:
+    """Cópia rasa para que chamadores não alterem o objeto mantido em cache."""
+    return Conversation(
+        id=conversation.id,
+        name=conversation.name,
+        messages=list(conversation.messages),
+        created_at=conversation.created_at,
+        updated_at=conversation.updated_at,
+        metadata=dict(conversation.metadata)
+    )
+
+
+# Backends disponíveis, selecionados pela configuração "conversation_storage"
+STORAGE_BACKENDS = {
+    "json": JsonConversationBackend,
+    "jsonl": JsonlConversationBackend,
+    "sqlite": SqliteConversationBackend,
+}
+
+
 class ConversationStore:
-    """Gerencia o armazenamento e recuperação de conversas."""
+    """
+    Gerencia o armazenamento e recuperação de conversas.
+
+    As conversas lidas ou escritas ficam em um cache LRU em memória
+    (configuração "conversation_cache_size") com escrita direta (write-through):
+    toda escrita vai ao armazenamento e atualiza o cache, e toda leitura valida
+    a entrada pela versão atual do armazenamento antes de usá-la.
+
+    Leituras e escritas de uma mesma conversa são serializadas por um lock da
+    conversa; conversas diferentes são acessadas em paralelo.
+    """
+
+    _backend = None
+    _cache = None
+    _init_lock = threading.Lock()
+    # Locks por conversa, descartados quando nenhuma operação os usa
+    _locks: "weakref.WeakValueDictionary[str, threading.RLock]" = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def _conversation_lock(conversation_id: str) -> threading.RLock:
+        """Obtém o lock de uma conversa (o chamador mantém a referência enquanto o usa)."""
+        with ConversationStore._init_lock:
+            lock = ConversationStore._locks.get(conversation_id)
+            if lock is None:
+                lock = threading.RLock()
+                ConversationStore._locks[conversation_id] = lock
+            return lock
+
+    @staticmethod
+    def _get_backend():
+        """
+        Obtém (e cria na primeira chamada) o backend de armazenamento configurado.
+
+        Returns:
+            O backend definido em API_CONFIG["nova"]["conversation_storage"]
+        """
+        with ConversationStore._init_lock:
+            if ConversationStore._backend is None:
+                storage = ConfigManager.get_config("nova", "conversation_storage")
+                if storage not in STORAGE_BACKENDS:
+                    raise ValueError(
+                        f"Formato de armazenamento inválido: {storage}. "
+                        f"Use um de: {', '.join(STORAGE_BACKENDS)}."
+                    )
+                ConversationStore._backend = STORAGE_BACKENDS[storage]()
+            return ConversationStore._backend
+
+    @staticmethod
+    def _get_cache() -> ConversationCache:
+        """Obtém (e cria na primeira chamada) o cache de conversas."""
+        with ConversationStore._init_lock:
+            if ConversationStore._cache is None:
+                max_size = ConfigManager.get_config("nova", "conversation_cache_size")
+                ConversationStore._cache = ConversationCache(max_size)
+            return ConversationStore._cache
+
+    @staticmethod
+    def cache_stats() -> Dict[str, int]:
+        """
+        Obtém os contadores do cache de conversas.
+
+        Returns:
+            Dicionário com hits, misses, tamanho atual e tamanho máximo
+        """
+        return ConversationStore._get_cache().stats()
 
     @staticmethod
     def create_conversation(name: str = "") -> str:
         """
         Cria uma nova conversa e retorna seu ID.
-        
+
         Args:
             name (str, opcional): Nome personalizado para a conversa
-            
+
         Returns:
             str: ID da conversa criada
         """
         conversation_id = str(uuid.uuid4())
         conversation = Conversation(id=conversation_id, name=name)
-        
+
         # Salvar a conversa vazia
         ConversationStore._save_conversation(conversation)
-        
+
         return conversation_id
 
     @staticmethod
     def add_message(conversation_id: str, role: str, content: str) -> None:
         """
         Adiciona uma mensagem a uma conversa existente.
-        
+
+        Se a conversa não existir, ela é criada. O nome da conversa é preservado.
+
         Args:
             conversation_id: ID da conversa
             role: Papel do remetente ("user" ou "assistant")
             content: Conteúdo da mensagem
         """
-        conversation = ConversationStore.get_conversation(conversation_id)
-        if not conversation:
-            # Se a conversa não existir, cria uma nova
-            conversation = Conversation(id=conversation_id)
-        # Importante: preservar o nome da conversa se já existir
-        
-        # Adicionar a mensagem
-        message = Message(role=role, content=content)
-        conversation.messages.append(message)
-        conversation.updated_at = datetime.now().isoformat()
-        
-        # Salvar a conversa atualizada
-        ConversationStore._save_conversation(conversation)
+        # O número de tokens é calculado uma única vez, na escrita
+        message = Message(role=role, content=content, tokens=contar_tokens(content))
+        backend = ConversationStore._get_backend()
+        cache = ConversationStore._get_cache()
+
+        with ConversationStore._conversation_lock(conversation_id):
+            previous = backend.version(conversation_id)
+            cached = cache.peek(conversation_id, previous)
+            backend.append_message(conversation_id, message)
+            current = backend.version(conversation_id)
+
+            # Write-through: atualizar a entrada em cache sem reler o armazenamento, desde
+            # que nenhum outro processo tenha escrito na conversa junto com esta mensagem
+            if cached is not None and backend.write_was_isolated(conversation_id, previous, current, message):
+                cached.messages.append(message)
+                cached.updated_at = message.timestamp
+                cache.put(cached, current)
+            else:
+                # A próxima leitura recarrega a conversa do armazenamento
+                cache.discard(conversation_id)
 
     @staticmethod
     def get_conversation(conversation_id: str) -> Optional[Conversation]:
         """
         Recupera uma conversa pelo ID.
-        
+
         Args:
             conversation_id: ID da conversa
-            
+
         Returns:
             Conversation ou None se não encontrada
         """
-        file_path = os.path.join(CONVERSATIONS_DIR, f"{conversation_id}.json")
-        if not os.path.exists(file_path):
-            return None
-        
+        backend = ConversationStore._get_backend()
+        cache = ConversationStore._get_cache()
+
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Reconstruir a conversa a partir dos dados
-            conversation = Conversation(
-                id=data['id'],
-                name=data.get('name', ''),  # Carregar o nome da conversa
-                created_at=data['created_at'],
-                updated_at=data['updated_at'],
-                metadata=data.get('metadata', {})
-            )
-            
-            # Reconstruir as mensagens
-            for msg_data in data.get('messages', []):
-                message = Message(
-                    role=msg_data['role'],
-                    content=msg_data['content'],
-                    timestamp=msg_data['timestamp']
-                )
-                conversation.messages.append(message)
-                
-            return conversation
+            with ConversationStore._conversation_lock(conversation_id):
+                version = backend.version(conversation_id)
+                conversation = cache.get(conversation_id, version)
+                if conversation is None:
+                    conversation = backend.load(conversation_id)
+                    if conversation is None:
+                        return None
+                    cache.put(conversation, version)
+                return _copy_conversation(conversation)
         except Exception as e:
             print(f"Erro ao carregar conversa {conversation_id}: {e}")
             return None
@@ -132,47 +1287,176 @@ class ConversationStore:
     def get_messages_as_input_list(conversation_id: str) -> List[Dict[str, str]]:
         """
         Recupera as mensagens de uma conversa no formato esperado pela SDK de Agentes.
-        
+
         Args:
             conversation_id: ID da conversa
-            
+
         Returns:
             Lista de mensagens no formato esperado pela SDK
         """
         conversation = ConversationStore.get_conversation(conversation_id)
         if not conversation:
             return []
-        
+
         # Converter para o formato esperado pela SDK
-        return [{"role": msg.role, "content": msg.content} for msg in conversation.messages]
+        return messages_to_input_list(conversation.messages)
+
+    @staticmethod
+    def get_recent_messages(conversation_id: str, n: Optional[int] = None,
+                            max_tokens: Optional[int] = None) -> List[Message]:
+        """
+        Recupera apenas as mensagens mais recentes de uma conversa.
+
+        As mensagens são lidas a partir do fim do armazenamento (do fim do
+        arquivo no formato JSONL ou por consulta indexada no SQLite), então o
+        custo depende do tamanho da janela e não do tamanho da conversa. Se a
+        conversa estiver em cache, a janela é obtida da memória.
+
+        Args:
+            conversation_id: ID da conversa
+            n: Número máximo de mensagens (None para ilimitado)
+            max_tokens: Número máximo de tokens estimados (None para ilimitado)
+
+        Returns:
+            Lista de mensagens em ordem cronológica (vazia se a conversa não existir)
+        """
+        backend = ConversationStore._get_backend()
+        cache = ConversationStore._get_cache()
+
+        try:
+            with ConversationStore._conversation_lock(conversation_id):
+                cached = cache.get(conversation_id, backend.version(conversation_id))
+                if cached is not None:
+                    return _take_recent(reversed(cached.messages), n, max_tokens)
+                return _take_recent(backend.iter_messages_reversed(conversation_id), n, max_tokens)
+        except Exception as e:
+            print(f"Erro ao carregar mensagens da conversa {conversation_id}: {e}")
+            return []
+
+    @staticmethod
+    def get_messages_at(conversation_id: str, positions: List[int]) -> Dict[int, Message]:
+        """
+        Recupera mensagens específicas de uma conversa pela posição.
+
+        Usado quando apenas algumas mensagens antigas são necessárias (por exemplo,
+        as selecionadas por relevância), sem montar a conversa inteira em memória.
+        Se a conversa estiver em cache, as mensagens são obtidas da memória.
+
+        Args:
+            conversation_id: ID da conversa
+            positions: Posições das mensagens (0 é a primeira mensagem)
+
+        Returns:
+            Dicionário posição -> mensagem (posições inexistentes são omitidas)
+        """
+        backend = ConversationStore._get_backend()
+        cache = ConversationStore._get_cache()
+
+        try:
+            with ConversationStore._conversation_lock(conversation_id):
+                cached = cache.peek(conversation_id, backend.version(conversation_id))
+                if cached is not None:
+                    return {p: cached.messages[p] for p in positions if 0 <= p < len(cached.messages)}
+                return backend.messages_at(conversation_id, positions)
+        except Exception as e:
+            print(f"Erro ao carregar mensagens da conversa {conversation_id}: {e}")
+            return {}
+
+    @staticmethod
+    def get_metadata(conversation_id: str) -> Dict[str, Any]:
+        """
+        Recupera os metadados de uma conversa sem carregar as mensagens.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            Dicionário de metadados (vazio se a conversa não existir)
+        """
+        backend = ConversationStore._get_backend()
+        with ConversationStore._conversation_lock(conversation_id):
+            cached = ConversationStore._get_cache().peek(conversation_id, backend.version(conversation_id))
+            if cached is not None:
+                return dict(cached.metadata)
+            return backend.get_metadata(conversation_id) or {}
+
+    @staticmethod
+    def update_metadata(conversation_id: str, updates: Dict[str, Any]) -> None:
+        """
+        Mescla novos valores nos metadados de uma conversa.
+
+        Args:
+            conversation_id: ID da conversa
+            updates: Chaves e valores a serem gravados
+        """
+        backend = ConversationStore._get_backend()
+        cache = ConversationStore._get_cache()
+
+        with ConversationStore._conversation_lock(conversation_id):
+            previous = backend.version(conversation_id)
+            cached = cache.peek(conversation_id, previous)
+            backend.update_metadata(conversation_id, updates)
+            current = backend.version(conversation_id)
+
+            # Write-through: as mensagens em cache continuam válidas; os metadados são
+            # relidos (leitura pequena) para incluir atualizações de outros processos
+            if cached is not None and backend.write_was_isolated(conversation_id, previous, current):
+                cached.metadata = backend.get_metadata(conversation_id) or {}
+                cache.put(cached, current)
+            else:
+                cache.discard(conversation_id)
+
+    @staticmethod
+    def get_conversation_summary(conversation_id: str) -> Optional[ConversationSummary]:
+        """
+        Recupera o resumo (nome, prévia, número de mensagens e datas) de uma conversa.
+
+        Args:
+            conversation_id: ID da conversa
+
+        Returns:
+            ConversationSummary ou None se não encontrada
+        """
+        return ConversationStore._get_backend().get_summary(conversation_id)
 
     @staticmethod
     def _save_conversation(conversation: Conversation) -> None:
         """
         Salva uma conversa no armazenamento.
-        
+
         Args:
             conversation: Objeto da conversa a ser salvo
         """
-        file_path = os.path.join(CONVERSATIONS_DIR, f"{conversation.id}.json")
-        
-        # Converter para dicionário
-        data = asdict(conversation)
-        
-        # Salvar como JSON
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        backend = ConversationStore._get_backend()
+        with ConversationStore._conversation_lock(conversation.id):
+            backend.save(conversation)
+            ConversationStore._get_cache().put(
+                _copy_conversation(conversation), backend.version(conversation.id)
+            )
+
+    @staticmethod
+    def list_conversation_summaries(limit: Optional[int] = None, offset: int = 0) -> List[ConversationSummary]:
+        """
+        Lista resumos das conversas (nome, prévia, número de mensagens e datas).
+
+        Os resumos vêm de um índice mantido a cada escrita, sem abrir os
+        arquivos de conversa, ordenados da conversa mais recente para a mais antiga.
+
+        Args:
+            limit: Número máximo de resumos retornados (None para todos)
+            offset: Quantidade de resumos a pular (paginação)
+
+        Returns:
+            Lista de ConversationSummary
+        """
+        return ConversationStore._get_backend().list_summaries(limit, offset)
 
     @staticmethod
     def list_conversations() -> List[str]:
         """
         Lista todos os IDs de conversas disponíveis.
-        
+
         Returns:
             Lista de IDs de conversas
         """
-        conversations = []
-        for filename in os.listdir(CONVERSATIONS_DIR):
-            if filename.endswith('.json'):
-                conversations.append(filename[:-5])  # Remover a extensão .json
-        return conversations
+        return ConversationStore._get_backend().list_ids()
@@ -41,6 +41,16 @@ class APIConnectionError(AppError):
     pass
 
 
+class CircuitOpenError(APIConnectionError):
+    """Exceção para chamadas rejeitadas porque o circuito do endpoint está aberto."""
+    pass
+
+
+class DeadlineExceededError(AppError):
+    """Exceção para operações interrompidas porque o prazo da requisição acabou."""
+    pass
+
+
 class APIResponseError(AppError):
     """Exceção para respostas de erro da API."""
     pass
@@ -107,12 +117,18 @@ class ErrorHandler:
         if isinstance(error, APIKeyError):
             return "Erro de configuração: A chave da API não está configurada corretamente. Por favor, verifique suas configurações."
         
+        elif isinstance(error, CircuitOpenError):
+            return "Serviço temporariamente indisponível: a API da OpenAI falhou repetidamente. Tente novamente em alguns instantes."
+        
         elif isinstance(error, APIConnectionError):
             return "Erro de conexão: Não foi possível conectar à API da OpenAI. Verifique sua conexão com a internet ou tente novamente mais tarde."
         
         elif isinstance(error, APIResponseError):
             return f"Erro na resposta da API: {error.message}"
         
+        elif isinstance(error, DeadlineExceededError):
+            return "Tempo esgotado: não foi possível responder à pergunta dentro do prazo. Tente novamente."
+        
         elif isinstance(error, ConfigError):
             return f"Erro de configuração: {error.message}"
         
@@ -123,7 +139,7 @@ class ErrorHandler:
             return f"Ocorreu um erro inesperado: {str(error)}"
 
 
-def catch_errors(func: Callable) -> Callable:
+def catch_errors(func: Optional[Callable] = None, *, endpoint: Optional[str] = None) -> Callable:
     """
     Decorador para capturar e tratar exceções em funções.
     
@@ -131,8 +147,13 @@ def catch_errors(func: Callable) -> Callable:
     (APIKeyError, APIConnectionError, ValidationError, etc.) para serem tratadas pelo chamador.
     Apenas exceções genéricas são convertidas em respostas estruturadas.
     
+    Com o parâmetro "endpoint" (por exemplo, @catch_errors(endpoint="assistants")),
+    falhas transitórias são repetidas com backoff e o circuit breaker do endpoint
+    é aplicado (ver src/resiliencia.py) antes do tratamento do erro.
+    
     Args:
         func: A função a ser decorada
+        endpoint: Endpoint da API chamado pela função (opcional)
         
     Returns:
         Callable: A função decorada
@@ -140,9 +161,15 @@ def catch_errors(func: Callable) -> Callable:
     Raises:
         AppError: Propaga exceções específicas da aplicação
     """
+    if func is None:
+        return lambda f: catch_errors(f, endpoint=endpoint)
+    
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
+            if endpoint:
+                from src.resiliencia import executar_com_retry
+                return executar_com_retry(endpoint, func, *args, **kwargs)
             return func(*args, **kwargs)
         except AppError:
             # Registrar o erro, mas propagar exceções específicas da aplicação
@@ -152,12 +179,12 @@ def catch_errors(func: Callable) -> Callable:
             # Tratar exceções genéricas
             error_info = ErrorHandler.handle_error(e)
             user_message = ErrorHandler.format_user_message(e)
-            raise AppError(user_message, error_info)
+            raise AppError(user_message, error_info) from e
     
     return wrapper
 
 
-def catch_async_errors(func: Callable) -> Callable:
+def catch_async_errors(func: Optional[Callable] = None, *, endpoint: Optional[str] = None) -> Callable:
     """
     Decorador para capturar e tratar exceções em funções assíncronas.
     
@@ -165,8 +192,12 @@ def catch_async_errors(func: Callable) -> Callable:
     (APIKeyError, APIConnectionError, ValidationError, etc.) para serem tratadas pelo chamador.
     Apenas exceções genéricas são convertidas em respostas estruturadas.
     
+    Com o parâmetro "endpoint", falhas transitórias são repetidas com backoff e o
+    circuit breaker do endpoint é aplicado, como em catch_errors.
+    
     Args:
         func: A função assíncrona a ser decorada
+        endpoint: Endpoint da API chamado pela função (opcional)
         
     Returns:
         Callable: A função decorada
@@ -174,9 +205,15 @@ def catch_async_errors(func: Callable) -> Callable:
     Raises:
         AppError: Propaga exceções específicas da aplicação
     """
+    if func is None:
+        return lambda f: catch_async_errors(f, endpoint=endpoint)
+    
     @wraps(func)
     async def wrapper(*args, **kwargs):
         try:
+            if endpoint:
+                from src.resiliencia import executar_com_retry_async
+                return await executar_com_retry_async(endpoint, func, *args, **kwargs)
             return await func(*args, **kwargs)
         except AppError:
             # Registrar o erro, mas propagar exceções específicas da aplicação
@@ -186,6 +223,51 @@ def catch_async_errors(func: Callable) -> Callable:
             # Tratar exceções genéricas
             error_info = ErrorHandler.handle_error(e)
             user_message = ErrorHandler.format_user_message(e)
-            raise AppError(user_message, error_info)
+            raise AppError(user_message, error_info) from e
+    
+    return wrapper
+
+
+def catch_async_generator_errors(func: Optional[Callable] = None, *, endpoint: Optional[str] = None) -> Callable:
+    """
+    Decorador para capturar e tratar exceções em geradores assíncronos.
+    
+    Equivalente a catch_async_errors para funções que produzem resultados
+    parciais com "yield" (por exemplo, respostas transmitidas em streaming).
+    Com o parâmetro "endpoint", novas tentativas só são feitas se a falha
+    ocorrer antes do primeiro item produzido.
+    
+    Args:
+        func: O gerador assíncrono a ser decorado
+        endpoint: Endpoint da API chamado pelo gerador (opcional)
+        
+    Returns:
+        Callable: O gerador decorado
+    
+    Raises:
+        AppError: Propaga exceções específicas da aplicação
+    """
+    if func is None:
+        return lambda f: catch_async_generator_errors(f, endpoint=endpoint)
+    
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            if endpoint:
+                from src.resiliencia import transmitir_com_retry
+                itens = transmitir_com_retry(endpoint, func, *args, **kwargs)
+            else:
+                itens = func(*args, **kwargs)
+            async for item in itens:
+                yield item
+        except AppError:
+            # Registrar o erro, mas propagar exceções específicas da aplicação
+            error_logger.error(f"Erro da aplicação capturado: {traceback.format_exc()}")
+            raise
+        except Exception as e:
+            # Tratar exceções genéricas
+            error_info = ErrorHandler.handle_error(e)
+            user_message = ErrorHandler.format_user_message(e)
+            raise AppError(user_message, error_info) from e
     
     return wrapper
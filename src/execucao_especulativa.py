@@ -0,0 +1,156 @@
+"""
+Módulo para execução especulativa do especialista em paralelo com a triagem.
+
+Na sequência normal, a triagem pelo modelo e a resposta do especialista são duas
+chamadas em série no caminho crítico. No modo especulativo, o especialista mais
+provável segundo a triagem local (src/triagem_local.py) começa a responder ao
+mesmo tempo em que o agente de triagem, em uma versão que apenas informa o
+especialista escolhido (saída estruturada, sem handoff), decide a rota. Se a
+triagem concordar, a resposta especulativa é usada; caso contrário, ela é
+cancelada e o especialista escolhido é executado. O guardrail continua na
+triagem: se a pergunta for bloqueada, a execução especulativa também é cancelada.
+
+A taxa de acerto e os tokens gastos com especulações descartadas são registrados
+nas métricas "speculative.*" (e no log a cada INTERVALO_RELATORIO especulações)
+para ajustar "speculative_min_confidence".
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Literal, Optional
+
+from agents import Agent, RunConfig, Runner
+from agents.result import RunResult
+from pydantic import create_model
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.metrics import Metrics
+from src.provedor_modelos import medir_tokens
+from src.triagem_local import obter_classificador
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("execucao_especulativa")
+
+# Número de especulações entre dois relatórios no log
+INTERVALO_RELATORIO = 100
+
+# Versões com saída estruturada dos agentes de triagem (id do agente -> agente)
+_triagens_estruturadas: Dict[int, Agent] = {}
+
+
+def triagem_estruturada(triage_agent: Agent, especialistas: List[Agent]) -> Agent:
+    """
+    Obtém (e cria na primeira chamada) a versão do agente de triagem que apenas escolhe o especialista.
+
+    Args:
+        triage_agent: Agente de triagem com handoffs para os especialistas
+        especialistas: Agentes especialistas disponíveis
+
+    Returns:
+        Agente com as mesmas instruções e guardrails, sem handoffs, cuja saída é o nome do especialista
+    """
+    agente = _triagens_estruturadas.get(id(triage_agent))
+    if agente is None:
+        nomes = tuple(agent.name for agent in especialistas)
+        descricoes = "\n".join(f"- {agent.name}: {agent.handoff_description}" for agent in especialistas)
+        escolha = create_model("EscolhaEspecialista", especialista=(Literal[nomes], ...))
+        agente = triage_agent.clone(
+            name=f"{triage_agent.name} (estruturada)",
+            instructions=f"""{triage_agent.instructions}
+
+    Não responda a pergunta: informe apenas o nome do especialista que deve respondê-la.
+    Especialistas disponíveis:
+{descricoes}""",
+            handoffs=[],
+            output_type=escolha,
+        )
+        _triagens_estruturadas[id(triage_agent)] = agente
+    return agente
+
+
+def _registrar_desperdicio(tokens: int) -> None:
+    Metrics.increment("speculative.discarded")
+    Metrics.increment("speculative.wasted_tokens", tokens)
+
+
+def _registrar_resultado(acertou: bool, latencia_triagem: float) -> None:
+    Metrics.increment("speculative.hits" if acertou else "speculative.misses")
+    Metrics.observe("speculative.triage_latency", latencia_triagem)
+
+    acertos = Metrics.get_counter("speculative.hits")
+    total = acertos + Metrics.get_counter("speculative.misses")
+    if int(total) % INTERVALO_RELATORIO:
+        return
+    desperdicio = Metrics.get_counter("speculative.wasted_tokens")
+    logger.info(
+        f"Execução especulativa: taxa de acerto {acertos / total if total else 0.0:.0%} "
+        f"({int(acertos)}/{int(total)}), tokens desperdiçados {int(desperdicio)} "
+        f"({desperdicio / total if total else 0.0:.0f} por especulação)"
+    )
+
+
+async def executar_com_especulacao(triage_agent: Agent, pergunta: str, run_config: RunConfig,
+                                   especialistas: List[Agent],
+                                   palavras_chave: Optional[Dict[str, str]] = None) -> RunResult:
+    """
+    Executa a pergunta pela triagem, especulando o especialista quando o modo estiver ativado.
+
+    Sem "speculative_execution_enabled", ou se a triagem local ainda estiver em
+    treinamento ou não tiver ao menos "speculative_min_confidence" no especialista
+    mais provável, a execução é a sequência normal (triage_agent com handoff).
+
+    Args:
+        triage_agent: Agente de triagem com handoffs para os especialistas
+        pergunta: Texto da pergunta
+        run_config: Configuração da execução
+        especialistas: Agentes especialistas disponíveis
+        palavras_chave: Termos típicos de cada especialista (nome do agente -> texto)
+
+    Returns:
+        RunResult da execução do especialista que respondeu
+
+    Raises:
+        InputGuardrailTripwireTriggered: Se a pergunta for bloqueada pelo guardrail da triagem
+    """
+    if not ConfigManager.get_config("nova", "speculative_execution_enabled"):
+        return await Runner.run(triage_agent, pergunta, run_config=run_config)
+
+    classificador = obter_classificador(especialistas, palavras_chave)
+    nome, confianca = classificador.classificar(pergunta) if classificador.pronto else (None, 0.0)
+    if nome is None or confianca < ConfigManager.get_config("nova", "speculative_min_confidence"):
+        Metrics.increment("speculative.skipped")
+        return await Runner.run(triage_agent, pergunta, run_config=run_config)
+
+    Metrics.increment("speculative.started")
+    logger.info(f"Especulando o especialista {nome} (confiança {confianca:.2f}) em paralelo com a triagem")
+    # A tarefa copia o contexto na criação: o medidor acompanha apenas a especulação
+    with medir_tokens() as medidor:
+        especulacao = asyncio.ensure_future(
+            Runner.run(classificador.especialistas[nome], pergunta, run_config=run_config)
+        )
+    usada = False
+    try:
+        inicio = time.perf_counter()
+        triagem = await Runner.run(triagem_estruturada(triage_agent, especialistas), pergunta,
+                                   run_config=run_config)
+        escolhido = triagem.final_output.especialista
+        _registrar_resultado(escolhido == nome, time.perf_counter() - inicio)
+        if escolhido == nome:
+            usada = True
+            return await especulacao
+
+        logger.info(f"Triagem escolheu {escolhido} em vez de {nome}: descartando a especulação")
+    finally:
+        if not usada:
+            # Triagem discordante, guardrail bloqueado, prazo esgotado ou cancelamento
+            especulacao.cancel()
+            await asyncio.gather(especulacao, return_exceptions=True)
+            _registrar_desperdicio(medidor.tokens)
+
+    return await Runner.run(classificador.especialistas[escolhido], pergunta, run_config=run_config)
@@ -0,0 +1,349 @@
+"""
+Módulo para execução do guardrail de perguntas educacionais.
+
+O guardrail de entrada pode rodar em três modos, definidos em "guardrail_mode":
+
+- "blocking": a verificação é aguardada e perguntas não educacionais são bloqueadas;
+- "shadow": a verificação roda em segundo plano, fora do caminho da resposta, e o
+  veredicto é apenas registrado no log de auditoria;
+- "off": nenhuma verificação é feita.
+
+Em todos os modos, o guardrail julga apenas a pergunta (a última mensagem do
+usuário, sem o histórico da conversa), e os veredictos ficam em cache por pergunta
+normalizada, de modo que perguntas repetidas não acionam o agente de guardrail
+novamente. Quando
+"guardrail_batch_enabled" está ativo, verificações simultâneas são agrupadas em
+lotes: as perguntas que chegam dentro de uma janela curta são classificadas em
+uma única chamada ao modelo, que devolve uma lista de veredictos.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agents import Agent, RunConfig, Runner
+from pydantic import create_model
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.error_handler import ConfigError
+from src.logger import Logger
+from src.metrics import Metrics
+from src.prazo import sem_prazo
+from src.provedor_modelos import obter_provedor_modelos
+from src.response_cache import normalizar_pergunta
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("guardrail_execucao")
+
+# Log de auditoria com um veredicto (JSON) por linha
+auditoria_logger = Logger.setup("guardrail_auditoria", log_to_console=False)
+
+MODOS_GUARDRAIL = ("blocking", "shadow", "off")
+
+_veredictos: "OrderedDict[str, Any]" = OrderedDict()
+_veredictos_lock = threading.Lock()
+
+# Tarefas de auditoria em andamento (referências mantidas até a conclusão)
+_tarefas: Set[asyncio.Task] = set()
+_pendentes: Dict[str, asyncio.Task] = {}
+
+
+def modo_guardrail() -> str:
+    """
+    Obtém o modo de execução do guardrail configurado.
+
+    Returns:
+        str: "blocking", "shadow" ou "off"
+
+    Raises:
+        ConfigError: Se o modo configurado for inválido
+    """
+    modo = ConfigManager.get_config("nova", "guardrail_mode")
+    if modo not in MODOS_GUARDRAIL:
+        raise ConfigError(f"Modo de guardrail inválido: {modo}. Use {', '.join(MODOS_GUARDRAIL)}.")
+    return modo
+
+
+def _run_config() -> RunConfig:
+    # Chamadas do guardrail passam pelo limitador de taxa, como as dos demais agentes
+    return RunConfig(model_provider=obter_provedor_modelos())
+
+
+def texto_verificado(input_data: Any) -> str:
+    """
+    Extrai o texto a ser verificado da entrada do agente.
+
+    Args:
+        input_data: Pergunta (str) ou lista de mensagens no formato da SDK de Agentes
+
+    Returns:
+        str: A pergunta, ou o conteúdo da última mensagem do usuário
+    """
+    if isinstance(input_data, str):
+        return input_data
+    for item in reversed(input_data):
+        if isinstance(item, dict) and item.get("role") == "user" and isinstance(item.get("content"), str):
+            return item["content"]
+    return str(input_data)
+
+
+def veredicto_em_cache(texto: str) -> Optional[Any]:
+    """
+    Consulta o veredicto já obtido para uma pergunta.
+
+    Args:
+        texto: Texto da pergunta
+
+    Returns:
+        A saída do agente de guardrail ou None se a pergunta ainda não foi verificada
+    """
+    chave = normalizar_pergunta(texto)
+    with _veredictos_lock:
+        veredicto = _veredictos.get(chave)
+        if veredicto is not None:
+            _veredictos.move_to_end(chave)
+    return veredicto
+
+
+def _armazenar_veredicto(texto: str, veredicto: Any) -> None:
+    chave = normalizar_pergunta(texto)
+    tamanho_maximo = ConfigManager.get_config("nova", "guardrail_cache_size")
+    with _veredictos_lock:
+        _veredictos[chave] = veredicto
+        _veredictos.move_to_end(chave)
+        while len(_veredictos) > tamanho_maximo:
+            _veredictos.popitem(last=False)
+
+
+def _registrar_auditoria(texto: str, veredicto: Any, modo: str) -> None:
+    registro = {
+        "timestamp": datetime.now().isoformat(),
+        "mode": modo,
+        "input": texto,
+        "verdict": veredicto.model_dump() if hasattr(veredicto, "model_dump") else str(veredicto),
+    }
+    auditoria_logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+async def verificar_entrada(agent: Agent, input_data: Any, context: Any = None, modo: str = "blocking") -> Any:
+    """
+    Executa o agente de guardrail sobre a entrada, reutilizando veredictos em cache.
+
+    Args:
+        agent: Agente de guardrail (com output_type definido)
+        input_data: Pergunta ou lista de mensagens
+        context: Contexto da execução repassado ao agente
+        modo: Modo em que a verificação é feita (registrado na auditoria)
+
+    Returns:
+        A saída estruturada do agente de guardrail
+    """
+    texto = texto_verificado(input_data)
+    veredicto = veredicto_em_cache(texto)
+    if veredicto is None:
+        # Aproveitar uma auditoria em segundo plano já em andamento para a mesma pergunta
+        pendente = _pendentes.get(normalizar_pergunta(texto))
+        if pendente is not None:
+            await asyncio.shield(pendente)
+            veredicto = veredicto_em_cache(texto)
+    if veredicto is not None:
+        Metrics.increment("guardrail.cache_hits")
+        return veredicto
+
+    return await _executar_verificacao(agent, input_data, context, modo)
+
+
+async def _executar_verificacao(agent: Agent, input_data: Any, context: Any, modo: str) -> Any:
+    # Com ou sem lotes, apenas a pergunta é julgada: é ela a chave do veredicto em cache
+    texto = texto_verificado(input_data)
+    if ConfigManager.get_config("nova", "guardrail_batch_enabled"):
+        veredicto = await ClassificadorEmLote.obter(agent).classificar(texto)
+    else:
+        Metrics.increment("guardrail.model_calls")
+        result = await Runner.run(agent, texto, context=context, run_config=_run_config())
+        veredicto = result.final_output_as(agent.output_type)
+    _armazenar_veredicto(texto, veredicto)
+    _registrar_auditoria(texto, veredicto, modo)
+    return veredicto
+
+
+class ClassificadorEmLote:
+    """Agrupa verificações simultâneas do guardrail em uma única chamada ao modelo."""
+
+    _instancias: Dict[int, "ClassificadorEmLote"] = {}
+
+    def __init__(self, agent: Agent, janela: float, tamanho_maximo: int):
+        """
+        Args:
+            agent: Agente de guardrail usado para verificar uma pergunta por vez
+            janela: Tempo máximo (segundos) que uma pergunta espera pelo lote
+            tamanho_maximo: Número máximo de perguntas por lote
+        """
+        self.agent = agent
+        self.janela = janela
+        self.tamanho_maximo = tamanho_maximo
+        saida_lote = create_model(
+            f"Lote{agent.output_type.__name__}",
+            veredictos=(List[agent.output_type], ...),
+        )
+        self.agent_lote = agent.clone(
+            name=f"{agent.name} (lote)",
+            instructions=f"""{agent.instructions}
+
+    Você receberá várias entradas numeradas. Avalie cada uma de forma independente e
+    retorne exatamente um veredicto por entrada, na mesma ordem em que foram apresentadas.""",
+            output_type=saida_lote,
+        )
+        self._fila: List[Tuple[str, asyncio.Future]] = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def obter(agent: Agent) -> "ClassificadorEmLote":
+        """
+        Obtém (e cria na primeira chamada) o classificador em lote de um agente.
+
+        Args:
+            agent: Agente de guardrail
+
+        Returns:
+            ClassificadorEmLote configurado em API_CONFIG
+        """
+        classificador = ClassificadorEmLote._instancias.get(id(agent))
+        if classificador is None:
+            classificador = ClassificadorEmLote(
+                agent,
+                janela=ConfigManager.get_config("nova", "guardrail_batch_window_ms") / 1000,
+                tamanho_maximo=ConfigManager.get_config("nova", "guardrail_batch_max_size"),
+            )
+            ClassificadorEmLote._instancias[id(agent)] = classificador
+        return classificador
+
+    async def classificar(self, texto: str) -> Any:
+        """
+        Coloca uma pergunta no próximo lote e aguarda o seu veredicto.
+
+        Args:
+            texto: Texto da pergunta
+
+        Returns:
+            A saída estruturada do agente de guardrail para a pergunta
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Novo event loop (por exemplo, outra chamada a asyncio.run): descartar o estado anterior
+            self._loop = loop
+            self._fila = []
+            self._temporizador = None
+
+        futuro = loop.create_future()
+        self._fila.append((texto, futuro))
+        if len(self._fila) >= self.tamanho_maximo:
+            self._disparar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.janela, self._disparar)
+        return await futuro
+
+    def _disparar(self) -> None:
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._fila = self._fila, []
+        if lote:
+            tarefa = self._loop.create_task(self._executar_lote(lote))
+            _tarefas.add(tarefa)
+            tarefa.add_done_callback(_tarefas.discard)
+
+    async def _executar_lote(self, lote: List[Tuple[str, asyncio.Future]]) -> None:
+        # Perguntas repetidas dentro do lote são enviadas uma única vez
+        textos = list(dict.fromkeys(texto for texto, _ in lote))
+        Metrics.increment("guardrail.batches")
+        Metrics.observe("guardrail.batch_size", len(textos))
+        try:
+            # O lote atende várias perguntas: não herda o prazo de quem o disparou
+            with sem_prazo():
+                if len(textos) == 1:
+                    Metrics.increment("guardrail.model_calls")
+                    result = await Runner.run(self.agent, textos[0], run_config=_run_config())
+                    veredictos = [result.final_output_as(self.agent.output_type)]
+                else:
+                    veredictos = await self._classificar_varios(textos)
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        por_texto = dict(zip(textos, veredictos))
+        for texto, futuro in lote:
+            if not futuro.done():
+                futuro.set_result(por_texto[texto])
+
+    async def _classificar_varios(self, textos: List[str]) -> List[Any]:
+        entrada = "\n\n".join(f"Entrada {i}:\n{texto}" for i, texto in enumerate(textos, 1))
+        Metrics.increment("guardrail.model_calls")
+        result = await Runner.run(self.agent_lote, entrada, run_config=_run_config())
+        veredictos = result.final_output.veredictos
+        if len(veredictos) == len(textos):
+            return veredictos
+
+        # Resposta com número errado de veredictos: verificar individualmente
+        logger.warning(f"Lote do guardrail retornou {len(veredictos)} veredictos para "
+                       f"{len(textos)} entradas; verificando individualmente")
+        Metrics.increment("guardrail.model_calls", len(textos))
+        resultados = await asyncio.gather(*(Runner.run(self.agent, texto, run_config=_run_config())
+                                            for texto in textos))
+        return [result.final_output_as(self.agent.output_type) for result in resultados]
+
+
+async def _auditar(agent: Agent, input_data: Any, context: Any, chave: str) -> None:
+    try:
+        # A auditoria continua em segundo plano mesmo depois do prazo da pergunta
+        with sem_prazo():
+            veredicto = await _executar_verificacao(agent, input_data, context, modo="shadow")
+        logger.info(f"Guardrail (auditoria) resultado: {veredicto}")
+    except Exception as e:
+        # A auditoria nunca afeta a resposta ao usuário
+        logger.warning(f"Falha na auditoria do guardrail: {str(e)}")
+    finally:
+        _pendentes.pop(chave, None)
+
+
+def agendar_auditoria(agent: Agent, input_data: Any, context: Any = None) -> None:
+    """
+    Agenda a verificação da entrada em segundo plano, sem aguardar o resultado.
+
+    Perguntas já verificadas ou com verificação em andamento são ignoradas.
+
+    Args:
+        agent: Agente de guardrail
+        input_data: Pergunta ou lista de mensagens
+        context: Contexto da execução repassado ao agente
+    """
+    texto = texto_verificado(input_data)
+    if veredicto_em_cache(texto) is not None:
+        Metrics.increment("guardrail.cache_hits")
+        return
+
+    chave = normalizar_pergunta(texto)
+    if chave in _pendentes:
+        return
+
+    tarefa = asyncio.get_running_loop().create_task(_auditar(agent, input_data, context, chave))
+    _pendentes[chave] = tarefa
+    _tarefas.add(tarefa)
+    tarefa.add_done_callback(_tarefas.discard)
+
+
+async def aguardar_auditorias() -> None:
+    """Aguarda a conclusão das auditorias em segundo plano ainda pendentes."""
+    if _tarefas:
+        await asyncio.gather(*list(_tarefas), return_exceptions=True)
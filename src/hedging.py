@@ -0,0 +1,192 @@
+"""
+Módulo para requisições redundantes (hedging) nas chamadas aos especialistas.
+
+Uma parte pequena das respostas dos especialistas demora muito mais que as
+demais e domina a latência de cauda (p99). Com o hedging ativado, se uma chamada
+ao modelo não terminou depois da latência p95 observada, uma cópia idêntica é
+enviada; a primeira resposta vence e a outra chamada é cancelada. Um orçamento
+limita as cópias a uma porcentagem configurada das chamadas, para que o custo
+extra seja previsível mesmo quando a API inteira fica lenta.
+
+As latências e o atraso da cópia contam apenas a chamada ao modelo, sem a espera
+pelo limitador de taxa. Enquanto houver chamadas na fila do limitador de taxa ou
+do limitador de concorrência, nenhuma cópia é enviada: a lentidão vem da fila, e
+a cópia só aumentaria a congestão.
+
+Apenas chamadas sem streaming usam hedging: em streaming, o texto já vai sendo
+enviado ao usuário e a chamada não pode ser trocada no meio.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import AsyncIterator, List, Optional, Union
+
+from agents import ModelSettings, ModelTracing, Tool
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.models.interface import Model
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.limitador_concorrencia import LimitadorConcorrencia
+from src.limitador_taxa import LimitadorTaxa
+from src.logger import Logger
+from src.metrics import Metrics
+from src.provedor_modelos import ModeloControlado, obter_provedor_modelos
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("hedging")
+
+# Crédito máximo acumulado pelo orçamento (cópias que podem ser enviadas em sequência)
+CREDITO_MAXIMO = 10.0
+
+
+class OrcamentoHedge:
+    """Orçamento de cópias: cada chamada rende uma fração de crédito e cada cópia consome 1."""
+
+    def __init__(self, porcentagem: float):
+        """
+        Args:
+            porcentagem: Porcentagem máxima das chamadas que podem ser duplicadas
+        """
+        self.fracao = porcentagem / 100
+        self._credito = 0.0
+        self._lock = threading.Lock()
+
+    def registrar_chamada(self) -> None:
+        with self._lock:
+            self._credito = min(CREDITO_MAXIMO, self._credito + self.fracao)
+
+    def consumir(self) -> bool:
+        """
+        Returns:
+            True se havia crédito para uma cópia (que é descontado), False caso contrário
+        """
+        with self._lock:
+            if self._credito < 1:
+                return False
+            self._credito -= 1
+            return True
+
+
+def _limitadores_em_fila() -> bool:
+    limitador_taxa = LimitadorTaxa.get_default()
+    limitador_concorrencia = LimitadorConcorrencia.get_default()
+    return (limitador_taxa is not None and limitador_taxa.na_fila() > 0) or \
+        (limitador_concorrencia is not None and limitador_concorrencia.na_fila() > 0)
+
+
+class ModeloComHedge(Model):
+    """Modelo dos especialistas: duplica chamadas lentas dentro do orçamento de hedging."""
+
+    def __init__(self, nome_modelo: Optional[str] = None, metrica: str = "hedging.latency"):
+        """
+        Args:
+            nome_modelo: Modelo a usar (padrão: o modelo padrão da SDK, como nos demais agentes)
+            metrica: Métrica com as latências usadas para calcular o atraso da cópia
+        """
+        self.nome_modelo = nome_modelo
+        self.metrica = metrica
+        self.orcamento = OrcamentoHedge(ConfigManager.get_config("nova", "hedging_budget_percent"))
+
+    def __str__(self) -> str:
+        # Usado na assinatura do cache de respostas: o hedging não muda as respostas
+        return str(self.nome_modelo)
+
+    def _modelo(self) -> ModeloControlado:
+        # Cada chamada (original ou cópia) passa pelo limitador de taxa e pelo prazo
+        return obter_provedor_modelos().get_model(self.nome_modelo)
+
+    def _atraso_hedge(self) -> Optional[float]:
+        if not ConfigManager.get_config("nova", "hedging_enabled"):
+            return None
+        self.orcamento.registrar_chamada()
+        if Metrics.sample_count(self.metrica) < ConfigManager.get_config("nova", "hedging_min_samples"):
+            return None
+        return Metrics.percentile(self.metrica, ConfigManager.get_config("nova", "hedging_percentile"))
+
+    async def get_response(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[TResponseInputItem]],
+        model_settings: ModelSettings,
+        tools: List[Tool],
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: List[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        def chamar(iniciada: Optional[asyncio.Event] = None) -> asyncio.Future:
+            return asyncio.ensure_future(self._modelo().get_response_medida(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, iniciada
+            ))
+
+        atraso = self._atraso_hedge()
+        iniciada = asyncio.Event()
+        tarefas = [chamar(iniciada)]
+        inicio_original = None
+        try:
+            if atraso is not None:
+                # O atraso conta a partir do início da chamada ao modelo, sem a espera pelo limitador
+                espera_inicio = asyncio.ensure_future(iniciada.wait())
+                try:
+                    await asyncio.wait([tarefas[0], espera_inicio], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    espera_inicio.cancel()
+                inicio_original = time.perf_counter()
+                await asyncio.wait(tarefas, timeout=atraso)
+                if not tarefas[0].done():
+                    if _limitadores_em_fila():
+                        Metrics.increment("hedging.skipped_queueing")
+                    elif self.orcamento.consumir():
+                        Metrics.increment("hedging.issued")
+                        logger.info(f"Chamada sem resposta após {atraso:.2f}s: enviando cópia")
+                        tarefas.append(chamar())
+                    else:
+                        Metrics.increment("hedging.budget_exhausted")
+
+            # A primeira resposta bem-sucedida vence; uma falha só é propagada se as duas falharem
+            pendentes = set(tarefas)
+            while True:
+                concluidas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                vencedora = next((t for t in tarefas if t in concluidas and t.exception() is None), None)
+                if vencedora is not None:
+                    break
+                if not pendentes:
+                    raise concluidas.pop().exception()
+
+            resposta, duracao = vencedora.result()
+            if vencedora is not tarefas[0]:
+                Metrics.increment("hedging.wins")
+                # Latência da chamada original até aqui (ela teria demorado ao menos isso)
+                duracao = time.perf_counter() - inicio_original
+            Metrics.observe(self.metrica, duracao)
+            return resposta
+        finally:
+            # Cancelar a chamada perdedora (ou todas, se esta chamada foi cancelada)
+            perdedoras = [t for t in tarefas if not t.done()]
+            for tarefa in perdedoras:
+                tarefa.cancel()
+            await asyncio.gather(*perdedoras, return_exceptions=True)
+            for tarefa in tarefas:
+                if tarefa.done() and not tarefa.cancelled():
+                    tarefa.exception()
+
+    def stream_response(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[TResponseInputItem]],
+        model_settings: ModelSettings,
+        tools: List[Tool],
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: List[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        return self._modelo().stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
@@ -5,14 +5,16 @@ import os
 # Adicionar o diretório raiz ao path para permitir importações dos módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.main import processar_pergunta
+from src.main import processar_pergunta, processar_pergunta_stream
 from src.config_manager import ConfigManager
 from src.logger import Logger
+from src.guardrail_execucao import aguardar_auditorias
 from src.error_handler import catch_async_errors, APIKeyError, APIConnectionError, ValidationError
 from src.ui_utils import (
     exibir_cabecalho_sistema, 
     verificar_api_key, 
     processar_pergunta_padrao,
+    exibir_resposta_em_streaming,
     verificar_comando_saida,
     verificar_pergunta_vazia
 )
@@ -37,6 +39,9 @@ async def main_interativo():
         # Usando exclusivamente a API Nova (Agents SDK)
         logger.info("Usando a API Nova (Agents SDK)")
     
+        # Exibir as respostas em streaming, à medida que são geradas
+        streaming = ConfigManager.get_config("nova", "streaming_enabled")
+    
         print("\nDigite 'sair' a qualquer momento para encerrar o programa.")
         
         while True:
@@ -54,6 +59,9 @@ async def main_interativo():
             # Criar uma função de processamento específica para este caso
             async def processar_com_api_nova(p):
                 logger.debug("Usando API Nova (Agents SDK)")
+                if streaming:
+                    # Exibe a resposta à medida que é gerada
+                    return await exibir_resposta_em_streaming(processar_pergunta_stream(p))
                 return await processar_pergunta(p)
             
             # Processar a pergunta usando a função padronizada
@@ -63,10 +71,14 @@ async def main_interativo():
             if sucesso:
                 resposta, trace_id = resultado
                 logger.info(f"Resposta obtida com sucesso, Trace ID: {trace_id}")
-                # Exibe a resposta
-                print(f"\nResposta:\n{resposta}")
+                # Exibe a resposta (no modo streaming, já exibida durante a geração)
+                if not streaming:
+                    print(f"\nResposta:\n{resposta}")
                 print(f"\n[TRACE] ID: {trace_id}")
                 print("Você pode visualizar o trace completo no painel da OpenAI.")
+        
+        # Concluir as verificações do guardrail em segundo plano antes de encerrar
+        await aguardar_auditorias()
     except Exception as e:
         logger.critical(f"Erro fatal na execução do programa: {str(e)}", exc_info=True)
         print(f"\nErro fatal: {str(e)}")
@@ -12,15 +12,17 @@ import os
 # Adicionar o diretório raiz ao path para permitir importações dos módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.conversation_store import ConversationStore
-from src.processar_com_contexto import processar_pergunta_com_contexto
+from src.async_conversation_store import AsyncConversationStore
+from src.processar_com_contexto import processar_pergunta_com_contexto, processar_pergunta_com_contexto_stream
 from src.config_manager import ConfigManager
 from src.logger import Logger
+from src.guardrail_execucao import aguardar_auditorias
 from src.error_handler import catch_async_errors, APIKeyError, APIConnectionError, ValidationError
 from src.ui_utils import (
     exibir_cabecalho_sistema, 
     verificar_api_key, 
     processar_pergunta_padrao,
+    exibir_resposta_em_streaming,
     verificar_comando_saida,
     verificar_pergunta_vazia
 )
@@ -39,44 +41,37 @@ async def main():
         # Exibir cabeçalho do sistema usando a função do módulo ui_utils
         exibir_cabecalho_sistema(com_contexto=True)
     
-        # Listar conversas existentes
-        conversas = ConversationStore.list_conversations()
+        # Listar conversas existentes a partir do índice de resumos
+        resumos = await AsyncConversationStore.list_conversation_summaries()
+        conversas = [resumo.id for resumo in resumos]
         logger.info(f"Encontradas {len(conversas)} conversas existentes")
         
         conversation_id = None
         if conversas:
             print("\nConversas existentes:")
-            for i, conv_id in enumerate(conversas, 1):
-                conversa = ConversationStore.get_conversation(conv_id)
-                if conversa:
-                    # Adicionar log para depuração
-                    logger.info(f"Conversa {conv_id}: nome='{conversa.name}', mensagens={len(conversa.messages)}")
-                    
-                    # Se a conversa tem um nome personalizado, exibi-lo
-                    if conversa.name and conversa.name.strip():
-                        nome_exibicao = conversa.name
-                        logger.info(f"Usando nome personalizado: {nome_exibicao}")
-                    # Caso contrário, usar a primeira mensagem ou ID como fallback
-                    elif conversa.messages:
-                        nome_exibicao = conversa.messages[0].content[:30] + "..." if len(conversa.messages[0].content) > 30 else conversa.messages[0].content
-                        logger.info(f"Usando primeira mensagem como nome: {nome_exibicao}")
-                    else:
-                        nome_exibicao = f"Conversa {conv_id[:8]}"
-                        logger.info(f"Usando ID como nome: {nome_exibicao}")
-                    
-                    print(f"{i}. {nome_exibicao} ({len(conversa.messages)} mensagens) - ID: {conv_id[:8]}...")
-            
             # Criar um dicionário para mapear o índice ao nome da conversa
             nomes_conversas = {}
-            for i, conv_id in enumerate(conversas, 1):
-                conversa = ConversationStore.get_conversation(conv_id)
-                if conversa:
-                    if conversa.name and conversa.name.strip():
-                        nomes_conversas[i] = conversa.name
-                    elif conversa.messages:
-                        nomes_conversas[i] = conversa.messages[0].content[:20] + "..." if len(conversa.messages[0].content) > 20 else conversa.messages[0].content
-                    else:
-                        nomes_conversas[i] = f"Conversa {conv_id[:8]}"
+            for i, resumo in enumerate(resumos, 1):
+                conv_id = resumo.id
+                # Adicionar log para depuração
+                logger.info(f"Conversa {conv_id}: nome='{resumo.name}', mensagens={resumo.message_count}")
+                
+                # Se a conversa tem um nome personalizado, exibi-lo
+                if resumo.name and resumo.name.strip():
+                    nome_exibicao = resumo.name
+                    nomes_conversas[i] = resumo.name
+                    logger.info(f"Usando nome personalizado: {nome_exibicao}")
+                # Caso contrário, usar a primeira mensagem ou ID como fallback
+                elif resumo.preview:
+                    nome_exibicao = resumo.preview[:30] + "..." if len(resumo.preview) > 30 else resumo.preview
+                    nomes_conversas[i] = resumo.preview[:20] + "..." if len(resumo.preview) > 20 else resumo.preview
+                    logger.info(f"Usando primeira mensagem como nome: {nome_exibicao}")
+                else:
+                    nome_exibicao = f"Conversa {conv_id[:8]}"
+                    nomes_conversas[i] = nome_exibicao
+                    logger.info(f"Usando ID como nome: {nome_exibicao}")
+                
+                print(f"{i}. {nome_exibicao} ({resumo.message_count} mensagens) - ID: {conv_id[:8]}...")
             
             print("\nEscolha uma opção:")
             print("0. Iniciar uma nova conversa")
@@ -94,7 +89,7 @@ async def main():
                     print("\nIniciando uma nova conversa...")
                     nome_conversa = input("\nDigite um nome para esta conversa: ")
                     if nome_conversa.strip():
-                        conversation_id = ConversationStore.create_conversation(nome_conversa.strip())
+                        conversation_id = await AsyncConversationStore.create_conversation(nome_conversa.strip())
                         logger.info(f"Nova conversa criada com nome: {nome_conversa}")
                         print(f"\nNova conversa '{nome_conversa}' iniciada!")
             except ValueError:
@@ -102,7 +97,7 @@ async def main():
                 print("\nOpção inválida. Iniciando uma nova conversa...")
                 nome_conversa = input("\nDigite um nome para esta conversa: ")
                 if nome_conversa.strip():
-                    conversation_id = ConversationStore.create_conversation(nome_conversa.strip())
+                    conversation_id = await AsyncConversationStore.create_conversation(nome_conversa.strip())
                     logger.info(f"Nova conversa criada com nome: {nome_conversa}")
                     print(f"\nNova conversa '{nome_conversa}' iniciada!")
         else:
@@ -110,10 +105,13 @@ async def main():
             print("\nNenhuma conversa anterior encontrada. Iniciando uma nova conversa...")
             nome_conversa = input("\nDigite um nome para esta conversa: ")
             if nome_conversa.strip():
-                conversation_id = ConversationStore.create_conversation(nome_conversa.strip())
+                conversation_id = await AsyncConversationStore.create_conversation(nome_conversa.strip())
                 logger.info(f"Nova conversa criada com nome: {nome_conversa}")
                 print(f"\nNova conversa '{nome_conversa}' iniciada!")
         
+        # Exibir as respostas em streaming, à medida que são geradas
+        streaming = ConfigManager.get_config("nova", "streaming_enabled")
+        
         print("\nDigite 'sair' a qualquer momento para encerrar o programa.")
         print("Digite 'nova' para iniciar uma nova conversa.")
     
@@ -132,7 +130,7 @@ async def main():
                 print("Iniciando uma nova conversa...")
                 nome_conversa = input("\nDigite um nome para esta conversa: ")
                 if nome_conversa.strip():
-                    conversation_id = ConversationStore.create_conversation(nome_conversa.strip())
+                    conversation_id = await AsyncConversationStore.create_conversation(nome_conversa.strip())
                     logger.info(f"Nova conversa criada com nome: {nome_conversa}")
                     print(f"\nNova conversa '{nome_conversa}' iniciada!")
                 continue
@@ -143,6 +141,12 @@ async def main():
             
             # Criar uma função de processamento específica para este caso
             async def processar_com_contexto(p):
+                if streaming:
+                    # Exibe a resposta à medida que é gerada
+                    return await exibir_resposta_em_streaming(
+                        processar_pergunta_com_contexto_stream(p, conversation_id),
+                        prefixo="\nResposta: "
+                    )
                 return await processar_pergunta_com_contexto(p, conversation_id)
             
             # Processar a pergunta usando a função padronizada
@@ -152,14 +156,18 @@ async def main():
             if sucesso:
                 resposta, conversation_id = resultado
                 logger.info(f"Resposta obtida com sucesso, ID da conversa: {conversation_id}")
-                print(f"\nResposta: {resposta}")
+                if not streaming:
+                    print(f"\nResposta: {resposta}")
                 
                 # Obter o nome da conversa para exibição
-                conversa = ConversationStore.get_conversation(conversation_id)
+                conversa = await AsyncConversationStore.get_conversation(conversation_id)
                 if conversa and conversa.name:
                     print(f"\n[Conversa: '{conversa.name}' | ID: {conversation_id[:8]}...]")
                 else:
                     print(f"\n[ID da conversa: {conversation_id[:8]}...]")
+        
+        # Concluir as verificações do guardrail em segundo plano antes de encerrar
+        await aguardar_auditorias()
     except Exception as e:
         logger.critical(f"Erro fatal na execução do programa: {str(e)}", exc_info=True)
         print(f"\nErro fatal: {str(e)}")
@@ -0,0 +1,198 @@
+"""
+Módulo para limitação adaptativa da concorrência das execuções dos agentes.
+
+O limite de execuções simultâneas não é fixo: ele segue um esquema AIMD
+(aumento aditivo, redução multiplicativa) guiado pela latência observada.
+Enquanto a latência recente fica próxima da latência de referência e o limite
+está sendo usado, ele cresce devagar (cerca de +1 a cada limite de execuções
+concluídas). Quando a latência recente sobe além da tolerância, ele é reduzido
+um pouco; quando a API responde com limite de requisições (429) ou tempo
+esgotado, ele é reduzido pela metade. Execuções acima do limite aguardam em fila.
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import AsyncContextManager, Deque, Optional
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.metrics import Metrics
+from src.prazo import aguardar_com_prazo
+from src.resiliencia import erro_de_sobrecarga
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("limitador_concorrencia")
+
+# Peso da última observação nas médias de latência recente e de referência
+PESO_RECENTE = 0.2
+PESO_REFERENCIA = 0.02
+
+# Redução aplicada quando a latência recente passa da tolerância
+REDUCAO_LATENCIA = 0.9
+
+
+class LimitadorConcorrencia:
+    """Limite de execuções simultâneas ajustado pela latência e por respostas 429."""
+
+    _padrao: Optional["LimitadorConcorrencia"] = None
+    _padrao_lock = threading.Lock()
+
+    def __init__(self, inicial: float, minimo: float, maximo: float, tolerancia: float, reducao: float):
+        """
+        Args:
+            inicial: Limite inicial de execuções simultâneas
+            minimo: Limite mínimo
+            maximo: Limite máximo
+            tolerancia: Razão entre a latência recente e a de referência que indica congestionamento
+            reducao: Fator aplicado ao limite após 429 ou tempo esgotado
+        """
+        self.limite = float(inicial)
+        self.minimo = minimo
+        self.maximo = maximo
+        self.tolerancia = tolerancia
+        self.reducao = reducao
+        self.em_andamento = 0
+        self._latencia_recente: Optional[float] = None
+        self._latencia_referencia: Optional[float] = None
+        self._ultima_reducao = 0.0
+        self._fila: Deque[asyncio.Future] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._publicar()
+
+    @staticmethod
+    def get_default() -> Optional["LimitadorConcorrencia"]:
+        """
+        Obtém o limitador configurado em API_CONFIG.
+
+        Returns:
+            O limitador compartilhado, ou None se "adaptive_concurrency_enabled" estiver desativado
+        """
+        if not ConfigManager.get_config("nova", "adaptive_concurrency_enabled"):
+            return None
+        with LimitadorConcorrencia._padrao_lock:
+            if LimitadorConcorrencia._padrao is None:
+                LimitadorConcorrencia._padrao = LimitadorConcorrencia(
+                    inicial=ConfigManager.get_config("nova", "adaptive_concurrency_initial"),
+                    minimo=ConfigManager.get_config("nova", "adaptive_concurrency_min"),
+                    maximo=ConfigManager.get_config("nova", "adaptive_concurrency_max"),
+                    tolerancia=ConfigManager.get_config("nova", "adaptive_concurrency_latency_tolerance"),
+                    reducao=ConfigManager.get_config("nova", "adaptive_concurrency_backoff"),
+                )
+            return LimitadorConcorrencia._padrao
+
+    @contextlib.asynccontextmanager
+    async def limitar(self):
+        """
+        Aguarda uma vaga, executa o bloco e ajusta o limite com o resultado.
+
+        Exemplo:
+            async with limitador.limitar():
+                result = await Runner.run(...)
+        """
+        await self._adquirir()
+        inicio = time.perf_counter()
+        sobrecarga = concluida = False
+        try:
+            yield
+            concluida = True
+        except Exception as e:
+            sobrecarga = erro_de_sobrecarga(e)
+            raise
+        finally:
+            self._liberar(time.perf_counter() - inicio, concluida, sobrecarga)
+
+    async def _adquirir(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Novo event loop (por exemplo, outra chamada a asyncio.run): descartar o estado anterior
+            self._loop = loop
+            self._fila.clear()
+            self.em_andamento = 0
+
+        if self.em_andamento < int(self.limite) and not self._fila:
+            self.em_andamento += 1
+        else:
+            futuro = loop.create_future()
+            self._fila.append(futuro)
+            Metrics.increment("adaptive_concurrency.queued")
+            try:
+                # A vaga é transferida por _liberar, que já incrementa em_andamento
+                await aguardar_com_prazo(asyncio.shield(futuro), "a espera por uma vaga de execução")
+            except BaseException:
+                # Cancelada ou prazo esgotado: devolver a vaga, se já recebida, ou sair da fila
+                if futuro.done() and not futuro.cancelled():
+                    self._liberar_vaga()
+                else:
+                    futuro.cancel()
+                    if futuro in self._fila:
+                        self._fila.remove(futuro)
+                raise
+        self._publicar()
+
+    def na_fila(self) -> int:
+        """
+        Returns:
+            int: Número de execuções aguardando uma vaga
+        """
+        return len(self._fila)
+
+    def _liberar(self, latencia: float, concluida: bool, sobrecarga: bool) -> None:
+        agora = time.monotonic()
+        if sobrecarga:
+            self._reduzir(self.reducao, agora, "limite de requisições ou tempo esgotado")
+        elif concluida:
+            self._observar_latencia(latencia, agora)
+        self._liberar_vaga()
+
+    def _liberar_vaga(self) -> None:
+        self.em_andamento -= 1
+        # Passar as vagas livres para as execuções em fila, na ordem de chegada
+        while self._fila and self.em_andamento < int(self.limite):
+            futuro = self._fila.popleft()
+            if not futuro.done():
+                self.em_andamento += 1
+                futuro.set_result(None)
+        self._publicar()
+
+    def _observar_latencia(self, latencia: float, agora: float) -> None:
+        Metrics.observe("adaptive_concurrency.latency", latencia)
+        if self._latencia_referencia is None:
+            self._latencia_recente = self._latencia_referencia = latencia
+            return
+        self._latencia_recente += PESO_RECENTE * (latencia - self._latencia_recente)
+        self._latencia_referencia += PESO_REFERENCIA * (latencia - self._latencia_referencia)
+
+        if self._latencia_recente > self._latencia_referencia * self.tolerancia:
+            self._reduzir(REDUCAO_LATENCIA, agora, f"latência recente {self._latencia_recente:.2f}s "
+                                                   f"(referência {self._latencia_referencia:.2f}s)")
+        elif self.em_andamento >= int(self.limite):
+            # Aumento aditivo apenas quando o limite atual está sendo usado
+            self.limite = min(self.maximo, self.limite + 1 / self.limite)
+
+    def _reduzir(self, fator: float, agora: float, motivo: str) -> None:
+        # Execuções iniciadas antes da última redução não a repetem
+        if agora - self._ultima_reducao < (self._latencia_recente or 0.0):
+            return
+        self._ultima_reducao = agora
+        anterior = self.limite
+        self.limite = max(self.minimo, self.limite * fator)
+        Metrics.increment("adaptive_concurrency.decreases")
+        logger.info(f"Limite de concorrência reduzido de {anterior:.1f} para {self.limite:.1f}: {motivo}")
+
+    def _publicar(self) -> None:
+        Metrics.set_gauge("adaptive_concurrency.limit", self.limite)
+        Metrics.set_gauge("adaptive_concurrency.in_flight", self.em_andamento)
+
+
+def limitar_concorrencia() -> AsyncContextManager:
+    """
+    Obtém o contexto que limita a concorrência de uma execução dos agentes.
+
+    Returns:
+        O contexto do limitador compartilhado, ou um contexto vazio se ele estiver desativado
+    """
+    limitador = LimitadorConcorrencia.get_default()
+    return limitador.limitar() if limitador is not None else contextlib.nullcontext()
@@ -0,0 +1,224 @@
+"""
+Módulo para limitação da taxa de chamadas à API da OpenAI no lado do cliente.
+
+O limitador controla dois orçamentos, no formato dos limites da OpenAI:
+requisições por minuto (RPM) e tokens por minuto (TPM). Cada orçamento é um
+token bucket que se recompõe continuamente; uma chamada reserva a sua parte dos
+dois e, se algum ficar negativo, espera o tempo necessário para a recomposição.
+Como a reserva é feita na chegada, as chamadas formam uma fila ordenada e são
+espaçadas de forma uniforme, em vez de falharem com 429 e serem repetidas.
+
+O mesmo limitador atende as chamadas assíncronas (SDK de Agentes) e as síncronas
+(API antiga), de modo que os dois caminhos compartilham o mesmo orçamento. Uma
+chamada cuja vez só chegaria depois do prazo da pergunta falha imediatamente,
+devolvendo a sua reserva.
+
+Sem max_tokens na chamada, a saída reservada é o p95 das saídas observadas;
+depois da resposta, a reserva é corrigida com o uso real.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.metrics import Metrics
+from src.prazo import verificar_espera
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("limitador_taxa")
+
+# Saídas observadas necessárias antes de usar o p95 como reserva de tokens de saída
+MIN_AMOSTRAS_SAIDA = 20
+
+
+def tokens_saida_reservados(max_tokens: Optional[int] = None) -> int:
+    """
+    Tokens de saída a reservar para uma chamada.
+
+    Args:
+        max_tokens: Limite de saída enviado na chamada, se houver
+
+    Returns:
+        int: max_tokens; sem ele, o p95 das saídas observadas ou "rate_limit_output_tokens"
+    """
+    if max_tokens:
+        return max_tokens
+    if Metrics.sample_count("rate_limit.output_tokens") >= MIN_AMOSTRAS_SAIDA:
+        return int(Metrics.percentile("rate_limit.output_tokens", 95))
+    return ConfigManager.get_config("nova", "rate_limit_output_tokens")
+
+
+class TokenBucket:
+    """Orçamento que se recompõe a uma taxa constante, com reservas antecipadas."""
+
+    def __init__(self, taxa: float, capacidade: float):
+        """
+        Args:
+            taxa: Unidades recompostas por segundo
+            capacidade: Máximo acumulado (rajada permitida)
+        """
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._nivel = capacidade
+        self._atualizado_em = time.monotonic()
+
+    def _recompor(self, agora: float) -> None:
+        self._nivel = min(self.capacidade, self._nivel + (agora - self._atualizado_em) * self.taxa)
+        self._atualizado_em = agora
+
+    def reservar(self, quantidade: float, agora: float) -> float:
+        """
+        Reserva uma quantidade do orçamento, mesmo que ainda não disponível.
+
+        Args:
+            quantidade: Unidades a reservar
+            agora: Instante atual (time.monotonic())
+
+        Returns:
+            float: Espera (segundos) até que a reserva esteja coberta
+        """
+        self._recompor(agora)
+        self._nivel -= quantidade
+        return max(0.0, -self._nivel / self.taxa)
+
+    def ajustar(self, diferenca: float, agora: float) -> None:
+        """
+        Corrige uma reserva anterior (por exemplo, com o uso real de tokens).
+
+        Args:
+            diferenca: Unidades a mais (positivo) ou a menos (negativo) que o reservado
+            agora: Instante atual (time.monotonic())
+        """
+        self._recompor(agora)
+        self._nivel = min(self.capacidade, self._nivel - diferenca)
+
+
+class LimitadorTaxa:
+    """Limitador de requisições e tokens por minuto, compartilhado pelo processo."""
+
+    _padrao: Optional["LimitadorTaxa"] = None
+    _padrao_lock = threading.Lock()
+
+    def __init__(self, rpm: float, tpm: float, rajada_segundos: float):
+        """
+        Args:
+            rpm: Requisições por minuto
+            tpm: Tokens por minuto
+            rajada_segundos: Segundos de orçamento que podem ser usados de uma vez
+        """
+        self.requisicoes = TokenBucket(rpm / 60, max(1.0, rpm * rajada_segundos / 60))
+        self.tokens = TokenBucket(tpm / 60, max(1.0, tpm * rajada_segundos / 60))
+        self._lock = threading.Lock()
+        # Chamadas que reservaram o orçamento e aguardam a sua vez
+        self._aguardando = 0
+
+    @staticmethod
+    def get_default() -> Optional["LimitadorTaxa"]:
+        """
+        Obtém o limitador configurado em API_CONFIG.
+
+        Returns:
+            O limitador compartilhado, ou None se "rate_limit_enabled" estiver desativado
+        """
+        if not ConfigManager.get_config("nova", "rate_limit_enabled"):
+            return None
+        with LimitadorTaxa._padrao_lock:
+            if LimitadorTaxa._padrao is None:
+                LimitadorTaxa._padrao = LimitadorTaxa(
+                    rpm=ConfigManager.get_config("nova", "rate_limit_rpm"),
+                    tpm=ConfigManager.get_config("nova", "rate_limit_tpm"),
+                    rajada_segundos=ConfigManager.get_config("nova", "rate_limit_burst_seconds"),
+                )
+            return LimitadorTaxa._padrao
+
+    def _reservar(self, tokens: int) -> float:
+        with self._lock:
+            agora = time.monotonic()
+            espera = max(self.requisicoes.reservar(1, agora), self.tokens.reservar(tokens, agora))
+        Metrics.observe("rate_limit.wait", espera)
+        if espera > 0:
+            Metrics.increment("rate_limit.delayed")
+            logger.debug(f"Chamada aguardando {espera:.2f}s pelo limite de taxa ({tokens} tokens estimados)")
+        return espera
+
+    def na_fila(self) -> int:
+        """
+        Returns:
+            int: Número de chamadas aguardando a sua vez
+        """
+        return self._aguardando
+
+    def _esperar_vez(self, delta: int) -> None:
+        with self._lock:
+            self._aguardando += delta
+
+    def _devolver(self, tokens: int) -> None:
+        # Desfaz a reserva de uma chamada que não chegou a ser feita
+        with self._lock:
+            agora = time.monotonic()
+            self.requisicoes.ajustar(-1, agora)
+            self.tokens.ajustar(-tokens, agora)
+
+    async def adquirir(self, tokens: int) -> None:
+        """
+        Aguarda (sem bloquear o event loop) a vez de fazer uma chamada.
+
+        Args:
+            tokens: Tokens estimados da chamada (entrada + saída máxima)
+
+        Raises:
+            DeadlineExceededError: Se a vez da chamada só chegar depois do prazo atual
+        """
+        espera = self._reservar(tokens)
+        if espera > 0:
+            self._esperar_vez(1)
+            try:
+                verificar_espera(espera, "a espera pelo limite de taxa")
+                await asyncio.sleep(espera)
+            except BaseException:
+                self._devolver(tokens)
+                raise
+            finally:
+                self._esperar_vez(-1)
+
+    def adquirir_sync(self, tokens: int) -> None:
+        """
+        Aguarda a vez de fazer uma chamada síncrona (API antiga).
+
+        Args:
+            tokens: Tokens estimados da chamada
+
+        Raises:
+            DeadlineExceededError: Se a vez da chamada só chegar depois do prazo atual
+        """
+        espera = self._reservar(tokens)
+        if espera > 0:
+            try:
+                verificar_espera(espera, "a espera pelo limite de taxa")
+            except BaseException:
+                self._devolver(tokens)
+                raise
+            self._esperar_vez(1)
+            try:
+                time.sleep(espera)
+            finally:
+                self._esperar_vez(-1)
+
+    def registrar_uso(self, estimados: int, reais: int, saida: Optional[int] = None) -> None:
+        """
+        Corrige o orçamento de tokens com o uso real informado pela API.
+
+        Args:
+            estimados: Tokens reservados antes da chamada
+            reais: Tokens efetivamente consumidos
+            saida: Tokens de saída da resposta (usados nas reservas das próximas chamadas)
+        """
+        if saida:
+            Metrics.observe("rate_limit.output_tokens", saida)
+        if reais <= 0:
+            return
+        with self._lock:
+            self.tokens.ajustar(reais - estimados, time.monotonic())
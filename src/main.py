@@ -1,11 +1,24 @@
-from agents import Agent, InputGuardrail, GuardrailFunctionOutput, Runner, trace, RunConfig
+from agents import Agent, InputGuardrail, InputGuardrailTripwireTriggered, GuardrailFunctionOutput, Runner, trace, RunConfig
 from pydantic import BaseModel
 import asyncio
+import time
 import uuid
-from openai import OpenAI
 from src.config_manager import ConfigManager
 from src.logger import Logger
-from src.error_handler import catch_async_errors, APIKeyError, APIConnectionError, ValidationError
+from src.metrics import Metrics
+from src.openai_client import configurar_cliente_padrao
+from src.provedor_modelos import obter_provedor_modelos
+from src.hedging import ModeloComHedge
+from src.limitador_concorrencia import limitar_concorrencia
+from src.prazo import aguardar_com_prazo, com_prazo, limite_para
+from src.guardrail_execucao import agendar_auditoria, aguardar_auditorias, modo_guardrail, verificar_entrada
+from src.error_handler import catch_async_errors, catch_async_generator_errors, APIKeyError, APIConnectionError, DeadlineExceededError, ValidationError
+from src.response_cache import ResponseCache, assinatura_agentes, chave_cache
+from src.semantic_cache import SemanticCache
+from src.triagem_local import registrar_triagem, triagem_local
+from src.execucao_especulativa import executar_com_especulacao
+from src.streaming import EVENTO_DELTA, EVENTO_FIM, transmitir_texto
+from src.single_flight import SingleFlight
 
 # Configurar logger específico para este módulo
 logger = Logger.setup("main")
@@ -20,6 +33,9 @@ else:
     logger.info("API Key detectada e validada")
     print(f"API Key detectada: {api_key[:8]}...")
 
+# Todos os agentes usam o cliente compartilhado, com pool de conexões configurado
+configurar_cliente_padrao()
+
 class HomeworkOutput(BaseModel):
     is_homework: bool
     reasoning: str
@@ -40,6 +56,7 @@ math_tutor_agent = Agent(
         Explique os conceitos de forma clara e didática, mostrando o passo a passo da resolução quando necessário.
         Use uma linguagem adequada para estudantes do ensino médio.
         Ao fim da resposta, forneça o nome do agente especialista que forneceu a resposta.""",
+    model=ModeloComHedge(),
 )
 
 history_tutor_agent = Agent(
@@ -50,13 +67,18 @@ history_tutor_agent = Agent(
         Contextualize os eventos históricos e explique suas causas e consequências.
         Use uma linguagem clara e didática, adequada para estudantes do ensino médio.
         Ao final da sua resposta, inclua a seguinte assinatura: "[Resposta fornecida pelo Especialista em História]""",
+    model=ModeloComHedge(),
 )
 
 
-@catch_async_errors
+@catch_async_errors(endpoint="guardrail")
 async def homework_guardrail(ctx, agent, input_data):
     """Verifica se a pergunta é educacional usando o guardrail agent.
     
+    O comportamento depende de "guardrail_mode": no modo "blocking" a verificação
+    é aguardada e perguntas não educacionais são bloqueadas; no modo "shadow" ela
+    roda em segundo plano apenas para auditoria; no modo "off" não é feita.
+    
     Args:
         ctx: Contexto da execução
         agent: Agente que está sendo executado
@@ -65,23 +87,32 @@ async def homework_guardrail(ctx, agent, input_data):
     Returns:
         GuardrailFunctionOutput: Resultado da verificação
     """
+    modo = modo_guardrail()
+    if modo == "off":
+        return GuardrailFunctionOutput(output_info=None, tripwire_triggered=False)
+    
+    if modo == "shadow":
+        # Fora do caminho da resposta: o veredicto vai apenas para o log de auditoria
+        agendar_auditoria(guardrail_agent, input_data, context=ctx.context)
+        return GuardrailFunctionOutput(output_info=None, tripwire_triggered=False)
+    
     logger.debug(f"Verificando guardrail para input: '{input_data[:30]}{'...' if len(input_data) > 30 else ''}'") 
     
     try:
-        result = await Runner.run(guardrail_agent, input_data, context=ctx.context)
-        final_output = result.final_output_as(HomeworkOutput)
+        final_output = await verificar_entrada(guardrail_agent, input_data, context=ctx.context)
         
         # Registrar resultado da verificação
         logger.info(f"Guardrail resultado: is_homework={final_output.is_homework}")
         
-        # Modificado para sempre permitir a pergunta, independentemente do resultado
         return GuardrailFunctionOutput(
             output_info=final_output,
-            tripwire_triggered=False,  # Sempre permite a pergunta
+            tripwire_triggered=not final_output.is_homework,
         )
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         logger.error(f"Erro no guardrail: {str(e)}")
-        raise APIConnectionError(f"Falha na verificação da pergunta: {str(e)}")
+        raise APIConnectionError(f"Falha na verificação da pergunta: {str(e)}") from e
 
 triage_agent = Agent(
     name="Triage Agent",
@@ -92,29 +123,73 @@ triage_agent = Agent(
     ],
 )
 
-@catch_async_errors
-async def processar_pergunta(pergunta):
-    """
-    Processa uma pergunta usando o agente de triagem e retorna a resposta.
-    
-    Args:
-        pergunta (str): A pergunta a ser processada.
-        
-    Returns:
-        tuple[str, str]: (resposta do agente especialista, ID do trace)
-        
-    Raises:
-        ValidationError: Se a pergunta for inválida
-        APIConnectionError: Se houver problemas de conexão com a API
-        APIKeyError: Se a chave da API não estiver configurada
-    """
-    # Validar entrada
+# Especialistas que podem ser escolhidos pela triagem local
+ESPECIALISTAS = [history_tutor_agent, math_tutor_agent]
+
+# Termos típicos de cada especialista, usados como exemplos iniciais da triagem local
+PALAVRAS_CHAVE_TRIAGEM = {
+    math_tutor_agent.name: """equação equações calcular cálculo resolver número números soma subtração
+        multiplicação divisão fração frações porcentagem potência raiz quadrada logaritmo
+        função funções gráfico área perímetro volume triângulo triângulos círculo ângulo
+        seno cosseno tangente matriz probabilidade média mediana polinômio derivada""",
+    history_tutor_agent.name: """história histórico século império imperador rei rainha guerra guerras
+        revolução revoluções independência república colônia colonização escravidão abolição
+        ditadura governo presidente era idade média antiga moderna contemporânea civilização
+        descobrimento batalha tratado brasil portugal grécia roma egito feudalismo""",
+}
+
+# Assinatura da configuração dos agentes, usada nas chaves do cache de respostas
+ASSINATURA_AGENTES = assinatura_agentes(triage_agent, guardrail_agent)
+
+# Perguntas idênticas em processamento, compartilhadas entre chamadas simultâneas
+_perguntas_em_andamento = SingleFlight("perguntas")
+
+def _validar_pergunta(pergunta):
     if not pergunta or not isinstance(pergunta, str) or len(pergunta.strip()) == 0:
         logger.error("Tentativa de processar pergunta vazia")
         raise ValidationError("A pergunta não pode estar vazia")
+
+
+def _buscar_em_cache(pergunta):
+    """Procura a resposta no cache exato e, em seguida, no cache semântico."""
+    if not ConfigManager.get_config("nova", "response_cache_enabled"):
+        return None
+    
+    cache = ResponseCache.get_default()
+    em_cache = cache.get(chave_cache(pergunta, ASSINATURA_AGENTES))
+    if em_cache is not None:
+        logger.info(f"Resposta obtida do cache (trace original: {em_cache.trace_id})")
+        return em_cache
     
-    # Gerar ID único para o trace
-    trace_id = f"trace_{uuid.uuid4().hex}"
+    # Procurar uma pergunta quase idêntica já respondida
+    if ConfigManager.get_config("nova", "semantic_cache_enabled"):
+        for chave_semelhante, similaridade in SemanticCache.get_default().lookup(pergunta):
+            em_cache = cache.get(chave_semelhante, record_miss=False)
+            if em_cache is not None:
+                Metrics.increment("semantic_cache.hits")
+                logger.info(f"Resposta obtida do cache semântico (similaridade {similaridade:.2f}, "
+                            f"trace original: {em_cache.trace_id})")
+                return em_cache
+        Metrics.increment("semantic_cache.misses")
+    return None
+
+
+def _armazenar_em_cache(pergunta, resposta, trace_id):
+    if not ConfigManager.get_config("nova", "response_cache_enabled"):
+        return
+    chave = chave_cache(pergunta, ASSINATURA_AGENTES)
+    ResponseCache.get_default().put(chave, resposta, trace_id)
+    if ConfigManager.get_config("nova", "semantic_cache_enabled"):
+        SemanticCache.get_default().add(pergunta, chave)
+
+
+def _novo_trace_id():
+    return f"trace_{uuid.uuid4().hex}"
+
+
+def _criar_run_config(pergunta, trace_id=None):
+    """Gera (se não informado) o ID do trace e a configuração de execução."""
+    trace_id = trace_id or _novo_trace_id()
     group_id = ConfigManager.get_config("nova", "trace_group_id")
     workflow_name = ConfigManager.get_config("nova", "trace_workflow_name")
 
@@ -123,24 +198,182 @@ async def processar_pergunta(pergunta):
         trace_id=trace_id,
         workflow_name=workflow_name,
         group_id=group_id,
-        trace_include_sensitive_data=True
+        trace_include_sensitive_data=True,
+        model_provider=obter_provedor_modelos(),
     )
     
     logger.info(f"Processando pergunta: '{pergunta[:30]}{'...' if len(pergunta) > 30 else ''}'")
     logger.info(f"Trace ID: {trace_id}")
     print(f"[TRACE] ID: {trace_id}")
+    return run_config, trace_id
+
+
+async def _escolher_agente(pergunta, run_config):
+    """Triagem local: perguntas classificadas com confiança vão direto ao especialista."""
+    # (em uma thread: a primeira chamada treina o classificador com as conversas armazenadas)
+    especialista = await asyncio.to_thread(triagem_local, pergunta, ESPECIALISTAS, PALAVRAS_CHAVE_TRIAGEM)
+    if especialista is not None:
+        # O guardrail da triagem continua valendo no caminho direto
+        run_config.input_guardrails = list(triage_agent.input_guardrails)
+    return especialista
+
+
+@catch_async_errors(endpoint="responses")
+async def _executar_pergunta(pergunta, trace_id):
+    """Executa os agentes para a pergunta e armazena a resposta no cache.
+    
+    Falhas transitórias da API são repetidas com backoff (ver src/resiliencia.py).
+    """
+    run_config, trace_id = _criar_run_config(pergunta, trace_id)
+    especialista = await _escolher_agente(pergunta, run_config)
     
     try:
         # Executar a pergunta com trace
+        inicio = time.perf_counter()
         with trace(run_config.workflow_name):
-            result = await Runner.run(triage_agent, pergunta, run_config=run_config)
+            async with limitar_concorrencia():
+                if especialista is not None:
+                    execucao = Runner.run(especialista, pergunta, run_config=run_config)
+                else:
+                    # Triagem pelo modelo, com o especialista provável especulado em paralelo (se ativado)
+                    execucao = executar_com_especulacao(triage_agent, pergunta, run_config,
+                                                        ESPECIALISTAS, PALAVRAS_CHAVE_TRIAGEM)
+                result = await aguardar_com_prazo(execucao, "a execução dos agentes")
+        registrar_triagem(pergunta, result.last_agent.name, time.perf_counter() - inicio,
+                          caminho_rapido=especialista is not None)
         
         logger.info("Resposta obtida com sucesso")
+        _armazenar_em_cache(pergunta, result.final_output, trace_id)
         # Retornar a resposta e o ID do trace
         return result.final_output, trace_id
+    except InputGuardrailTripwireTriggered:
+        logger.warning("Pergunta bloqueada pelo guardrail")
+        raise ValidationError("A pergunta não foi reconhecida como uma pergunta educacional")
+    except DeadlineExceededError:
+        logger.warning("Prazo da pergunta esgotado")
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao processar pergunta: {str(e)}")
+        raise APIConnectionError(f"Falha na comunicação com a API da OpenAI: {str(e)}") from e
+
+@catch_async_errors
+async def processar_pergunta(pergunta, prazo=None):
+    """
+    Processa uma pergunta usando o agente de triagem e retorna a resposta.
+    
+    Perguntas idênticas (após normalização) processadas ao mesmo tempo são
+    agrupadas: apenas a primeira aciona os agentes e as demais aguardam o seu
+    resultado, cada uma com o próprio ID de trace, que referencia o trace da
+    execução compartilhada.
+    
+    O prazo vale para todo o processamento (guardrail, triagem, especialista e
+    novas tentativas); quando ele acaba, a execução em andamento é cancelada.
+    
+    Args:
+        pergunta (str): A pergunta a ser processada.
+        prazo (float, opcional): Prazo em segundos para a resposta (padrão: "request_deadline").
+        
+    Returns:
+        tuple[str, str]: (resposta do agente especialista, ID do trace)
+        
+    Raises:
+        ValidationError: Se a pergunta for inválida
+        APIConnectionError: Se houver problemas de conexão com a API
+        APIKeyError: Se a chave da API não estiver configurada
+        DeadlineExceededError: Se o prazo acabar antes da resposta
+    """
+    # Validar entrada
+    _validar_pergunta(pergunta)
+    
+    # Consultar o cache de respostas antes de acionar os agentes
+    em_cache = _buscar_em_cache(pergunta)
+    if em_cache is not None:
+        return em_cache.resposta, em_cache.trace_id
+    
+    trace_id = _novo_trace_id()
+    with com_prazo(limite_para(prazo)):
+        if not ConfigManager.get_config("nova", "request_coalescing_enabled"):
+            return await _executar_pergunta(pergunta, trace_id)
+        
+        # Cada chamada aguarda a execução compartilhada apenas até o próprio prazo
+        chave = chave_cache(pergunta, ASSINATURA_AGENTES)
+        (resposta, trace_lider), lider = await _perguntas_em_andamento.executar(
+            chave, lambda: _executar_pergunta(pergunta, trace_id)
+        )
+    if not lider:
+        # Trace próprio desta chamada, apontando para a execução compartilhada
+        with trace(ConfigManager.get_config("nova", "trace_workflow_name"), trace_id=trace_id,
+                   group_id=ConfigManager.get_config("nova", "trace_group_id"),
+                   metadata={"trace_compartilhado": trace_lider}):
+            pass
+        logger.info(f"Pergunta idêntica em andamento: trace {trace_id} reaproveitou o resultado do trace {trace_lider}")
+    return resposta, trace_id
+
+@catch_async_generator_errors
+async def processar_pergunta_stream(pergunta, prazo=None):
+    """
+    Processa uma pergunta como processar_pergunta, transmitindo a resposta em streaming.
+    
+    Falhas transitórias antes do primeiro trecho da resposta são repetidas com backoff.
+    
+    Args:
+        pergunta (str): A pergunta a ser processada.
+        prazo (float, opcional): Prazo em segundos para a resposta (padrão: "request_deadline").
+        
+    Yields:
+        tuple[str, Any]: ("delta", trecho da resposta) à medida que o texto é gerado e,
+        ao final, ("fim", (resposta completa, ID do trace))
+        
+    Raises:
+        ValidationError: Se a pergunta for inválida
+        APIConnectionError: Se houver problemas de conexão com a API
+        APIKeyError: Se a chave da API não estiver configurada
+        DeadlineExceededError: Se o prazo acabar antes da resposta
+    """
+    # O prazo é definido antes das novas tentativas, que não o renovam
+    with com_prazo(limite_para(prazo)):
+        async for evento in _transmitir_pergunta(pergunta):
+            yield evento
+
+@catch_async_generator_errors(endpoint="responses")
+async def _transmitir_pergunta(pergunta):
+    """Executa os agentes em streaming para processar_pergunta_stream."""
+    # Validar entrada
+    _validar_pergunta(pergunta)
+    inicio = time.perf_counter()
+    
+    # Respostas em cache são entregues de uma só vez
+    em_cache = _buscar_em_cache(pergunta)
+    if em_cache is not None:
+        Metrics.observe("stream.ttft", time.perf_counter() - inicio)
+        yield EVENTO_DELTA, em_cache.resposta
+        yield EVENTO_FIM, (em_cache.resposta, em_cache.trace_id)
+        return
+    
+    run_config, trace_id = _criar_run_config(pergunta)
+    especialista = await _escolher_agente(pergunta, run_config)
+    
+    try:
+        # O runner em streaming abre o trace com o trace_id configurado
+        async with limitar_concorrencia():
+            result = Runner.run_streamed(especialista or triage_agent, pergunta, run_config=run_config)
+            async for delta in transmitir_texto(result, inicio):
+                yield EVENTO_DELTA, delta
+        registrar_triagem(pergunta, result.last_agent.name, time.perf_counter() - inicio,
+                          caminho_rapido=especialista is not None)
+    except InputGuardrailTripwireTriggered:
+        logger.warning("Pergunta bloqueada pelo guardrail")
+        raise ValidationError("A pergunta não foi reconhecida como uma pergunta educacional")
+    except DeadlineExceededError:
+        logger.warning("Prazo da pergunta esgotado")
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar pergunta: {str(e)}")
-        raise APIConnectionError(f"Falha na comunicação com a API da OpenAI: {str(e)}")
+        raise APIConnectionError(f"Falha na comunicação com a API da OpenAI: {str(e)}") from e
+    
+    logger.info("Resposta obtida com sucesso")
+    _armazenar_em_cache(pergunta, result.final_output, trace_id)
+    yield EVENTO_FIM, (result.final_output, trace_id)
 
 async def main():
     """Função principal para testar o processamento de perguntas."""
@@ -157,6 +390,9 @@ async def main():
         print(resposta)
         print(f"\n[TRACE] Você pode visualizar o trace completo no painel da OpenAI usando o ID: {trace_id}\n")
         logger.info(f"Teste concluído com sucesso. Trace ID: {trace_id}")
+        
+        # Concluir as verificações do guardrail em segundo plano antes de encerrar
+        await aguardar_auditorias()
     except Exception as e:
         logger.error(f"Erro durante o teste: {str(e)}", exc_info=True)
         print(f"\nOcorreu um erro durante o teste: {str(e)}")
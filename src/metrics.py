@@ -0,0 +1,146 @@
+"""
+Módulo para coleta de métricas de uso e desempenho do sistema.
+
+Este módulo implementa um registro simples, em memória, de contadores, medidores
+(gauges) e observações de latência, usado para comparar o comportamento das
+otimizações (caches, limitadores, execução especulativa etc.).
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from src.logger import Logger
+
+# Configurar logger específico para métricas
+metrics_logger = Logger.setup("metricas")
+
+# Número de observações recentes mantidas por métrica para o cálculo de percentis
+MAX_SAMPLES = 1000
+
+
+class Metrics:
+    """Registro de métricas do processo."""
+
+    _lock = threading.Lock()
+    _counters: Dict[str, float] = {}
+    _gauges: Dict[str, float] = {}
+    _samples: Dict[str, deque] = {}
+
+    @staticmethod
+    def increment(name: str, value: float = 1) -> None:
+        """
+        Incrementa um contador.
+
+        Args:
+            name: Nome do contador
+            value: Valor a ser somado (padrão 1)
+        """
+        with Metrics._lock:
+            Metrics._counters[name] = Metrics._counters.get(name, 0) + value
+
+    @staticmethod
+    def set_gauge(name: str, value: float) -> None:
+        """
+        Define o valor atual de um medidor.
+
+        Args:
+            name: Nome do medidor
+            value: Valor atual
+        """
+        with Metrics._lock:
+            Metrics._gauges[name] = value
+
+    @staticmethod
+    def observe(name: str, value: float) -> None:
+        """
+        Registra uma observação (por exemplo, uma latência em segundos).
+
+        Args:
+            name: Nome da métrica
+            value: Valor observado
+        """
+        with Metrics._lock:
+            samples = Metrics._samples.get(name)
+            if samples is None:
+                samples = Metrics._samples[name] = deque(maxlen=MAX_SAMPLES)
+            samples.append(value)
+
+    @staticmethod
+    def get_counter(name: str) -> float:
+        with Metrics._lock:
+            return Metrics._counters.get(name, 0)
+
+    @staticmethod
+    def get_gauge(name: str) -> Optional[float]:
+        with Metrics._lock:
+            return Metrics._gauges.get(name)
+
+    @staticmethod
+    def sample_count(name: str) -> int:
+        with Metrics._lock:
+            return len(Metrics._samples.get(name, ()))
+
+    @staticmethod
+    def mean(name: str) -> Optional[float]:
+        """
+        Calcula a média das observações recentes de uma métrica.
+
+        Args:
+            name: Nome da métrica
+
+        Returns:
+            A média ou None se não houver observações
+        """
+        with Metrics._lock:
+            samples = Metrics._samples.get(name)
+            if not samples:
+                return None
+            return sum(samples) / len(samples)
+
+    @staticmethod
+    def percentile(name: str, q: float) -> Optional[float]:
+        """
+        Calcula um percentil das observações recentes de uma métrica.
+
+        Args:
+            name: Nome da métrica
+            q: Percentil desejado, entre 0 e 100
+
+        Returns:
+            O valor do percentil ou None se não houver observações
+        """
+        with Metrics._lock:
+            samples = sorted(Metrics._samples.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        """
+        Obtém uma cópia de todas as métricas registradas.
+
+        Returns:
+            Dicionário com contadores, medidores e resumo das observações
+        """
+        with Metrics._lock:
+            observations = {
+                name: {
+                    "count": len(samples),
+                    "mean": sum(samples) / len(samples),
+                    "max": max(samples),
+                }
+                for name, samples in Metrics._samples.items() if samples
+            }
+            return {
+                "counters": dict(Metrics._counters),
+                "gauges": dict(Metrics._gauges),
+                "observations": observations,
+            }
+
+    @staticmethod
+    def log_snapshot() -> None:
+        """Registra no log o estado atual de todas as métricas."""
+        metrics_logger.info(f"Métricas: {Metrics.snapshot()}")
@@ -11,8 +11,12 @@ e permite o encaminhamento de perguntas para agentes especialistas.
 import json
 import time
 import os
+import sys
 from typing import Dict, List, Optional, Tuple, Any
-from openai import OpenAI
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.openai_client import obter_cliente_sync
 
 # Constantes
 THREAD_ID = "thread_0mIOj6RDNNeK4Bv3UTk2ZyA2"
@@ -46,9 +50,9 @@ def verificar_api_key():
     print(f"API Key detectada: {api_key[:8]}...")
     return True
 
-# Inicialização do cliente OpenAI
+# Inicialização do cliente OpenAI (compartilhado)
 try:
-    client = OpenAI()
+    client = obter_cliente_sync()
 except Exception as e:
     print(f"Erro ao inicializar o cliente OpenAI: {e}")
 
@@ -5,7 +5,13 @@ Este módulo contém a inicialização do cliente OpenAI e funções relacionada
 """
 
 import os
-from openai import OpenAI
+import sys
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.limitador_taxa import LimitadorTaxa, tokens_saida_reservados
+from src.openai_client import obter_cliente_sync
 
 def verificar_api_key():
     """Verifica se a chave da API da OpenAI está configurada.
@@ -23,9 +29,29 @@ def verificar_api_key():
     print(f"API Key detectada: {api_key[:8]}...")
     return True
 
-# Inicialização do cliente OpenAI
+# Cliente OpenAI compartilhado (mesmo pool de conexões do restante do sistema)
 try:
-    client = OpenAI()
+    client = obter_cliente_sync()
 except Exception as e:
     print(f"Erro ao inicializar o cliente OpenAI: {e}")
     client = None
+
+
+def aguardar_limite_taxa(tokens_entrada: int = 0, gera_resposta: bool = False) -> None:
+    """Aguarda a vez de fazer uma chamada, respeitando o limitador de taxa compartilhado.
+    
+    Args:
+        tokens_entrada: Tokens estimados do conteúdo enviado.
+        gera_resposta: Se True, a chamada inicia a geração de uma resposta e os
+                       tokens de saída estimados também são reservados.
+    
+    Raises:
+        DeadlineExceededError: Se a vez da chamada só chegar depois do prazo da pergunta.
+    """
+    limitador = LimitadorTaxa.get_default()
+    if limitador is None:
+        return
+    tokens = tokens_entrada
+    if gera_resposta:
+        tokens += tokens_saida_reservados()
+    limitador.adquirir_sync(tokens)
@@ -21,3 +21,6 @@ STATUS_FINALIZADOS = ["completed", "failed", "cancelled", "expired"]
 
 # Tempo de espera entre verificações de status (em segundos)
 TEMPO_ESPERA = 1
+
+# Endpoint usado nas novas tentativas e no circuit breaker (ver src/resiliencia.py)
+ENDPOINT = "assistants"
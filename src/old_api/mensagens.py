@@ -5,8 +5,10 @@ Este módulo contém funções para criar e recuperar mensagens de threads.
 """
 
 from typing import Optional, List
-from .client import client
-from .config import TEMPO_ESPERA
+from .client import client, aguardar_limite_taxa
+from .config import TEMPO_ESPERA, ENDPOINT
+from src.resiliencia import executar_com_retry
+from src.tokenizador import contar_tokens
 
 def criar_mensagem(thread_id: str, conteudo: str) -> dict:
     """Cria uma nova mensagem no thread especificado.
@@ -22,7 +24,10 @@ def criar_mensagem(thread_id: str, conteudo: str) -> dict:
         Exception: Se ocorrer um erro ao criar a mensagem.
     """
     try:
-        mensagem = client.beta.threads.messages.create(
+        aguardar_limite_taxa(contar_tokens(conteudo))
+        mensagem = executar_com_retry(
+            ENDPOINT,
+            client.beta.threads.messages.create,
             thread_id=thread_id,
             role="user",
             content=conteudo
@@ -43,7 +48,9 @@ def obter_ultima_resposta_assistente(thread_id: str) -> Optional[str]:
     """
     try:
         # Listar mensagens do thread, ordenadas por data de criação (mais recentes primeiro)
-        mensagens = client.beta.threads.messages.list(
+        mensagens = executar_com_retry(
+            ENDPOINT,
+            client.beta.threads.messages.list,
             thread_id=thread_id,
             order="desc"
         )
@@ -15,7 +15,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from src.config_manager import ConfigManager
 from src.logger import Logger
-from src.error_handler import catch_errors, APIKeyError, APIConnectionError, ValidationError
+from src.error_handler import catch_errors, APIKeyError, APIConnectionError, DeadlineExceededError, ValidationError
+from src.prazo import com_prazo, limite_para
 
 # Importações internas do módulo old_api
 from .client import verificar_api_key
@@ -63,7 +64,7 @@ def extrair_run_id_de_erro(mensagem_erro: str) -> str:
 
 
 @catch_errors
-def processar_pergunta(pergunta: str) -> str:
+def processar_pergunta(pergunta: str, prazo: Optional[float] = None) -> str:
     """Processa uma pergunta usando a API antiga da OpenAI.
     
     Este é o ponto de entrada principal para processar perguntas.
@@ -71,6 +72,7 @@ def processar_pergunta(pergunta: str) -> str:
     
     Args:
         pergunta: A pergunta a ser processada.
+        prazo: Prazo em segundos para a resposta (padrão: "request_deadline").
         
     Returns:
         A resposta do assistente especialista.
@@ -79,7 +81,13 @@ def processar_pergunta(pergunta: str) -> str:
         ValidationError: Se a pergunta for inválida
         APIKeyError: Se a chave da API não estiver configurada
         APIConnectionError: Se houver problemas de conexão com a API
+        DeadlineExceededError: Se o prazo acabar antes da resposta (o run em andamento é cancelado)
     """
+    with com_prazo(limite_para(prazo)):
+        return _processar_pergunta(pergunta)
+
+
+def _processar_pergunta(pergunta: str) -> str:
     # Validar entrada
     if not pergunta or not isinstance(pergunta, str) or len(pergunta.strip()) == 0:
         logger.error("Tentativa de processar pergunta vazia")
@@ -210,6 +218,8 @@ def processar_pergunta(pergunta: str) -> str:
                     logger.error("Não foi possível obter a resposta do especialista")
                     raise APIConnectionError("Não foi possível obter a resposta do especialista")
                     
+            except DeadlineExceededError:
+                raise
             except Exception as e:
                 logger.error(f"Erro ao processar com o especialista: {str(e)}", exc_info=True)
                 raise APIConnectionError(f"Erro ao processar com o especialista: {str(e)}")
@@ -218,6 +228,9 @@ def processar_pergunta(pergunta: str) -> str:
             logger.error(f"O run terminou com status inesperado: {run.status}")
             raise APIConnectionError(f"O run terminou com status inesperado: {run.status}")
     
+    except DeadlineExceededError:
+        logger.warning("Prazo da pergunta esgotado")
+        raise
     except Exception as e:
         # Capturar e registrar qualquer erro que ocorra durante o processamento
         logger.error(f"Erro inesperado ao processar a pergunta: {str(e)}", exc_info=True)
@@ -6,8 +6,13 @@ Este módulo contém funções para criar, monitorar e interagir com runs.
 
 import time
 from typing import Dict, Any, Optional
-from .client import client
-from .config import STATUS_EM_ANDAMENTO, STATUS_FINALIZADOS, TEMPO_ESPERA
+from .client import client, aguardar_limite_taxa
+from .config import STATUS_EM_ANDAMENTO, STATUS_FINALIZADOS, TEMPO_ESPERA, ENDPOINT
+from src.error_handler import DeadlineExceededError
+from src.metrics import Metrics
+from src.prazo import com_prazo, limite_para, tempo_restante
+from src.resiliencia import executar_com_retry
+from src.tokenizador import contar_tokens
 
 def criar_run(thread_id: str, assistant_id: str) -> Any:
     """Cria um novo run com o assistente especificado.
@@ -23,7 +28,10 @@ def criar_run(thread_id: str, assistant_id: str) -> Any:
         Exception: Se ocorrer um erro ao criar o run.
     """
     try:
-        run = client.beta.threads.runs.create(
+        aguardar_limite_taxa(gera_resposta=True)
+        run = executar_com_retry(
+            ENDPOINT,
+            client.beta.threads.runs.create,
             thread_id=thread_id,
             assistant_id=assistant_id
         )
@@ -32,7 +40,8 @@ def criar_run(thread_id: str, assistant_id: str) -> Any:
         print(f"Erro ao criar run: {e}")
         raise
 
-def aguardar_run(thread_id: str, run_id: str, aguardar_conclusao: bool = False) -> Any:
+def aguardar_run(thread_id: str, run_id: str, aguardar_conclusao: bool = False,
+                 prazo: Optional[float] = None) -> Any:
     """Aguarda até que o run atinja um estado específico.
     
     Args:
@@ -40,11 +49,30 @@ def aguardar_run(thread_id: str, run_id: str, aguardar_conclusao: bool = False)
         run_id: ID do run a ser monitorado.
         aguardar_conclusao: Se True, aguarda até que o run seja concluído.
                            Se False, retorna quando o run requer ação.
+        prazo: Prazo em segundos (padrão: o prazo da pergunta em andamento
+               ou "request_deadline").
         
     Returns:
         Objeto do run atualizado.
+        
+    Raises:
+        DeadlineExceededError: Se o prazo acabar antes; o run é cancelado na API.
     """
+    with com_prazo(limite_para(prazo)):
+        return _aguardar_run(thread_id, run_id, aguardar_conclusao)
+
+
+def _aguardar_run(thread_id: str, run_id: str, aguardar_conclusao: bool) -> Any:
     while True:
+        restante = tempo_restante()
+        if restante is not None and restante <= 0:
+            # Cancelar o run para não deixá-lo consumindo tokens e bloqueando o thread
+            Metrics.increment("deadline.exceeded")
+            cancelar_run(thread_id, run_id)
+            raise DeadlineExceededError(f"Prazo esgotado aguardando o run {run_id}",
+                                        {"etapa": "a espera pelo run", "run_id": run_id})
+        espera = TEMPO_ESPERA if restante is None else min(TEMPO_ESPERA, restante)
+        
         try:
             run = client.beta.threads.runs.retrieve(
                 thread_id=thread_id,
@@ -62,7 +90,7 @@ def aguardar_run(thread_id: str, run_id: str, aguardar_conclusao: bool = False)
             # Se o run ainda está em andamento, aguardar e verificar novamente
             if run.status in STATUS_EM_ANDAMENTO:
                 print(f"Run em andamento. Status: {run.status}")
-                time.sleep(TEMPO_ESPERA)
+                time.sleep(espera)
                 continue
             
             # Status desconhecido
@@ -71,7 +99,7 @@ def aguardar_run(thread_id: str, run_id: str, aguardar_conclusao: bool = False)
             
         except Exception as e:
             print(f"Erro ao recuperar status do run: {e}")
-            time.sleep(TEMPO_ESPERA)
+            time.sleep(espera)
 
 def submeter_resposta_ferramenta(thread_id: str, run_id: str, tool_call_id: str, output: str = "") -> None:
     """Submete uma resposta para uma chamada de ferramenta.
@@ -86,7 +114,10 @@ def submeter_resposta_ferramenta(thread_id: str, run_id: str, tool_call_id: str,
         Exception: Se ocorrer um erro ao submeter a resposta.
     """
     try:
-        client.beta.threads.runs.submit_tool_outputs(
+        aguardar_limite_taxa(contar_tokens(output), gera_resposta=True)
+        executar_com_retry(
+            ENDPOINT,
+            client.beta.threads.runs.submit_tool_outputs,
             thread_id=thread_id,
             run_id=run_id,
             tool_outputs=[
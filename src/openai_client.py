@@ -0,0 +1,126 @@
+"""
+Módulo com os clientes compartilhados da API da OpenAI.
+
+Todos os pontos do sistema que falam com a OpenAI usam os clientes criados aqui,
+em vez de instanciar o seu próprio: o cliente assíncrono é registrado como
+cliente padrão da SDK de Agentes, e o cliente síncrono atende o código da API
+antiga (Assistants API). Os dois usam um pool de conexões HTTP com keep-alive,
+limites e timeouts definidos em API_CONFIG, e HTTP/2 quando o pacote "h2" está
+instalado.
+"""
+
+import os
+import sys
+import threading
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("openai_client")
+
+_cliente_async: Optional[AsyncOpenAI] = None
+_cliente_sync: Optional[OpenAI] = None
+_lock = threading.Lock()
+
+
+def http2_disponivel() -> bool:
+    """
+    Verifica se o HTTP/2 pode ser usado (requer o pacote opcional "h2").
+
+    Returns:
+        bool: True se o HTTP/2 está habilitado na configuração e disponível
+    """
+    if not ConfigManager.get_config("nova", "http2_enabled"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _opcoes_http() -> dict:
+    """Parâmetros do pool de conexões, comuns aos clientes síncrono e assíncrono."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=ConfigManager.get_config("nova", "http_max_connections"),
+            max_keepalive_connections=ConfigManager.get_config("nova", "http_max_keepalive_connections"),
+            keepalive_expiry=ConfigManager.get_config("nova", "http_keepalive_expiry"),
+        ),
+        "timeout": httpx.Timeout(
+            ConfigManager.get_config("nova", "http_timeout"),
+            connect=ConfigManager.get_config("nova", "http_connect_timeout"),
+        ),
+        "http2": http2_disponivel(),
+        "follow_redirects": True,
+    }
+
+
+def _novas_tentativas_cliente() -> int:
+    # Com a camada de resiliência ativa (src/resiliencia.py), ela é a única política de
+    # novas tentativas: tentativas internas do cliente ignorariam o circuit breaker,
+    # os limitadores de taxa e de concorrência e multiplicariam o número de chamadas
+    if ConfigManager.get_config("nova", "retry_max_attempts") > 1:
+        return 0
+    return ConfigManager.get_config("nova", "openai_max_retries")
+
+
+def obter_cliente_async() -> AsyncOpenAI:
+    """
+    Obtém (e cria na primeira chamada) o cliente assíncrono compartilhado.
+
+    Returns:
+        AsyncOpenAI com o pool de conexões configurado
+    """
+    global _cliente_async
+    with _lock:
+        if _cliente_async is None:
+            opcoes = _opcoes_http()
+            _cliente_async = AsyncOpenAI(
+                http_client=httpx.AsyncClient(**opcoes),
+                max_retries=_novas_tentativas_cliente(),
+            )
+            logger.info(f"Cliente OpenAI assíncrono criado (HTTP/2: {'sim' if opcoes['http2'] else 'não'})")
+        return _cliente_async
+
+
+def obter_cliente_sync() -> OpenAI:
+    """
+    Obtém (e cria na primeira chamada) o cliente síncrono compartilhado, usado
+    pelo código da API antiga.
+
+    Returns:
+        OpenAI com o pool de conexões configurado
+    """
+    global _cliente_sync
+    with _lock:
+        if _cliente_sync is None:
+            opcoes = _opcoes_http()
+            _cliente_sync = OpenAI(
+                http_client=httpx.Client(**opcoes),
+                max_retries=_novas_tentativas_cliente(),
+            )
+            logger.info(f"Cliente OpenAI síncrono criado (HTTP/2: {'sim' if opcoes['http2'] else 'não'})")
+        return _cliente_sync
+
+
+def configurar_cliente_padrao() -> AsyncOpenAI:
+    """
+    Registra o cliente assíncrono compartilhado como cliente padrão da SDK de Agentes.
+
+    Returns:
+        O cliente registrado
+    """
+    from agents import set_default_openai_client
+
+    cliente = obter_cliente_async()
+    set_default_openai_client(cliente)
+    return cliente
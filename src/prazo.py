@@ -0,0 +1,151 @@
+"""
+Módulo para prazos (deadlines) de ponta a ponta no processamento das perguntas.
+
+O prazo de uma pergunta é definido uma única vez, na entrada da função de
+processamento, e propagado por uma variável de contexto (contextvars): as
+tarefas criadas a partir dali (execução dos agentes, guardrail, chamadas ao
+modelo) herdam o mesmo instante-limite. Cada espera dentro do pipeline usa o
+tempo que ainda resta e, quando ele acaba, a operação em andamento é cancelada
+e DeadlineExceededError é lançada, liberando as vagas de concorrência e as
+conexões sem esperar pela resposta do modelo.
+"""
+
+import asyncio
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional
+
+from src.config_manager import ConfigManager
+from src.error_handler import DeadlineExceededError
+from src.metrics import Metrics
+
+# Instante-limite (time.monotonic) da operação em andamento
+_limite: ContextVar[Optional[float]] = ContextVar("prazo_limite", default=None)
+
+
+def limite_para(prazo: Optional[float] = None) -> Optional[float]:
+    """
+    Converte um prazo relativo em instante-limite.
+
+    Args:
+        prazo: Prazo em segundos a partir de agora (padrão: "request_deadline")
+
+    Returns:
+        Instante-limite (time.monotonic) ou None se não houver prazo
+    """
+    if prazo is None:
+        prazo = ConfigManager.get_config("nova", "request_deadline")
+    if prazo is None:
+        return None
+    return time.monotonic() + prazo
+
+
+@contextlib.contextmanager
+def com_prazo(limite: Optional[float]) -> Iterator[None]:
+    """
+    Aplica um instante-limite às operações executadas dentro do bloco.
+
+    Um prazo já definido por quem chamou nunca é estendido: vale o menor dos dois.
+    O valor anterior é restaurado com set (e não com reset), para que o bloco
+    possa ser usado dentro de geradores assíncronos, que podem ser finalizados
+    em outro contexto.
+
+    Args:
+        limite: Instante-limite (time.monotonic) ou None para manter o prazo atual
+    """
+    atual = _limite.get()
+    if limite is None or (atual is not None and atual <= limite):
+        yield
+        return
+    _limite.set(limite)
+    try:
+        yield
+    finally:
+        _limite.set(atual)
+
+
+@contextlib.contextmanager
+def sem_prazo() -> Iterator[None]:
+    """Remove o prazo dentro do bloco (para tarefas em segundo plano, como auditorias)."""
+    atual = _limite.get()
+    _limite.set(None)
+    try:
+        yield
+    finally:
+        _limite.set(atual)
+
+
+def tempo_restante() -> Optional[float]:
+    """
+    Returns:
+        Segundos até o fim do prazo atual (negativo se já passou), ou None se não houver prazo
+    """
+    limite = _limite.get()
+    return None if limite is None else limite - time.monotonic()
+
+
+def _prazo_esgotado(etapa: str) -> DeadlineExceededError:
+    Metrics.increment("deadline.exceeded")
+    return DeadlineExceededError(f"Prazo esgotado durante {etapa}", {"etapa": etapa})
+
+
+def verificar_prazo(etapa: str) -> None:
+    """
+    Verifica se ainda há tempo antes de iniciar uma etapa.
+
+    Args:
+        etapa: Descrição da etapa (usada na mensagem de erro)
+
+    Raises:
+        DeadlineExceededError: Se o prazo já passou
+    """
+    restante = tempo_restante()
+    if restante is not None and restante <= 0:
+        raise _prazo_esgotado(etapa)
+
+
+def verificar_espera(espera: float, etapa: str) -> None:
+    """
+    Verifica se uma espera conhecida de antemão termina antes do fim do prazo.
+
+    Args:
+        espera: Duração da espera (segundos)
+        etapa: Descrição da etapa (usada na mensagem de erro)
+
+    Raises:
+        DeadlineExceededError: Se o prazo acabar antes do fim da espera
+    """
+    restante = tempo_restante()
+    if restante is not None and espera >= restante:
+        raise _prazo_esgotado(etapa)
+
+
+async def aguardar_com_prazo(aguardavel: Awaitable[Any], etapa: str) -> Any:
+    """
+    Aguarda uma operação, cancelando-a se o prazo atual acabar antes.
+
+    Args:
+        aguardavel: Corrotina ou outro objeto aguardável
+        etapa: Descrição da etapa (usada na mensagem de erro)
+
+    Returns:
+        O resultado da operação
+
+    Raises:
+        DeadlineExceededError: Se o prazo acabar antes da conclusão
+    """
+    restante = tempo_restante()
+    if restante is None:
+        return await aguardavel
+    if restante <= 0:
+        if asyncio.iscoroutine(aguardavel):
+            aguardavel.close()
+        raise _prazo_esgotado(etapa)
+    try:
+        return await asyncio.wait_for(aguardavel, restante)
+    except asyncio.TimeoutError as e:
+        if tempo_restante() > 0:
+            # Tempo esgotado interno da operação, não do prazo
+            raise
+        raise _prazo_esgotado(etapa) from e
@@ -5,21 +5,31 @@ Este módulo implementa uma solução para manter o contexto das conversas entre
 similar ao THREAD_ID da API antiga, utilizando um sistema de armazenamento local.
 """
 
-from agents import Agent, InputGuardrail, GuardrailFunctionOutput, Runner, trace, RunConfig
+from agents import Agent, InputGuardrail, InputGuardrailTripwireTriggered, GuardrailFunctionOutput, Runner, trace, RunConfig
 from pydantic import BaseModel
 import asyncio
+import time
 import uuid
 import os
 import sys
-from openai import OpenAI
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
 
 # Adicionar o diretório raiz ao path para permitir importações dos módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.conversation_store import ConversationStore
+from src.conversation_store import ConversationStore, messages_to_input_list, message_tokens
+from src.async_conversation_store import AsyncConversationStore
+from src.resumo_contexto import atualizar_resumo, mensagem_resumo
+from src.relevancia import selecionar_relevantes
+from src.triagem_local import especialista_fixo, registrar_triagem, triagem_local
 from src.config_manager import ConfigManager
 from src.logger import Logger
-from src.error_handler import catch_async_errors, APIKeyError, APIConnectionError, ValidationError
+from src.error_handler import catch_async_errors, catch_async_generator_errors, APIKeyError, APIConnectionError, DeadlineExceededError, ValidationError
+from src.streaming import EVENTO_DELTA, EVENTO_FIM, transmitir_texto
+from src.provedor_modelos import obter_provedor_modelos
+from src.limitador_concorrencia import limitar_concorrencia
+from src.prazo import aguardar_com_prazo, com_prazo, limite_para
 
 # Configurar logger específico para este módulo
 logger = Logger.setup("processador_contexto")
@@ -31,25 +41,27 @@ if not ConfigManager.validate_api_key():
 
 # Importar os agentes do arquivo main.py
 from src.main import triage_agent, math_tutor_agent, history_tutor_agent, guardrail_agent
+from src.main import ESPECIALISTAS, PALAVRAS_CHAVE_TRIAGEM
 
-@catch_async_errors
-async def processar_pergunta_com_contexto(pergunta: str, conversation_id: str = None) -> tuple[str, str]:
-    """
-    Processa uma pergunta usando o agente de triagem e retorna a resposta,
-    mantendo o contexto da conversa entre sessões.
-    
-    Args:
-        pergunta (str): A pergunta a ser processada.
-        conversation_id (str, opcional): ID da conversa existente. Se None, cria uma nova conversa.
-        
-    Returns:
-        tuple[str, str]: (resposta do agente especialista, ID da conversa)
-    
-    Raises:
-        ValidationError: Se a pergunta for inválida
-        APIConnectionError: Se houver problemas de conexão com a API
-        APIKeyError: Se a chave da API não estiver configurada
-    """
+# Chave dos metadados com o nome do especialista que respondeu o último turno
+CHAVE_ULTIMO_ESPECIALISTA = "ultimo_especialista"
+
+@dataclass
+class _Turno:
+    """Dados de um turno da conversa preparados para a execução dos agentes."""
+    conversation_id: str
+    entrada: Union[str, List[Dict[str, str]]]
+    run_config: RunConfig
+    especialista: Optional[Agent]
+    ultimo_especialista: Optional[str]
+
+    @property
+    def agente_inicial(self) -> Agent:
+        return self.especialista or triage_agent
+
+
+async def _preparar_turno(pergunta: str, conversation_id: Optional[str]) -> _Turno:
+    """Registra a pergunta, monta o contexto e escolhe o agente inicial."""
     # Validar entrada
     if not pergunta or not isinstance(pergunta, str) or len(pergunta.strip()) == 0:
         raise ValidationError("A pergunta não pode estar vazia")
@@ -58,24 +70,42 @@ async def processar_pergunta_com_contexto(pergunta: str, conversation_id: str =
     if not conversation_id:
         # Note que a criação da conversa com nome é feita na interface do usuário (interativo_com_contexto.py)
         # Aqui apenas criamos uma conversa sem nome caso não tenha sido criada antes
-        conversation_id = ConversationStore.create_conversation()
+        conversation_id = await AsyncConversationStore.create_conversation()
         logger.info(f"Nova conversa criada com ID: {conversation_id}")
     else:
         logger.info(f"Usando conversa existente com ID: {conversation_id}")
     
     # Adicionar a pergunta do usuário à conversa
-    ConversationStore.add_message(conversation_id, "user", pergunta)
+    await AsyncConversationStore.add_message(conversation_id, "user", pergunta)
     
-    # Recuperar o histórico de mensagens para usar como contexto
-    mensagens_anteriores = ConversationStore.get_messages_as_input_list(conversation_id)
+    # Recuperar apenas a janela recente do histórico para usar como contexto
+    # (janela deslizante lida a partir do fim do armazenamento)
+    if ConfigManager.get_config("nova", "context_window_mode") == "tokens":
+        # Maior sufixo do histórico que cabe no orçamento de tokens do modelo
+        token_budget = ConfigManager.get_context_token_budget()
+        janela = await AsyncConversationStore.get_recent_messages(conversation_id, max_tokens=token_budget)
+        tokens_janela = sum(message_tokens(msg) for msg in janela)
+        logger.info(f"Contexto limitado a {len(janela)} mensagens ({tokens_janela} de {token_budget} tokens)")
+    else:
+        max_context_messages = ConfigManager.get_config("nova", "max_context_messages")
+        janela = await AsyncConversationStore.get_recent_messages(conversation_id, n=max_context_messages)
+        logger.info(f"Contexto limitado às últimas {max_context_messages} mensagens")
+    mensagens_anteriores = messages_to_input_list(janela)
     
-    # Implementar janela deslizante para limitar o tamanho do contexto
-    # Obter o valor da configuração
-    max_context_messages = ConfigManager.get_config("nova", "max_context_messages")
+    # Mensagens antigas relevantes para a pergunta atual, fora da janela recente
+    if ConfigManager.get_config("nova", "context_selection") == "relevance":
+        top_k = ConfigManager.get_config("nova", "relevance_top_k")
+        relevantes = await asyncio.to_thread(
+            selecionar_relevantes, conversation_id, pergunta, len(janela), top_k
+        )
+        logger.info(f"Selecionadas {len(relevantes)} mensagens antigas por relevância")
+        mensagens_anteriores = messages_to_input_list(relevantes) + mensagens_anteriores
     
-    if len(mensagens_anteriores) > max_context_messages:
-        logger.info(f"Limitando contexto para as últimas {max_context_messages} mensagens (de {len(mensagens_anteriores)} totais)")
-        mensagens_anteriores = mensagens_anteriores[-max_context_messages:]
+    # Mensagens que saíram da janela entram no resumo acumulado da conversa,
+    # enviado como uma única mensagem inicial
+    resumo = await atualizar_resumo(conversation_id, len(janela))
+    if resumo:
+        mensagens_anteriores = [mensagem_resumo(resumo)] + mensagens_anteriores
     
     # Gerar ID único para o trace
     trace_id = f"trace_{uuid.uuid4().hex}"
@@ -87,41 +117,159 @@ async def processar_pergunta_com_contexto(pergunta: str, conversation_id: str =
         trace_id=trace_id,
         workflow_name=workflow_name,
         group_id=group_id,
-        trace_include_sensitive_data=True
+        trace_include_sensitive_data=True,
+        model_provider=obter_provedor_modelos(),
     )
     
     logger.info(f"Trace ID: {trace_id}")
     logger.info(f"Histórico da conversa: {len(mensagens_anteriores)} mensagens")
     
+    # Roteamento: último especialista da conversa (salvo mudança de assunto),
+    # triagem local ou, sem confiança suficiente, o agente de triagem
+    metadata = await AsyncConversationStore.get_metadata(conversation_id)
+    ultimo_especialista = metadata.get(CHAVE_ULTIMO_ESPECIALISTA)
+    especialista = await asyncio.to_thread(
+        especialista_fixo, pergunta, ultimo_especialista, ESPECIALISTAS, PALAVRAS_CHAVE_TRIAGEM
+    )
+    if especialista is None:
+        especialista = await asyncio.to_thread(triagem_local, pergunta, ESPECIALISTAS, PALAVRAS_CHAVE_TRIAGEM)
+    if especialista is not None:
+        # O guardrail da triagem continua valendo no caminho direto
+        run_config.input_guardrails = list(triage_agent.input_guardrails)
+    
+    # Se temos histórico, usamos ele como input; para a primeira mensagem, apenas a pergunta
+    entrada = mensagens_anteriores if len(mensagens_anteriores) > 1 else pergunta
+    return _Turno(conversation_id, entrada, run_config, especialista, ultimo_especialista)
+
+
+@catch_async_errors(endpoint="responses")
+async def _executar_turno(turno: _Turno) -> Any:
+    """Executa os agentes para o turno, repetindo falhas transitórias da API."""
     try:
         # Executar a pergunta com trace e histórico de mensagens
-        with trace(run_config.workflow_name):
-            # Se temos histórico, usamos ele como input
-            if len(mensagens_anteriores) > 1:  # Mais de uma mensagem (não apenas a pergunta atual)
-                logger.debug("Processando com histórico completo")
-                result = await Runner.run(
-                    triage_agent, 
-                    mensagens_anteriores,  # Passamos o histórico completo
-                    run_config=run_config
-                )
-            else:
-                # Para a primeira mensagem, usamos apenas a pergunta
-                logger.debug("Processando primeira mensagem sem histórico")
-                result = await Runner.run(
-                    triage_agent, 
-                    pergunta,
-                    run_config=run_config
+        with trace(turno.run_config.workflow_name):
+            async with limitar_concorrencia():
+                return await aguardar_com_prazo(
+                    Runner.run(turno.agente_inicial, turno.entrada, run_config=turno.run_config),
+                    "a execução dos agentes"
                 )
+    except InputGuardrailTripwireTriggered:
+        logger.warning("Pergunta bloqueada pelo guardrail")
+        raise ValidationError("A pergunta não foi reconhecida como uma pergunta educacional")
+    except DeadlineExceededError:
+        logger.warning("Prazo da pergunta esgotado")
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar pergunta: {str(e)}")
-        raise APIConnectionError(f"Falha na comunicação com a API da OpenAI: {str(e)}")
+        raise APIConnectionError(f"Falha na comunicação com a API da OpenAI: {str(e)}") from e
+
+
+@catch_async_generator_errors(endpoint="responses")
+async def _transmitir_turno(turno: _Turno, inicio: float):
+    """Executa os agentes em streaming, produzindo ("delta", trecho) e, ao final, ("fim", resultado).
+    
+    Falhas transitórias antes do primeiro trecho são repetidas sem registrar a pergunta de novo.
+    """
+    try:
+        # O runner em streaming abre o trace com o trace_id configurado
+        async with limitar_concorrencia():
+            result = Runner.run_streamed(turno.agente_inicial, turno.entrada, run_config=turno.run_config)
+            async for delta in transmitir_texto(result, inicio):
+                yield EVENTO_DELTA, delta
+    except InputGuardrailTripwireTriggered:
+        logger.warning("Pergunta bloqueada pelo guardrail")
+        raise ValidationError("A pergunta não foi reconhecida como uma pergunta educacional")
+    except DeadlineExceededError:
+        logger.warning("Prazo da pergunta esgotado")
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao processar pergunta: {str(e)}")
+        raise APIConnectionError(f"Falha na comunicação com a API da OpenAI: {str(e)}") from e
+    yield EVENTO_FIM, result
+
+
+async def _concluir_turno(turno: _Turno, pergunta: str, result: Any, inicio: float) -> str:
+    """Registra a triagem, armazena a resposta e atualiza o especialista da conversa."""
+    registrar_triagem(pergunta, result.last_agent.name, time.perf_counter() - inicio,
+                      caminho_rapido=turno.especialista is not None)
     
     # Adicionar a resposta do assistente à conversa
     resposta = result.final_output
-    ConversationStore.add_message(conversation_id, "assistant", resposta)
+    await AsyncConversationStore.add_message(turno.conversation_id, "assistant", resposta)
+    nome_especialista = result.last_agent.name
+    if nome_especialista != turno.ultimo_especialista and nome_especialista in {a.name for a in ESPECIALISTAS}:
+        await AsyncConversationStore.update_metadata(
+            turno.conversation_id, {CHAVE_ULTIMO_ESPECIALISTA: nome_especialista}
+        )
+    logger.debug(f"Cache de conversas: {ConversationStore.cache_stats()}")
+    return resposta
+
+
+@catch_async_errors
+async def processar_pergunta_com_contexto(pergunta: str, conversation_id: str = None,
+                                          prazo: Optional[float] = None) -> tuple[str, str]:
+    """
+    Processa uma pergunta usando o agente de triagem e retorna a resposta,
+    mantendo o contexto da conversa entre sessões.
+    
+    Args:
+        pergunta (str): A pergunta a ser processada.
+        conversation_id (str, opcional): ID da conversa existente. Se None, cria uma nova conversa.
+        prazo (float, opcional): Prazo em segundos para a resposta (padrão: "request_deadline").
+        
+    Returns:
+        tuple[str, str]: (resposta do agente especialista, ID da conversa)
+    
+    Raises:
+        ValidationError: Se a pergunta for inválida
+        APIConnectionError: Se houver problemas de conexão com a API
+        APIKeyError: Se a chave da API não estiver configurada
+        DeadlineExceededError: Se o prazo acabar antes da resposta
+    """
+    with com_prazo(limite_para(prazo)):
+        turno = await _preparar_turno(pergunta, conversation_id)
+        inicio = time.perf_counter()
+        result = await _executar_turno(turno)
+    resposta = await _concluir_turno(turno, pergunta, result, inicio)
     
     # Retornar a resposta e o ID da conversa
-    return resposta, conversation_id
+    return resposta, turno.conversation_id
+
+@catch_async_generator_errors
+async def processar_pergunta_com_contexto_stream(pergunta: str, conversation_id: str = None,
+                                                 prazo: Optional[float] = None):
+    """
+    Processa uma pergunta como processar_pergunta_com_contexto, transmitindo a resposta em streaming.
+    
+    A resposta completa é armazenada na conversa apenas ao final da transmissão.
+    
+    Args:
+        pergunta (str): A pergunta a ser processada.
+        conversation_id (str, opcional): ID da conversa existente. Se None, cria uma nova conversa.
+        prazo (float, opcional): Prazo em segundos para a resposta (padrão: "request_deadline").
+        
+    Yields:
+        tuple[str, Any]: ("delta", trecho da resposta) à medida que o texto é gerado e,
+        ao final, ("fim", (resposta completa, ID da conversa))
+    
+    Raises:
+        ValidationError: Se a pergunta for inválida
+        APIConnectionError: Se houver problemas de conexão com a API
+        APIKeyError: Se a chave da API não estiver configurada
+        DeadlineExceededError: Se o prazo acabar antes da resposta
+    """
+    inicio = time.perf_counter()
+    with com_prazo(limite_para(prazo)):
+        turno = await _preparar_turno(pergunta, conversation_id)
+        
+        async for evento, dado in _transmitir_turno(turno, inicio):
+            if evento == EVENTO_DELTA:
+                yield evento, dado
+            else:
+                result = dado
+    
+    resposta = await _concluir_turno(turno, pergunta, result, inicio)
+    yield EVENTO_FIM, (resposta, turno.conversation_id)
 
 async def main():
     """Função principal para testar o processamento com contexto."""
@@ -0,0 +1,212 @@
+"""
+Módulo para processamento de perguntas em lote.
+
+Este módulo expõe a função processar_perguntas_em_lote, que envia muitas
+perguntas a processar_pergunta com concorrência limitada, e uma interface de
+linha de comando para corrigir conjuntos de perguntas offline:
+
+    python -m src.processar_em_lote perguntas.jsonl respostas.jsonl [--concorrencia 8]
+
+A entrada pode ser JSONL ou CSV, com os campos "id" (opcional; o número da linha
+é usado quando ausente) e "pergunta". Cada resposta é gravada no arquivo de saída,
+uma linha JSON por pergunta, assim que fica pronta. O próprio arquivo de saída
+serve de checkpoint: ao reiniciar, perguntas com resposta já gravada são puladas
+e apenas as pendentes (ou que falharam) são processadas.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.main import processar_pergunta
+from src.guardrail_execucao import aguardar_auditorias
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("processar_em_lote")
+
+
+async def processar_perguntas_em_lote(perguntas: Iterable[Tuple[str, str]],
+                                      concorrencia: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Processa várias perguntas com processar_pergunta, com concorrência limitada.
+
+    As perguntas são consumidas do iterável sob demanda, de modo que conjuntos
+    grandes não precisam ser carregados inteiros na memória.
+
+    Args:
+        perguntas: Pares (id, pergunta)
+        concorrencia: Número máximo de perguntas em processamento simultâneo
+            (padrão: "batch_concurrency")
+
+    Returns:
+        Iterador assíncrono de resultados, na ordem em que ficam prontos. Cada
+        resultado tem "id", "pergunta" e "resposta" e "trace_id", ou "erro" se
+        o processamento falhou
+    """
+    concorrencia = concorrencia or ConfigManager.get_config("nova", "batch_concurrency")
+    iterador = iter(perguntas)
+    resultados: asyncio.Queue = asyncio.Queue(maxsize=concorrencia * 2)
+
+    async def trabalhador():
+        # O iterador é compartilhado; no event loop, next() nunca é chamado em paralelo
+        for id_pergunta, pergunta in iterador:
+            try:
+                resposta, trace_id = await processar_pergunta(pergunta)
+                resultado = {"id": id_pergunta, "pergunta": pergunta,
+                             "resposta": resposta, "trace_id": trace_id}
+            except Exception as e:
+                logger.error(f"Falha ao processar a pergunta {id_pergunta}: {str(e)}")
+                resultado = {"id": id_pergunta, "pergunta": pergunta, "erro": str(e)}
+            await resultados.put(resultado)
+
+    async def finalizar():
+        try:
+            await asyncio.gather(*trabalhadores)
+        finally:
+            # Sinaliza o fim dos resultados
+            await resultados.put(None)
+
+    trabalhadores = [asyncio.create_task(trabalhador()) for _ in range(concorrencia)]
+    finalizacao = asyncio.create_task(finalizar())
+    try:
+        while (resultado := await resultados.get()) is not None:
+            yield resultado
+        # Propagar erros inesperados dos trabalhadores
+        await finalizacao
+    finally:
+        for tarefa in trabalhadores + [finalizacao]:
+            tarefa.cancel()
+
+
+def ler_perguntas(caminho: str) -> Iterator[Tuple[str, str]]:
+    """
+    Lê as perguntas de um arquivo JSONL ou CSV.
+
+    Args:
+        caminho: Caminho do arquivo (a extensão .csv indica CSV; as demais, JSONL)
+
+    Returns:
+        Iterador de pares (id, pergunta)
+    """
+    with open(caminho, 'r', encoding='utf-8', newline='') as f:
+        if caminho.lower().endswith(".csv"):
+            registros = csv.DictReader(f)
+        else:
+            registros = (json.loads(linha) for linha in f if linha.strip())
+        for numero, registro in enumerate(registros, 1):
+            pergunta = registro.get("pergunta")
+            if not pergunta:
+                logger.warning(f"Registro {numero} sem o campo 'pergunta'; ignorado")
+                continue
+            yield str(registro.get("id") or numero), pergunta
+
+
+def ids_concluidos(caminho_saida: str) -> Set[str]:
+    """
+    Obtém os IDs das perguntas já respondidas em uma execução anterior.
+
+    Uma última linha incompleta (escrita interrompida, sem quebra de linha no
+    final) é removida do arquivo. Linhas inválidas no meio do arquivo, ou
+    registros sem ID, são ignorados com um aviso.
+
+    Args:
+        caminho_saida: Arquivo JSONL de respostas
+
+    Returns:
+        Conjunto de IDs com resposta gravada (perguntas com erro não são incluídas)
+    """
+    concluidos = set()
+    if not os.path.exists(caminho_saida):
+        return concluidos
+
+    inicio_linha = 0
+    ultima_completa = True
+    with open(caminho_saida, 'rb') as f:
+        for numero, linha in enumerate(f, start=1):
+            ultima_completa = linha.endswith(b"\n")
+            try:
+                registro = json.loads(linha)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                if not ultima_completa:
+                    # Linha final sem quebra: escrita interrompida
+                    logger.warning("Removendo linha incompleta do final do arquivo de respostas")
+                    with open(caminho_saida, 'r+b') as saida:
+                        saida.truncate(inicio_linha)
+                    return concluidos
+                logger.warning(f"Linha {numero} do arquivo de respostas inválida; ignorada")
+                inicio_linha += len(linha)
+                continue
+            inicio_linha += len(linha)
+
+            id_pergunta = registro.get("id") if isinstance(registro, dict) else None
+            if id_pergunta is None:
+                logger.warning(f"Linha {numero} do arquivo de respostas sem o campo 'id'; ignorada")
+            elif "erro" not in registro:
+                concluidos.add(str(id_pergunta))
+
+    if not ultima_completa:
+        # Registro completo sem a quebra de linha: completar para que o próximo não se junte a ele
+        with open(caminho_saida, 'ab') as saida:
+            saida.write(b"\n")
+    return concluidos
+
+
+async def executar_lote(caminho_entrada: str, caminho_saida: str, concorrencia: Optional[int] = None) -> None:
+    """
+    Processa um arquivo de perguntas, retomando a partir das respostas já gravadas.
+
+    Args:
+        caminho_entrada: Arquivo JSONL ou CSV de perguntas
+        caminho_saida: Arquivo JSONL de respostas (criado ou complementado)
+        concorrencia: Número máximo de perguntas em processamento simultâneo
+    """
+    concluidos = ids_concluidos(caminho_saida)
+    if concluidos:
+        logger.info(f"Retomando lote: {len(concluidos)} perguntas já respondidas serão puladas")
+
+    pendentes = (item for item in ler_perguntas(caminho_entrada) if item[0] not in concluidos)
+    respondidas = falhas = 0
+    with open(caminho_saida, 'a', encoding='utf-8') as saida:
+        async for resultado in processar_perguntas_em_lote(pendentes, concorrencia):
+            saida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            saida.flush()
+            if "erro" in resultado:
+                falhas += 1
+            else:
+                respondidas += 1
+            if (respondidas + falhas) % 100 == 0:
+                logger.info(f"Lote em andamento: {respondidas} respondidas, {falhas} falhas")
+
+    await aguardar_auditorias()
+    logger.info(f"Lote concluído: {respondidas} respondidas, {falhas} falhas")
+    print(f"Lote concluído: {respondidas} respondidas, {falhas} falhas. Respostas em {caminho_saida}")
+
+
+def main():
+    """Interface de linha de comando para o processamento em lote."""
+    parser = argparse.ArgumentParser(description="Processa um arquivo de perguntas em lote.")
+    parser.add_argument("entrada", help="Arquivo de perguntas (JSONL ou CSV com os campos 'id' e 'pergunta')")
+    parser.add_argument("saida", help="Arquivo JSONL de respostas (também usado para retomar o lote)")
+    parser.add_argument("--concorrencia", type=int, default=None,
+                        help="Número máximo de perguntas processadas simultaneamente")
+    args = parser.parse_args()
+
+    asyncio.run(executar_lote(args.entrada, args.saida, args.concorrencia))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        logger.warning("Lote interrompido pelo usuário; execute novamente para retomar")
+        print("\nLote interrompido. Execute novamente o mesmo comando para retomar.")
+        sys.exit(1)
@@ -8,9 +8,11 @@ Utiliza os componentes centralizados de configuração, logging e tratamento de
 
 import sys
 import os.path
+from typing import Optional
 from src.config_manager import ConfigManager
 from src.logger import Logger
-from src.error_handler import catch_errors, APIKeyError, APIConnectionError, ValidationError
+from src.error_handler import catch_errors, APIKeyError, APIConnectionError, DeadlineExceededError, ValidationError
+from src.prazo import com_prazo, limite_para
 
 # Configurar logger específico para este módulo
 logger = Logger.setup("processador_old_api")
@@ -32,7 +34,7 @@ except ImportError:
         print("ERRO: Não foi possível importar o módulo de processamento da API antiga.")
 
 @catch_errors
-def processar_pergunta_old_api(pergunta: str) -> str:
+def processar_pergunta_old_api(pergunta: str, prazo: Optional[float] = None) -> str:
     """
     Processa uma pergunta usando a API antiga da OpenAI (threads e assistants).
     
@@ -41,6 +43,7 @@ def processar_pergunta_old_api(pergunta: str) -> str:
     
     Args:
         pergunta (str): A pergunta a ser processada.
+        prazo (float, opcional): Prazo em segundos para a resposta (padrão: "request_deadline").
         
     Returns:
         str: A resposta do agente especialista.
@@ -49,6 +52,7 @@ def processar_pergunta_old_api(pergunta: str) -> str:
         ValidationError: Se a pergunta for inválida
         APIConnectionError: Se houver problemas de conexão com a API
         APIKeyError: Se a chave da API não estiver configurada
+        DeadlineExceededError: Se o prazo acabar antes da resposta
     """
     # Validar entrada
     if not pergunta or not isinstance(pergunta, str) or len(pergunta.strip()) == 0:
@@ -63,9 +67,12 @@ def processar_pergunta_old_api(pergunta: str) -> str:
     try:
         logger.info(f"Processando pergunta com API antiga: '{pergunta[:30]}{'...' if len(pergunta) > 30 else ''}'")
         # Utilizar a função refatorada do módulo old_API_OpenIA.py
-        resposta = processar_pergunta(pergunta)
+        with com_prazo(limite_para(prazo)):
+            resposta = processar_pergunta(pergunta)
         logger.info("Resposta obtida com sucesso da API antiga")
         return resposta
+    except DeadlineExceededError:
+        raise
     except Exception as e:
         # Capturar e registrar qualquer erro que ocorra durante o processamento
         logger.error(f"Erro ao processar pergunta com API antiga: {str(e)}", exc_info=True)
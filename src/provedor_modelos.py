@@ -0,0 +1,236 @@
+"""
+Módulo com o provedor de modelos usado por todas as execuções dos agentes.
+
+O provedor envolve o OpenAIProvider da SDK de Agentes (com o cliente compartilhado
+de src/openai_client.py) e devolve modelos que passam pelo limitador de taxa
+antes de cada chamada: guardrail, triagem, especialistas e resumos ficam sujeitos
+ao mesmo orçamento de requisições e tokens por minuto. Cada chamada também
+respeita o prazo da requisição (src/prazo.py) e é cancelada quando ele acaba,
+e os tokens consumidos podem ser medidos por trecho de código com medir_tokens().
+Para usá-lo, informe obter_provedor_modelos() em RunConfig(model_provider=...).
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple, Union
+
+from agents import ModelSettings, ModelTracing, Tool
+from agents.agent_output import AgentOutputSchema
+from agents.handoffs import Handoff
+from agents.items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from agents.models.interface import Model, ModelProvider
+from agents.models.openai_provider import OpenAIProvider
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.limitador_taxa import LimitadorTaxa, tokens_saida_reservados
+from src.openai_client import obter_cliente_async
+from src.prazo import aguardar_com_prazo
+from src.tokenizador import contar_tokens
+
+
+def estimar_tokens(system_instructions: Optional[str], input: Union[str, List[TResponseInputItem]],
+                   model_settings: ModelSettings, output_schema: Optional[AgentOutputSchema] = None,
+                   tokens_saida: Optional[int] = None) -> int:
+    """
+    Estima os tokens de uma chamada ao modelo, como contados no limite por minuto.
+
+    Args:
+        system_instructions: Instruções do agente
+        input: Entrada da chamada (texto ou itens no formato da Responses API)
+        model_settings: Configurações do modelo (max_tokens limita a saída)
+        output_schema: Esquema da saída estruturada, se houver
+        tokens_saida: Tokens de saída reservados (padrão: tokens_saida_reservados)
+
+    Returns:
+        int: Tokens de entrada estimados mais os tokens de saída reservados
+    """
+    texto_entrada = input if isinstance(input, str) else json.dumps(input, ensure_ascii=False, default=str)
+    tokens = contar_tokens(system_instructions or "") + contar_tokens(texto_entrada)
+    if output_schema is not None and not output_schema.is_plain_text():
+        tokens += contar_tokens(json.dumps(output_schema.json_schema()))
+    if tokens_saida is None:
+        tokens_saida = tokens_saida_reservados(model_settings.max_tokens)
+    return tokens + tokens_saida
+
+
+class MedidorTokens:
+    """Soma dos tokens consumidos pelas chamadas ao modelo feitas dentro de medir_tokens()."""
+
+    def __init__(self):
+        self.tokens = 0
+        self.chamadas = 0
+
+
+# Medidor ativo na tarefa atual (herdado pelas tarefas criadas a partir dela)
+_medidor: ContextVar[Optional[MedidorTokens]] = ContextVar("medidor_tokens", default=None)
+
+
+@contextlib.contextmanager
+def medir_tokens() -> Iterator[MedidorTokens]:
+    """
+    Mede os tokens das chamadas ao modelo feitas dentro do bloco.
+
+    Chamadas interrompidas (canceladas ou com erro) contam os tokens de entrada
+    estimados, que já foram enviados à API.
+
+    Exemplo:
+        with medir_tokens() as medidor:
+            result = await Runner.run(...)
+        print(medidor.tokens)
+    """
+    medidor = MedidorTokens()
+    anterior = _medidor.get()
+    _medidor.set(medidor)
+    try:
+        yield medidor
+    finally:
+        _medidor.set(anterior)
+
+
+def _contabilizar(tokens: int) -> None:
+    medidor = _medidor.get()
+    if medidor is not None:
+        medidor.tokens += tokens
+        medidor.chamadas += 1
+
+
+class ModeloControlado(Model):
+    """Modelo que aguarda o limitador de taxa e respeita o prazo em cada chamada ao modelo original."""
+
+    def __init__(self, modelo: Model):
+        """
+        Args:
+            modelo: Modelo da SDK que efetivamente faz as chamadas
+        """
+        self.modelo = modelo
+
+    async def get_response(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[TResponseInputItem]],
+        model_settings: ModelSettings,
+        tools: List[Tool],
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: List[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        resposta, _ = await self.get_response_medida(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+        return resposta
+
+    async def get_response_medida(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[TResponseInputItem]],
+        model_settings: ModelSettings,
+        tools: List[Tool],
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: List[Handoff],
+        tracing: ModelTracing,
+        iniciada: Optional[asyncio.Event] = None,
+    ) -> Tuple[ModelResponse, float]:
+        """
+        Faz a chamada como get_response, medindo apenas a chamada ao modelo.
+
+        Args:
+            iniciada: Evento sinalizado quando a espera pelo limitador termina e a chamada começa
+            (demais argumentos como em get_response)
+
+        Returns:
+            (resposta, duração em segundos da chamada ao modelo, sem a espera pelo limitador)
+        """
+        limitador = LimitadorTaxa.get_default()
+        saida = tokens_saida_reservados(model_settings.max_tokens)
+        estimados = estimar_tokens(system_instructions, input, model_settings, output_schema, saida)
+        if limitador is not None:
+            await aguardar_com_prazo(limitador.adquirir(estimados), "a espera pelo limite de taxa")
+
+        if iniciada is not None:
+            iniciada.set()
+        inicio = time.perf_counter()
+        try:
+            resposta = await aguardar_com_prazo(self.modelo.get_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+            ), "a chamada ao modelo")
+        except BaseException:
+            _contabilizar(estimados - saida)
+            raise
+        duracao = time.perf_counter() - inicio
+        _contabilizar(resposta.usage.total_tokens)
+        if limitador is not None:
+            limitador.registrar_uso(estimados, resposta.usage.total_tokens, resposta.usage.output_tokens)
+        return resposta, duracao
+
+    async def stream_response(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[TResponseInputItem]],
+        model_settings: ModelSettings,
+        tools: List[Tool],
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: List[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        limitador = LimitadorTaxa.get_default()
+        estimados = estimar_tokens(system_instructions, input, model_settings, output_schema)
+        if limitador is not None:
+            await aguardar_com_prazo(limitador.adquirir(estimados), "a espera pelo limite de taxa")
+
+        eventos = self.modelo.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing
+        )
+        try:
+            while True:
+                try:
+                    evento = await aguardar_com_prazo(eventos.__anext__(), "a chamada ao modelo")
+                except StopAsyncIteration:
+                    break
+                if evento.type == "response.completed" and evento.response.usage:
+                    _contabilizar(evento.response.usage.total_tokens)
+                    if limitador is not None:
+                        limitador.registrar_uso(estimados, evento.response.usage.total_tokens,
+                                                evento.response.usage.output_tokens)
+                yield evento
+        finally:
+            await eventos.aclose()
+
+
+class ProvedorModelosControlado(ModelProvider):
+    """Provedor que devolve os modelos da OpenAI envolvidos por ModeloControlado."""
+
+    def __init__(self, provedor: Optional[ModelProvider] = None):
+        """
+        Args:
+            provedor: Provedor original (padrão: OpenAIProvider com o cliente compartilhado)
+        """
+        self.provedor = provedor or OpenAIProvider(openai_client=obter_cliente_async())
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return ModeloControlado(self.provedor.get_model(model_name))
+
+
+_provedor: Optional[ProvedorModelosControlado] = None
+_provedor_lock = threading.Lock()
+
+
+def obter_provedor_modelos() -> ProvedorModelosControlado:
+    """
+    Obtém (e cria na primeira chamada) o provedor de modelos compartilhado.
+
+    Returns:
+        ProvedorModelosControlado usado nas execuções dos agentes
+    """
+    global _provedor
+    with _provedor_lock:
+        if _provedor is None:
+            _provedor = ProvedorModelosControlado()
+        return _provedor
@@ -1,8 +1,13 @@
-from openai import OpenAI
 import json
+import os
+import sys
 import time
 
-client = OpenAI()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.openai_client import obter_cliente_sync
+
+client = obter_cliente_sync()
 
 # Função para extrair e exibir informações do RequiredActionFunctionToolCall
 def extrair_tool_call_info(run):
@@ -0,0 +1,242 @@
+"""
+Módulo para seleção de mensagens do histórico por relevância.
+
+Este módulo implementa a estratégia de "Seleção por Relevância" do plano de
+migração. Cada conversa tem um índice invertido de termos, mantido de forma
+incremental em um arquivo auxiliar (index/terms/<id>.jsonl, um registro por
+mensagem com sua posição e as frequências dos termos, sem o texto). As mensagens
+antigas são pontuadas contra a pergunta atual com BM25, calculado com NumPy
+apenas sobre as listas de ocorrência dos termos da pergunta, de modo que o custo
+da seleção não cresce com o tamanho total do histórico. Apenas as mensagens
+selecionadas são lidas do armazenamento de conversas.
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conversation_store import CONVERSATIONS_DIR, ConversationStore, Message
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Número máximo de índices de conversas mantidos em memória
+MAX_INDICES_EM_MEMORIA = 32
+
+# Palavras muito frequentes em português, ignoradas na indexação
+STOPWORDS = {
+    "que", "para", "com", "uma", "por", "mais", "como", "mas", "foi", "ele", "ela",
+    "das", "dos", "nas", "nos", "tem", "seu", "sua", "isso", "esse", "essa", "este",
+    "esta", "ser", "sao", "quem", "qual", "quais", "sobre", "pelo", "pela", "entre",
+    "quando", "muito", "tambem", "voce", "nao", "sim", "aos", "ate", "mesmo",
+}
+
+_PADRAO_PALAVRAS = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenizar_termos(texto: str) -> List[str]:
+    """
+    Extrai os termos indexáveis de um texto.
+
+    O texto é convertido para minúsculas e sem acentos; palavras com menos de
+    três caracteres e stopwords são descartadas.
+
+    Args:
+        texto: Texto a ser tokenizado
+
+    Returns:
+        Lista de termos, na ordem em que aparecem
+    """
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [
+        termo for termo in _PADRAO_PALAVRAS.findall(texto)
+        if len(termo) > 2 and termo not in STOPWORDS
+    ]
+
+
+class IndiceTermos:
+    """Índice invertido de termos das mensagens de uma conversa."""
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.path = os.path.join(CONVERSATIONS_DIR, "index", "terms", f"{conversation_id}.jsonl")
+        # Número de mensagens indexadas
+        self.total = 0
+        # Número de termos de cada mensagem, em um buffer que cresce por duplicação
+        self._tamanhos = np.zeros(64, dtype=np.float64)
+        self.total_termos = 0
+        # termo -> ([posições das mensagens], [frequências])
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._carregar()
+
+    def _indexar(self, termos: Counter) -> None:
+        posicao = self.total
+        self.total += 1
+        tamanho = sum(termos.values())
+        if posicao >= len(self._tamanhos):
+            self._tamanhos = np.concatenate([self._tamanhos, np.zeros_like(self._tamanhos)])
+        self._tamanhos[posicao] = tamanho
+        self.total_termos += tamanho
+        for termo, frequencia in termos.items():
+            posicoes, frequencias = self.postings.setdefault(termo, ([], []))
+            posicoes.append(posicao)
+            frequencias.append(frequencia)
+
+    def _carregar(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha incompleta (escrita interrompida); ignorar
+                    continue
+                # Registros antigos não têm a posição (eram sempre sequenciais)
+                if record.get("pos", self.total) != self.total:
+                    continue
+                self._indexar(Counter(record["tf"]))
+
+    def adicionar(self, mensagens: List[Message]) -> None:
+        """
+        Indexa novas mensagens e acrescenta suas frequências de termos ao arquivo do índice.
+
+        Args:
+            mensagens: Mensagens ainda não indexadas, em ordem cronológica
+        """
+        linhas = []
+        for message in mensagens:
+            termos = Counter(tokenizar_termos(message.content))
+            linhas.append(json.dumps({
+                "pos": self.total,
+                "tf": termos,
+            }, ensure_ascii=False) + "\n")
+            self._indexar(termos)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(linhas))
+
+    def pontuar(self, consulta: str, limite: int) -> Dict[int, float]:
+        """
+        Calcula a pontuação BM25 das mensagens anteriores a uma posição.
+
+        Apenas as listas de ocorrência dos termos da consulta são percorridas.
+
+        Args:
+            consulta: Texto da pergunta atual
+            limite: Só mensagens com posição menor que o limite são pontuadas
+
+        Returns:
+            Dicionário posição -> pontuação (apenas pontuações positivas)
+        """
+        total = self.total
+        if total == 0 or limite <= 0:
+            return {}
+
+        media_tamanho = max(self.total_termos / total, 1.0)
+        tamanhos = self._tamanhos
+        posicoes_consulta = []
+        contribuicoes = []
+
+        for termo in set(tokenizar_termos(consulta)):
+            if termo not in self.postings:
+                continue
+            posicoes, frequencias = self.postings[termo]
+            posicoes = np.asarray(posicoes, dtype=np.int64)
+            frequencias = np.asarray(frequencias, dtype=np.float64)
+
+            idf = math.log(1 + (total - len(posicoes) + 0.5) / (len(posicoes) + 0.5))
+            normalizacao = BM25_K1 * (1 - BM25_B + BM25_B * tamanhos[posicoes] / media_tamanho)
+            pontos = idf * frequencias * (BM25_K1 + 1) / (frequencias + normalizacao)
+
+            mascara = posicoes < limite
+            posicoes_consulta.append(posicoes[mascara])
+            contribuicoes.append(pontos[mascara])
+
+        if not posicoes_consulta:
+            return {}
+
+        posicoes = np.concatenate(posicoes_consulta)
+        pontos = np.concatenate(contribuicoes)
+        if posicoes.size == 0:
+            return {}
+        unicas, inverso = np.unique(posicoes, return_inverse=True)
+        somas = np.bincount(inverso, weights=pontos)
+        return {int(p): float(s) for p, s in zip(unicas, somas) if s > 0}
+
+
+_indices: "OrderedDict[str, IndiceTermos]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _obter_indice(conversation_id: str, total_mensagens: int) -> IndiceTermos:
+    """Obtém o índice da conversa, indexando as mensagens que ainda faltam."""
+    indice = _indices.get(conversation_id)
+    if indice is None:
+        indice = IndiceTermos(conversation_id)
+        _indices[conversation_id] = indice
+        while len(_indices) > MAX_INDICES_EM_MEMORIA:
+            _indices.popitem(last=False)
+    _indices.move_to_end(conversation_id)
+
+    faltantes = total_mensagens - indice.total
+    if faltantes > 0:
+        indice.adicionar(ConversationStore.get_recent_messages(conversation_id, n=faltantes))
+    return indice
+
+
+def selecionar_relevantes(conversation_id: str, pergunta: str, tamanho_janela: int,
+                          top_k: int) -> List[Message]:
+    """
+    Seleciona as mensagens mais relevantes para a pergunta fora da janela recente.
+
+    Quando uma pergunta do estudante é selecionada, a resposta que veio logo em
+    seguida também é incluída, para que o agente veja o par completo. A seleção
+    usa apenas o índice de termos; o texto das mensagens escolhidas é lido do
+    armazenamento de conversas.
+
+    Args:
+        conversation_id: ID da conversa
+        pergunta: Pergunta atual do usuário
+        tamanho_janela: Número de mensagens recentes já incluídas no contexto
+        top_k: Número máximo de mensagens selecionadas pela pontuação
+
+    Returns:
+        Mensagens relevantes em ordem cronológica (vazia se não houver nenhuma)
+    """
+    resumo = ConversationStore.get_conversation_summary(conversation_id)
+    total = resumo.message_count if resumo else 0
+    limite = total - tamanho_janela
+    if limite <= 0 or top_k <= 0:
+        return []
+
+    with _lock:
+        indice = _obter_indice(conversation_id, total)
+        pontuacoes = indice.pontuar(pergunta, limite)
+    melhores = sorted(pontuacoes, key=pontuacoes.get, reverse=True)[:top_k]
+    if not melhores:
+        return []
+
+    # As respostas candidatas são lidas junto, e descartadas se não seguem uma pergunta
+    proximas = {posicao + 1 for posicao in melhores if posicao + 1 < limite} - set(melhores)
+    mensagens = ConversationStore.get_messages_at(conversation_id, sorted(set(melhores) | proximas))
+    selecionadas = [posicao for posicao in melhores if posicao in mensagens]
+    for posicao in proximas:
+        anterior = mensagens.get(posicao - 1)
+        if posicao in mensagens and anterior is not None and anterior.role == "user":
+            selecionadas.append(posicao)
+    return [mensagens[posicao] for posicao in sorted(selecionadas)]
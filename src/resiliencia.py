@@ -0,0 +1,431 @@
+"""
+Módulo de resiliência para as chamadas à API da OpenAI.
+
+Este módulo implementa novas tentativas com backoff exponencial limitado e
+jitter, respeitando o cabeçalho Retry-After, e um circuit breaker por endpoint:
+quando as falhas transitórias se repetem, o circuito abre e as chamadas seguintes
+falham imediatamente (CircuitOpenError) até que o tempo de espera passe e uma
+chamada de teste seja bem-sucedida.
+
+As funções deste módulo são usadas pelos decoradores de src/error_handler.py
+quando recebem o parâmetro "endpoint", por exemplo:
+
+    @catch_async_errors(endpoint="responses")
+    async def executar(...): ...
+"""
+
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+import httpx
+import openai
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.metrics import Metrics
+from src.prazo import tempo_restante
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("resiliencia")
+
+# Códigos HTTP que indicam falha transitória
+STATUS_TRANSITORIOS = {408, 409, 429}
+
+# Atributo que marca um erro cujas novas tentativas já se esgotaram
+ATRIBUTO_ESGOTADO = "_tentativas_esgotadas"
+
+# Erros de rede e de tempo esgotado, de qualquer origem
+ERROS_TRANSITORIOS = (
+    openai.APIConnectionError,  # inclui APITimeoutError
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+def _cadeia_de_causas(erro: BaseException) -> Iterator[BaseException]:
+    """Percorre o erro e suas causas (raise ... from e) e contextos."""
+    vistos = set()
+    while erro is not None and id(erro) not in vistos:
+        vistos.add(id(erro))
+        yield erro
+        erro = erro.__cause__ or erro.__context__
+
+
+def erro_transitorio(erro: BaseException) -> bool:
+    """
+    Verifica se um erro é transitório, ou seja, se uma nova tentativa pode dar certo.
+
+    Erros da aplicação que encapsulam o erro original (raise ... from e) são
+    classificados pela sua causa.
+
+    Args:
+        erro: Exceção capturada
+
+    Returns:
+        bool: True para tempo esgotado, falhas de rede, limite de requisições
+        (exceto cota esgotada) e erros 5xx do servidor
+    """
+    from src.error_handler import CircuitOpenError, DeadlineExceededError
+
+    for causa in _cadeia_de_causas(erro):
+        if isinstance(causa, (CircuitOpenError, DeadlineExceededError)):
+            return False
+        if isinstance(causa, openai.RateLimitError):
+            # Cota esgotada não se resolve com novas tentativas
+            return getattr(causa, "code", None) != "insufficient_quota"
+        if isinstance(causa, openai.APIStatusError):
+            return causa.status_code in STATUS_TRANSITORIOS or causa.status_code >= 500
+        if isinstance(causa, ERROS_TRANSITORIOS):
+            return True
+    return False
+
+
+def erro_de_sobrecarga(erro: BaseException) -> bool:
+    """
+    Verifica se um erro indica sobrecarga da API (limite de requisições ou tempo esgotado).
+
+    Args:
+        erro: Exceção capturada
+
+    Returns:
+        bool: True para respostas 429 (exceto cota esgotada), 503 e tempo esgotado
+        (exceto o fim do prazo da própria requisição)
+    """
+    from src.error_handler import DeadlineExceededError
+
+    for causa in _cadeia_de_causas(erro):
+        if isinstance(causa, DeadlineExceededError):
+            return False
+        if isinstance(causa, openai.RateLimitError):
+            return getattr(causa, "code", None) != "insufficient_quota"
+        if isinstance(causa, openai.APIStatusError):
+            return causa.status_code == 503
+        if isinstance(causa, (openai.APITimeoutError, httpx.TimeoutException, asyncio.TimeoutError)):
+            return True
+    return False
+
+
+def retry_after(erro: BaseException) -> Optional[float]:
+    """
+    Obtém o tempo de espera pedido pelo servidor (Retry-After) em uma resposta de erro.
+
+    Args:
+        erro: Exceção capturada
+
+    Returns:
+        Tempo de espera em segundos, ou None se o servidor não informou
+    """
+    for causa in _cadeia_de_causas(erro):
+        resposta = getattr(causa, "response", None)
+        if not isinstance(resposta, httpx.Response):
+            continue
+        cabecalhos = resposta.headers
+        try:
+            if "retry-after-ms" in cabecalhos:
+                return float(cabecalhos["retry-after-ms"]) / 1000
+            if "retry-after" in cabecalhos:
+                valor = cabecalhos["retry-after"]
+                try:
+                    return float(valor)
+                except ValueError:
+                    # Formato de data HTTP
+                    data = parsedate_to_datetime(valor)
+                    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def tempo_de_espera(tentativa: int, erro: BaseException) -> Optional[float]:
+    """
+    Calcula a espera antes da próxima tentativa.
+
+    Usa backoff exponencial limitado a "retry_max_delay" com jitter completo
+    (valor aleatório entre zero e o limite da tentativa). Se o servidor pediu
+    uma espera maior (Retry-After), ela é respeitada.
+
+    Args:
+        tentativa: Número da tentativa que falhou (a partir de 1)
+        erro: Exceção capturada
+
+    Returns:
+        Espera em segundos, ou None se o Retry-After pedido passar de "retry_max_delay"
+        (nesse caso não vale a pena tentar novamente)
+    """
+    base = ConfigManager.get_config("nova", "retry_base_delay")
+    limite = ConfigManager.get_config("nova", "retry_max_delay")
+    espera = random.uniform(0, min(limite, base * 2 ** (tentativa - 1)))
+
+    pedido = retry_after(erro)
+    if pedido is not None:
+        if pedido > limite:
+            return None
+        espera = max(espera, pedido)
+    return espera
+
+
+class CircuitBreaker:
+    """Circuit breaker de um endpoint da API."""
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    SEMIABERTO = "semiaberto"
+
+    # Valores do gauge de estado nas métricas
+    _ESTADOS_METRICA = {FECHADO: 0, SEMIABERTO: 1, ABERTO: 2}
+
+    _instancias: Dict[str, "CircuitBreaker"] = {}
+    _instancias_lock = threading.Lock()
+
+    def __init__(self, endpoint: str, limite_falhas: int, tempo_abertura: float):
+        """
+        Args:
+            endpoint: Nome do endpoint protegido (usado nos logs e métricas)
+            limite_falhas: Falhas transitórias consecutivas que abrem o circuito
+            tempo_abertura: Tempo (segundos) que o circuito fica aberto antes da chamada de teste
+        """
+        self.endpoint = endpoint
+        self.limite_falhas = limite_falhas
+        self.tempo_abertura = tempo_abertura
+        self.estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_iniciado_em: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def obter(endpoint: str) -> "CircuitBreaker":
+        """
+        Obtém (e cria na primeira chamada) o circuit breaker de um endpoint.
+
+        Args:
+            endpoint: Nome do endpoint
+
+        Returns:
+            CircuitBreaker configurado em API_CONFIG
+        """
+        with CircuitBreaker._instancias_lock:
+            disjuntor = CircuitBreaker._instancias.get(endpoint)
+            if disjuntor is None:
+                disjuntor = CircuitBreaker(
+                    endpoint,
+                    limite_falhas=ConfigManager.get_config("nova", "circuit_breaker_failure_threshold"),
+                    tempo_abertura=ConfigManager.get_config("nova", "circuit_breaker_reset_timeout"),
+                )
+                CircuitBreaker._instancias[endpoint] = disjuntor
+            return disjuntor
+
+    def permitir(self) -> None:
+        """
+        Verifica se uma chamada pode ser feita.
+
+        Com o circuito aberto, apenas uma chamada de teste é liberada depois de
+        "tempo_abertura"; as demais são rejeitadas até o resultado do teste.
+
+        Raises:
+            CircuitOpenError: Se o circuito está aberto
+        """
+        from src.error_handler import CircuitOpenError
+
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return
+            agora = time.monotonic()
+            # Um teste sem resultado (por exemplo, cancelado) não bloqueia o circuito para sempre
+            teste_em_andamento = self._teste_iniciado_em is not None \
+                and agora - self._teste_iniciado_em < self.tempo_abertura
+            if agora - self._aberto_em >= self.tempo_abertura and not teste_em_andamento:
+                self._teste_iniciado_em = agora
+                self._mudar_estado(self.SEMIABERTO)
+                return
+            restante = max(0.0, self.tempo_abertura - (agora - self._aberto_em))
+
+        Metrics.increment(f"circuit_breaker.{self.endpoint}.rejected")
+        raise CircuitOpenError(
+            f"Circuito aberto para o endpoint '{self.endpoint}' após falhas repetidas",
+            {"endpoint": self.endpoint, "retry_in": round(restante, 1)},
+        )
+
+    def registrar_sucesso(self) -> None:
+        """Registra uma chamada bem-sucedida (ou com erro não transitório), fechando o circuito."""
+        with self._lock:
+            self._falhas = 0
+            self._teste_iniciado_em = None
+            if self.estado != self.FECHADO:
+                self._mudar_estado(self.FECHADO)
+
+    def registrar_falha(self) -> None:
+        """Registra uma falha transitória, abrindo o circuito ao atingir o limite."""
+        with self._lock:
+            self._falhas += 1
+            self._teste_iniciado_em = None
+            if self.estado == self.SEMIABERTO or self._falhas >= self.limite_falhas:
+                self._aberto_em = time.monotonic()
+                if self.estado != self.ABERTO:
+                    self._mudar_estado(self.ABERTO)
+
+    def _mudar_estado(self, estado: str) -> None:
+        # Chamado com self._lock adquirido
+        if estado == self.ABERTO:
+            logger.warning(f"Circuito aberto para '{self.endpoint}' após {self._falhas} falhas; "
+                           f"novas chamadas falham imediatamente por {self.tempo_abertura:g}s")
+        else:
+            logger.info(f"Circuito de '{self.endpoint}': {self.estado} -> {estado}")
+        self.estado = estado
+        Metrics.set_gauge(f"circuit_breaker.{self.endpoint}.state", self._ESTADOS_METRICA[estado])
+
+
+def _apos_falha(endpoint: str, disjuntor: CircuitBreaker, erro: Exception,
+                tentativa: int, pode_repetir: bool = True) -> Optional[float]:
+    """
+    Registra uma falha e decide se haverá nova tentativa.
+
+    Returns:
+        A espera antes da nova tentativa, ou None se o erro deve ser propagado
+    """
+    from src.error_handler import CircuitOpenError
+
+    causas = list(_cadeia_de_causas(erro))
+    if any(isinstance(causa, CircuitOpenError) for causa in causas):
+        # Rejeitada por um circuito aberto (deste ou de outro endpoint): nenhuma chamada foi feita
+        return None
+    if not erro_transitorio(erro):
+        # O endpoint respondeu; o erro não é de disponibilidade
+        disjuntor.registrar_sucesso()
+        return None
+
+    disjuntor.registrar_falha()
+    Metrics.increment(f"retry.{endpoint}.transient_errors")
+    # Tentativas já esgotadas em uma camada interna não são multiplicadas pelas externas
+    esgotado = any(getattr(causa, ATRIBUTO_ESGOTADO, False) for causa in causas)
+    espera = None
+    if pode_repetir and not esgotado and tentativa < ConfigManager.get_config("nova", "retry_max_attempts"):
+        espera = tempo_de_espera(tentativa, erro)
+    restante = tempo_restante()
+    if espera is not None and restante is not None and espera >= restante:
+        # A nova tentativa não terminaria dentro do prazo da requisição
+        espera = None
+    if espera is None:
+        _marcar_esgotado(erro)
+        return None
+
+    Metrics.increment(f"retry.{endpoint}.retries")
+    logger.warning(f"Falha transitória em '{endpoint}' (tentativa {tentativa}): {str(erro)}. "
+                   f"Nova tentativa em {espera:.2f}s")
+    return espera
+
+
+def _marcar_esgotado(erro: BaseException) -> None:
+    try:
+        setattr(erro, ATRIBUTO_ESGOTADO, True)
+    except AttributeError:
+        pass
+
+
+def executar_com_retry(endpoint: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Executa uma função síncrona com novas tentativas e circuit breaker.
+
+    Args:
+        endpoint: Nome do endpoint (um circuit breaker por endpoint)
+        func: Função a ser executada
+        *args, **kwargs: Argumentos da função
+
+    Returns:
+        O resultado da função
+
+    Raises:
+        CircuitOpenError: Se o circuito do endpoint está aberto
+        Exception: O último erro, se as tentativas se esgotarem ou o erro não for transitório
+    """
+    disjuntor = CircuitBreaker.obter(endpoint)
+    tentativa = 1
+    while True:
+        disjuntor.permitir()
+        try:
+            resultado = func(*args, **kwargs)
+        except Exception as e:
+            espera = _apos_falha(endpoint, disjuntor, e, tentativa)
+            if espera is None:
+                raise
+            time.sleep(espera)
+            tentativa += 1
+            continue
+        disjuntor.registrar_sucesso()
+        return resultado
+
+
+async def executar_com_retry_async(endpoint: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Executa uma função assíncrona com novas tentativas e circuit breaker.
+
+    Args:
+        endpoint: Nome do endpoint (um circuit breaker por endpoint)
+        func: Função assíncrona a ser executada
+        *args, **kwargs: Argumentos da função
+
+    Returns:
+        O resultado da função
+
+    Raises:
+        CircuitOpenError: Se o circuito do endpoint está aberto
+        Exception: O último erro, se as tentativas se esgotarem ou o erro não for transitório
+    """
+    disjuntor = CircuitBreaker.obter(endpoint)
+    tentativa = 1
+    while True:
+        disjuntor.permitir()
+        try:
+            resultado = await func(*args, **kwargs)
+        except Exception as e:
+            espera = _apos_falha(endpoint, disjuntor, e, tentativa)
+            if espera is None:
+                raise
+            await asyncio.sleep(espera)
+            tentativa += 1
+            continue
+        disjuntor.registrar_sucesso()
+        return resultado
+
+
+async def transmitir_com_retry(endpoint: str, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+    """
+    Consome um gerador assíncrono com novas tentativas e circuit breaker.
+
+    Uma nova tentativa só é feita se a falha ocorrer antes do primeiro item,
+    pois o que já foi entregue ao chamador não pode ser desfeito.
+
+    Args:
+        endpoint: Nome do endpoint (um circuit breaker por endpoint)
+        func: Função que cria o gerador assíncrono
+        *args, **kwargs: Argumentos da função
+
+    Yields:
+        Os itens produzidos pelo gerador
+    """
+    disjuntor = CircuitBreaker.obter(endpoint)
+    tentativa = 1
+    while True:
+        disjuntor.permitir()
+        produziu = False
+        try:
+            async for item in func(*args, **kwargs):
+                produziu = True
+                yield item
+        except Exception as e:
+            espera = _apos_falha(endpoint, disjuntor, e, tentativa, pode_repetir=not produziu)
+            if espera is None:
+                raise
+            await asyncio.sleep(espera)
+            tentativa += 1
+            continue
+        disjuntor.registrar_sucesso()
+        return
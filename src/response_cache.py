@@ -0,0 +1,272 @@
+"""
+Módulo para cache das respostas dos agentes.
+
+Este módulo implementa a camada de cache de respostas prevista na Fase 3 do plano
+de migração. As perguntas são normalizadas (minúsculas, sem acentos, pontuação e
+espaços extras, mas preservando números, sinais e operadores matemáticos) e
+combinadas com uma assinatura da configuração dos agentes, de modo que alterar as
+instruções de qualquer agente invalida automaticamente as respostas antigas. O
+cache tem dois níveis: um LRU em memória, consultado sem nenhum acesso a disco, e
+um banco SQLite com validade (TTL) que sobrevive entre execuções.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.metrics import Metrics
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("response_cache")
+
+# Termos preservados na normalização: palavras, números (com decimais) e símbolos
+# matemáticos, para que "2 + 2" e "2 - 2" não tenham a mesma chave
+_PADRAO_TERMOS = re.compile(r"\d+(?:\.\d+)*|[^\W\d]\w*|[+\-*/^=<>%()√≤≥≠]|(?<=[\d)])!", re.UNICODE)
+_PADRAO_DECIMAL = re.compile(r"(?<=\d)[.,](?=\d)")
+_PADRAO_EXPOENTE = re.compile(r"[⁰¹²³⁴⁵⁶⁷⁸⁹]+")
+_EXPOENTES = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+_OPERADORES = str.maketrans({"×": "*", "÷": "/", "−": "-", "–": "-"})
+
+
+def normalizar_pergunta(pergunta: str) -> str:
+    """
+    Normaliza uma pergunta para uso como chave de cache.
+
+    Args:
+        pergunta: Texto da pergunta
+
+    Returns:
+        str: Termos da pergunta em minúsculas e sem acentos, separados por um espaço.
+        Números, sinais e operadores matemáticos são mantidos; a demais pontuação é removida.
+    """
+    texto = _PADRAO_EXPOENTE.sub(lambda m: "^" + m.group().translate(_EXPOENTES), pergunta.lower())
+    texto = unicodedata.normalize("NFKD", texto.translate(_OPERADORES))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _PADRAO_DECIMAL.sub(".", texto)
+    return " ".join(_PADRAO_TERMOS.findall(texto))
+
+
+def _descrever_agente(agent: Any, visitados: set, partes: list) -> None:
+    if id(agent) in visitados:
+        return
+    visitados.add(id(agent))
+
+    instructions = agent.instructions
+    if callable(instructions):
+        instructions = getattr(instructions, "__qualname__", repr(instructions))
+    output_type = getattr(agent, "output_type", None)
+    partes.extend([
+        agent.name,
+        str(instructions),
+        str(getattr(agent, "handoff_description", None)),
+        str(getattr(agent, "model", None)),
+        getattr(output_type, "__name__", str(output_type)),
+    ])
+    for handoff in getattr(agent, "handoffs", []):
+        # Handoffs podem ser agentes ou objetos Handoff já configurados
+        destino = getattr(handoff, "agent", handoff)
+        if hasattr(destino, "instructions"):
+            _descrever_agente(destino, visitados, partes)
+        else:
+            partes.append(str(getattr(handoff, "agent_name", handoff)))
+
+
+def assinatura_agentes(*agentes: Any) -> str:
+    """
+    Calcula uma assinatura da configuração dos agentes.
+
+    Inclui nome, instruções, descrição, modelo e tipo de saída de cada agente e,
+    recursivamente, dos agentes de handoff, além do modelo configurado.
+
+    Args:
+        *agentes: Agentes que participam do fluxo
+
+    Returns:
+        str: Hash SHA-256 (hexadecimal) da configuração
+    """
+    partes = [str(ConfigManager.get_config("nova", "model"))]
+    visitados = set()
+    for agent in agentes:
+        _descrever_agente(agent, visitados, partes)
+    return hashlib.sha256("\0".join(partes).encode("utf-8")).hexdigest()
+
+
+def chave_cache(pergunta: str, assinatura: str) -> str:
+    """
+    Monta a chave de cache de uma pergunta.
+
+    Args:
+        pergunta: Texto da pergunta
+        assinatura: Assinatura da configuração dos agentes (ver assinatura_agentes)
+
+    Returns:
+        str: Chave de cache
+    """
+    texto = f"{assinatura}\0{normalizar_pergunta(pergunta)}"
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    resposta: str
+    trace_id: str
+    criado_em: float
+
+
+class ResponseCache:
+    """Cache de respostas em dois níveis: LRU em memória e SQLite em disco."""
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_entries: int, ttl: float, db_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Número máximo de respostas mantidas em memória
+            ttl: Validade das respostas, em segundos
+            db_path: Caminho do banco SQLite (None para manter apenas em memória)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS respostas ("
+                "chave TEXT PRIMARY KEY, resposta TEXT NOT NULL, "
+                "trace_id TEXT NOT NULL, criado_em REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM respostas WHERE criado_em < ?", (time.time() - ttl,))
+            self._conn.commit()
+
+    @staticmethod
+    def get_default() -> "ResponseCache":
+        """
+        Obtém (e cria na primeira chamada) o cache configurado em API_CONFIG.
+
+        Returns:
+            ResponseCache compartilhado pelo processo
+        """
+        with ResponseCache._default_lock:
+            if ResponseCache._default is None:
+                db_path = None
+                if ConfigManager.get_config("nova", "response_cache_persistent"):
+                    db_path = os.path.join(ConfigManager.get_cache_dir(), "respostas.db")
+                ResponseCache._default = ResponseCache(
+                    max_entries=ConfigManager.get_config("nova", "response_cache_size"),
+                    ttl=ConfigManager.get_config("nova", "response_cache_ttl"),
+                    db_path=db_path,
+                )
+            return ResponseCache._default
+
+    def _put_memory(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str, record_miss: bool = True) -> Optional[CachedResponse]:
+        """
+        Busca uma resposta no cache, primeiro em memória e depois em disco.
+
+        Args:
+            key: Chave da pergunta (ver chave_cache)
+            record_miss: Contabilizar a falta nas métricas (falso em consultas auxiliares)
+
+        Returns:
+            CachedResponse ou None se não houver resposta válida
+        """
+        limite = time.time() - self.ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.criado_em >= limite:
+                    self._entries.move_to_end(key)
+                    Metrics.increment("response_cache.hits_memory")
+                    return entry
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT resposta, trace_id, criado_em FROM respostas "
+                    "WHERE chave = ? AND criado_em >= ?",
+                    (key, limite)
+                ).fetchone()
+                if row is not None:
+                    entry = CachedResponse(*row)
+                    self._put_memory(key, entry)
+                    Metrics.increment("response_cache.hits_disk")
+                    return entry
+
+        if record_miss:
+            Metrics.increment("response_cache.misses")
+        return None
+
+    def put(self, key: str, resposta: str, trace_id: str) -> None:
+        """
+        Armazena uma resposta nos dois níveis do cache.
+
+        Args:
+            key: Chave da pergunta (ver chave_cache)
+            resposta: Resposta do agente
+            trace_id: ID do trace da execução que gerou a resposta
+        """
+        entry = CachedResponse(resposta=resposta, trace_id=trace_id, criado_em=time.time())
+        with self._lock:
+            self._put_memory(key, entry)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO respostas (chave, resposta, trace_id, criado_em) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, entry.resposta, entry.trace_id, entry.criado_em)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    # O cache em disco é apenas uma otimização; falhas não interrompem a resposta
+                    logger.warning(f"Falha ao gravar resposta no cache em disco: {str(e)}")
+
+    def clear(self) -> None:
+        """Remove todas as respostas dos dois níveis do cache."""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM respostas")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Obtém as estatísticas de uso do cache.
+
+        Returns:
+            Dicionário com acertos em memória e em disco, faltas, taxa de acerto e tamanho
+        """
+        hits_memory = Metrics.get_counter("response_cache.hits_memory")
+        hits_disk = Metrics.get_counter("response_cache.hits_disk")
+        misses = Metrics.get_counter("response_cache.misses")
+        total = hits_memory + hits_disk + misses
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "hits_memory": hits_memory,
+            "hits_disk": hits_disk,
+            "misses": misses,
+            "hit_rate": (hits_memory + hits_disk) / total if total else 0.0,
+            "size": size,
+        }
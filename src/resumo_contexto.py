@@ -0,0 +1,124 @@
+"""
+Módulo para resumo incremental do histórico das conversas.
+
+Este módulo implementa a estratégia de "Resumo Periódico" do plano de migração:
+quando uma conversa fica longa, as mensagens que saem da janela de contexto são
+condensadas em um resumo acumulado, guardado nos metadados da conversa e enviado
+ao agente como uma única mensagem inicial. O resumo é atualizado de forma
+incremental (resumo anterior + mensagens novas), nunca recalculado do zero, o
+que mantém o tamanho do prompt limitado mesmo em conversas muito longas.
+"""
+
+import os
+import sys
+from typing import Dict, List, Optional
+
+from agents import Agent, RunConfig, Runner
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.async_conversation_store import AsyncConversationStore
+from src.config_manager import ConfigManager
+from src.conversation_store import Message
+from src.logger import Logger
+from src.provedor_modelos import obter_provedor_modelos
+from src.resiliencia import executar_com_retry_async
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("resumo_contexto")
+
+# Chaves usadas nos metadados da conversa
+CHAVE_RESUMO = "resumo"
+CHAVE_MENSAGENS_RESUMIDAS = "mensagens_resumidas"
+
+resumo_agent = Agent(
+    name="Resumidor de conversas",
+    instructions="""Você mantém um resumo acumulado de uma conversa entre um estudante e agentes especialistas.
+    Você receberá o resumo atual (que pode estar vazio) e as próximas mensagens da conversa.
+    Produza um novo resumo que incorpore as novas mensagens ao resumo atual, preservando
+    as perguntas feitas, os conceitos explicados, os dados citados e as dúvidas em aberto.
+    Escreva em português, em no máximo 200 palavras, sem comentários adicionais.""",
+)
+
+
+def mensagem_resumo(resumo: str) -> Dict[str, str]:
+    """
+    Monta a mensagem inicial com o resumo da conversa no formato da SDK de Agentes.
+
+    Args:
+        resumo: Resumo acumulado da conversa
+
+    Returns:
+        Dict: Mensagem a ser colocada antes da janela de histórico
+    """
+    return {"role": "system", "content": f"Resumo da conversa até aqui:\n{resumo}"}
+
+
+def _formatar_mensagens(mensagens: List[Message]) -> str:
+    papeis = {"user": "Estudante", "assistant": "Especialista"}
+    return "\n".join(f"{papeis.get(msg.role, msg.role)}: {msg.content}" for msg in mensagens)
+
+
+async def _resumir(resumo_atual: Optional[str], mensagens: List[Message]) -> str:
+    entrada = (
+        f"Resumo atual:\n{resumo_atual or '(vazio)'}\n\n"
+        f"Próximas mensagens:\n{_formatar_mensagens(mensagens)}"
+    )
+    result = await executar_com_retry_async(
+        "responses", Runner.run, resumo_agent, entrada,
+        run_config=RunConfig(model_provider=obter_provedor_modelos())
+    )
+    return result.final_output
+
+
+async def atualizar_resumo(conversation_id: str, tamanho_janela: int) -> Optional[str]:
+    """
+    Incorpora ao resumo as mensagens que saíram da janela de contexto.
+
+    Só atua quando a conversa ultrapassa "summarization_threshold" mensagens e
+    há pelo menos "summarization_batch" mensagens fora da janela ainda não
+    resumidas; assim, o custo de resumir é diluído entre vários turnos. Apenas
+    essas mensagens são lidas do armazenamento. Falhas ao resumir não
+    interrompem o processamento: o resumo anterior continua sendo usado.
+
+    Args:
+        conversation_id: ID da conversa
+        tamanho_janela: Número de mensagens recentes enviadas integralmente ao agente
+
+    Returns:
+        O resumo acumulado atual, ou None se a conversa ainda não tem resumo
+    """
+    if not ConfigManager.get_config("nova", "summarization_enabled"):
+        return None
+
+    metadata = await AsyncConversationStore.get_metadata(conversation_id)
+    resumo = metadata.get(CHAVE_RESUMO)
+    resumidas = metadata.get(CHAVE_MENSAGENS_RESUMIDAS, 0)
+
+    resumo_conversa = await AsyncConversationStore.get_conversation_summary(conversation_id)
+    total = resumo_conversa.message_count if resumo_conversa else 0
+    pendentes = total - tamanho_janela - resumidas
+
+    limiar = ConfigManager.get_config("nova", "summarization_threshold")
+    lote = ConfigManager.get_config("nova", "summarization_batch")
+    if total <= limiar or pendentes < lote:
+        return resumo
+
+    # Ler do fim apenas até a primeira mensagem ainda não resumida
+    mensagens = await AsyncConversationStore.get_recent_messages(conversation_id, n=total - resumidas)
+    fora_da_janela = mensagens[:pendentes]
+
+    logger.info(f"Resumindo {len(fora_da_janela)} mensagens da conversa {conversation_id} "
+                f"({resumidas} já resumidas)")
+    try:
+        resumo = await _resumir(resumo, fora_da_janela)
+    except Exception as e:
+        logger.warning(f"Falha ao atualizar o resumo da conversa {conversation_id}: {str(e)}")
+        return metadata.get(CHAVE_RESUMO)
+
+    await AsyncConversationStore.update_metadata(conversation_id, {
+        CHAVE_RESUMO: resumo,
+        CHAVE_MENSAGENS_RESUMIDAS: resumidas + len(fora_da_janela),
+    })
+    return resumo
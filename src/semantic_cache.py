@@ -0,0 +1,279 @@
+"""
+Módulo para o cache semântico de respostas.
+
+Complementa o cache exato de respostas (response_cache) encontrando perguntas
+quase idênticas a perguntas já respondidas, por exemplo com palavras em outra
+ordem ou flexões diferentes. Cada pergunta é representada por uma assinatura
+MinHash calculada sobre seus termos normalizados (incluindo números, variáveis e
+operadores), pares de termos consecutivos e trigramas de caracteres; as assinaturas
+ficam em uma matriz NumPy mapeada em memória (np.memmap), e a busca usa LSH
+(Locality-Sensitive Hashing) por bandas: cada banda mantém um vetor ordenado de
+hashes consultado com busca binária, de modo que o custo de uma consulta cresce
+apenas com o logaritmo do número de perguntas armazenadas.
+
+Semelhança textual não basta para perguntas de matemática: "Quanto é 2 + 2?" e
+"Quanto é 7 + 9?" diferem em poucos termos. Por isso, cada entrada guarda também
+um hash da sua expressão matemática (números, operadores e variáveis), e só é
+aceita uma pergunta com exatamente a mesma expressão.
+"""
+
+import os
+import sys
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.logger import Logger
+from src.metrics import Metrics
+from src.response_cache import normalizar_pergunta
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("semantic_cache")
+
+# Primo de Mersenne usado nas permutações do MinHash
+_PRIMO = np.uint64((1 << 61) - 1)
+_MASCARA_32 = np.uint64(0xFFFFFFFF)
+
+# Número de inserções acumuladas antes de reordenar os vetores das bandas
+MAX_PENDENTES = 4096
+
+# Capacidade inicial da matriz de assinaturas
+CAPACIDADE_INICIAL = 1024
+
+
+def _numero_ou_operador(termo: str) -> bool:
+    return termo[0].isdigit() or not termo[0].isalpha()
+
+
+def _expressao(termos: List[str]) -> str:
+    """Números, operadores e variáveis (letras isoladas junto a eles), na ordem da pergunta."""
+    expressao = []
+    for i, termo in enumerate(termos):
+        vizinhos = termos[max(0, i - 1):i] + termos[i + 1:i + 2]
+        if _numero_ou_operador(termo) or (len(termo) == 1 and any(map(_numero_ou_operador, vizinhos))):
+            expressao.append(termo)
+    return " ".join(expressao)
+
+
+def _hash_expressao(pergunta: str) -> str:
+    return format(zlib.crc32(_expressao(normalizar_pergunta(pergunta).split()).encode("utf-8")), "08x")
+
+
+def _shingles(pergunta: str) -> List[str]:
+    termos = normalizar_pergunta(pergunta).split()
+    shingles = set(termos)
+    # Pares consecutivos distinguem a ordem ("x ^ 2 = 4" e "x = 2 ^ 4")
+    shingles.update(f"{a} {b}" for a, b in zip(termos, termos[1:]))
+    for termo in termos:
+        shingles.update(termo[i:i + 3] for i in range(len(termo) - 2))
+    return list(shingles)
+
+
+class SemanticCache:
+    """Índice MinHash/LSH das perguntas já respondidas."""
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, directory: str, threshold: float, num_perm: int = 64, bands: int = 8):
+        """
+        Args:
+            directory: Diretório da matriz de assinaturas e das chaves
+            threshold: Similaridade (Jaccard estimada) mínima para aceitar uma pergunta
+            num_perm: Número de permutações do MinHash
+            bands: Número de bandas do LSH (deve dividir num_perm)
+        """
+        if num_perm % bands != 0:
+            raise ValueError("O número de bandas deve dividir o número de permutações")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+
+        # Parâmetros fixos (semente constante) para que as assinaturas gravadas continuem válidas
+        gerador = np.random.RandomState(1)
+        self._a = gerador.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = gerador.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._multiplicadores = gerador.randint(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        os.makedirs(directory, exist_ok=True)
+        self._signatures_path = os.path.join(directory, "signatures.npy")
+        self._keys_path = os.path.join(directory, "keys.txt")
+
+        # Cada linha de keys.txt: chave do cache de respostas e hash da expressão matemática
+        self.keys: List[str] = []
+        self._expressoes: List[Optional[str]] = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        key, _, expressao = line.rstrip("\n").partition("\t")
+                        self.keys.append(key)
+                        # Entradas gravadas sem o hash (versão anterior) nunca são aceitas
+                        self._expressoes.append(expressao or None)
+
+        if os.path.exists(self._signatures_path):
+            self._signatures = np.load(self._signatures_path, mmap_mode="r+")
+            if self._signatures.shape[1] != num_perm:
+                raise ValueError("Matriz de assinaturas criada com outro número de permutações")
+        else:
+            self._signatures = np.lib.format.open_memmap(
+                self._signatures_path, mode="w+", dtype=np.uint32,
+                shape=(CAPACIDADE_INICIAL, num_perm)
+            )
+        # Uma chave sem assinatura gravada indica uma escrita interrompida
+        del self.keys[len(self._signatures):]
+        del self._expressoes[len(self._signatures):]
+
+        self._pendentes: Dict[Tuple[int, int], List[int]] = {}
+        self._num_pendentes = 0
+        self._reconstruir_bandas()
+
+    @staticmethod
+    def get_default() -> "SemanticCache":
+        """
+        Obtém (e cria na primeira chamada) o cache semântico configurado em API_CONFIG.
+
+        Returns:
+            SemanticCache compartilhado pelo processo
+        """
+        with SemanticCache._default_lock:
+            if SemanticCache._default is None:
+                SemanticCache._default = SemanticCache(
+                    directory=os.path.join(ConfigManager.get_cache_dir(), "semantic"),
+                    threshold=ConfigManager.get_config("nova", "semantic_cache_threshold"),
+                )
+            return SemanticCache._default
+
+    def signature(self, pergunta: str) -> Optional[np.ndarray]:
+        """
+        Calcula a assinatura MinHash de uma pergunta.
+
+        Args:
+            pergunta: Texto da pergunta
+
+        Returns:
+            Vetor uint32 com num_perm posições, ou None se a pergunta não tem termos indexáveis
+        """
+        shingles = _shingles(pergunta)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permutados = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIMO
+        return (permutados & _MASCARA_32).min(axis=1).astype(np.uint32)
+
+    def _hash_bandas(self, signatures: np.ndarray) -> np.ndarray:
+        bandas = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (bandas * self._multiplicadores).sum(axis=2, dtype=np.uint64)
+
+    def _reconstruir_bandas(self) -> None:
+        total = len(self.keys)
+        hashes = self._hash_bandas(np.asarray(self._signatures[:total]))
+        self._bandas = []
+        for banda in range(self.bands):
+            ordem = np.argsort(hashes[:, banda], kind="stable")
+            self._bandas.append((hashes[ordem, banda], ordem.astype(np.int64)))
+        self._pendentes.clear()
+        self._num_pendentes = 0
+
+    def _candidatos(self, hashes: np.ndarray) -> np.ndarray:
+        encontrados = []
+        for banda, valor in enumerate(hashes):
+            ordenados, linhas = self._bandas[banda]
+            inicio = np.searchsorted(ordenados, valor, side="left")
+            fim = np.searchsorted(ordenados, valor, side="right")
+            if fim > inicio:
+                encontrados.append(linhas[inicio:fim])
+            pendentes = self._pendentes.get((banda, int(valor)))
+            if pendentes:
+                encontrados.append(np.asarray(pendentes, dtype=np.int64))
+        if not encontrados:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(encontrados))
+
+    def lookup(self, pergunta: str) -> List[Tuple[str, float]]:
+        """
+        Busca perguntas já respondidas semelhantes a uma pergunta.
+
+        Args:
+            pergunta: Texto da pergunta
+
+        Returns:
+            Lista de (chave do cache de respostas, similaridade) com similaridade
+            acima do limiar e a mesma expressão matemática, da mais para a menos semelhante
+        """
+        signature = self.signature(pergunta)
+        if signature is None:
+            return []
+        expressao = _hash_expressao(pergunta)
+
+        hashes = self._hash_bandas(signature[None, :])[0]
+        with self._lock:
+            candidatos = self._candidatos(hashes)
+            if candidatos.size == 0:
+                return []
+            similaridades = (self._signatures[candidatos] == signature).mean(axis=1)
+            ordem = np.argsort(-similaridades, kind="stable")
+            Metrics.increment("semantic_cache.candidates", int(candidatos.size))
+            return [
+                (self.keys[candidatos[i]], float(similaridades[i]))
+                for i in ordem
+                if similaridades[i] >= self.threshold and self._expressoes[candidatos[i]] == expressao
+            ]
+
+    def _garantir_capacidade(self, total: int) -> None:
+        capacidade = len(self._signatures)
+        if total <= capacidade:
+            return
+        while capacidade < total:
+            capacidade *= 2
+        temporario = self._signatures_path + ".tmp"
+        nova = np.lib.format.open_memmap(
+            temporario, mode="w+", dtype=np.uint32, shape=(capacidade, self.num_perm)
+        )
+        nova[:len(self.keys)] = self._signatures[:len(self.keys)]
+        nova.flush()
+        del nova
+        self._signatures.flush()
+        self._signatures = None
+        os.replace(temporario, self._signatures_path)
+        self._signatures = np.load(self._signatures_path, mmap_mode="r+")
+
+    def add(self, pergunta: str, key: str) -> None:
+        """
+        Registra uma pergunta respondida no índice.
+
+        Args:
+            pergunta: Texto da pergunta
+            key: Chave da resposta no cache de respostas
+        """
+        signature = self.signature(pergunta)
+        if signature is None:
+            return
+
+        hashes = self._hash_bandas(signature[None, :])[0]
+        expressao = _hash_expressao(pergunta)
+        with self._lock:
+            linha = len(self.keys)
+            self._garantir_capacidade(linha + 1)
+            self._signatures[linha] = signature
+            # A chave é gravada por último: só então a entrada passa a existir
+            with open(self._keys_path, 'a', encoding='utf-8') as f:
+                f.write(f"{key}\t{expressao}\n")
+            self.keys.append(key)
+            self._expressoes.append(expressao)
+
+            for banda, valor in enumerate(hashes):
+                self._pendentes.setdefault((banda, int(valor)), []).append(linha)
+            self._num_pendentes += 1
+            if self._num_pendentes >= MAX_PENDENTES:
+                self._reconstruir_bandas()
@@ -0,0 +1,89 @@
+"""
+Módulo para agrupamento (single-flight) de requisições idênticas simultâneas.
+
+Quando várias chamadas com a mesma chave chegam enquanto a primeira ainda está
+em andamento, apenas a primeira (a "líder") executa o trabalho; as demais
+aguardam o mesmo resultado. Isso evita que uma turma inteira enviando a mesma
+pergunta ao mesmo tempo dispare N execuções idênticas dos agentes.
+
+A execução compartilhada não herda o prazo da chamada líder: cada chamada
+aguarda o resultado apenas até o próprio prazo, e a execução só é cancelada
+quando a última chamada que aguardava desiste, de modo que ela dura até o prazo
+mais longo entre as chamadas agrupadas.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from src.metrics import Metrics
+from src.prazo import aguardar_com_prazo, sem_prazo
+
+
+class SingleFlight:
+    """Agrupa execuções simultâneas com a mesma chave em uma única tarefa."""
+
+    def __init__(self, nome: str):
+        """
+        Args:
+            nome: Nome usado nas métricas (por exemplo, "perguntas")
+        """
+        self.nome = nome
+        self._em_andamento: Dict[str, asyncio.Task] = {}
+        # Número de chamadas aguardando cada tarefa em andamento
+        self._aguardando: Dict[asyncio.Task, int] = {}
+
+    def _remover(self, chave: str, tarefa: asyncio.Task) -> None:
+        if self._em_andamento.get(chave) is tarefa:
+            del self._em_andamento[chave]
+
+    async def executar(self, chave: str, fabrica: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Executa o trabalho da chave ou aguarda a execução já em andamento.
+
+        A tarefa compartilhada roda sem o prazo da chamada líder e não é cancelada
+        se a líder for cancelada ou esgotar o prazo, pois outras chamadas podem
+        estar aguardando o mesmo resultado; ela só é cancelada quando nenhuma
+        chamada a aguarda mais.
+
+        Args:
+            chave: Chave que identifica requisições equivalentes
+            fabrica: Função que cria a corrotina do trabalho (chamada apenas pela líder)
+
+        Returns:
+            (resultado, True se esta chamada foi a líder)
+
+        Raises:
+            DeadlineExceededError: Se o prazo desta chamada acabar antes do resultado
+        """
+        tarefa = self._em_andamento.get(chave)
+        lider = tarefa is None
+        if lider:
+            # A tarefa copia o contexto na criação: ela não herda o prazo da líder
+            with sem_prazo():
+                tarefa = asyncio.get_running_loop().create_task(fabrica())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda t: self._remover(chave, t))
+            Metrics.increment(f"single_flight.{self.nome}.leaders")
+        else:
+            Metrics.increment(f"single_flight.{self.nome}.coalesced")
+        Metrics.set_gauge(f"single_flight.{self.nome}.in_flight", len(self._em_andamento))
+
+        self._aguardando[tarefa] = self._aguardando.get(tarefa, 0) + 1
+        try:
+            return await aguardar_com_prazo(asyncio.shield(tarefa), "a execução compartilhada"), lider
+        finally:
+            self._aguardando[tarefa] -= 1
+            if not self._aguardando[tarefa]:
+                del self._aguardando[tarefa]
+                if not tarefa.done():
+                    # Ninguém mais aguarda o resultado: liberar a execução
+                    Metrics.increment(f"single_flight.{self.nome}.abandoned")
+                    self._remover(chave, tarefa)
+                    tarefa.cancel()
+
+    def em_andamento(self) -> int:
+        """
+        Returns:
+            int: Número de chaves com execução em andamento
+        """
+        return len(self._em_andamento)
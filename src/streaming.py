@@ -0,0 +1,45 @@
+"""
+Módulo para transmissão das respostas dos agentes em streaming.
+
+As funções de processamento com streaming produzem eventos na forma de tuplas
+(tipo, valor):
+
+- ("delta", texto): trecho da resposta gerado pelo agente;
+- ("fim", resultado): resultado final, no mesmo formato retornado pela versão
+  sem streaming da função.
+"""
+
+import time
+from typing import AsyncIterator
+
+from agents import RunResultStreaming
+from openai.types.responses import ResponseTextDeltaEvent
+
+from src.metrics import Metrics
+
+EVENTO_DELTA = "delta"
+EVENTO_FIM = "fim"
+
+
+async def transmitir_texto(result: RunResultStreaming, inicio: float) -> AsyncIterator[str]:
+    """
+    Produz os trechos de texto de uma execução em streaming à medida que chegam.
+
+    O tempo até o primeiro trecho (time-to-first-token) é registrado na métrica
+    "stream.ttft".
+
+    Args:
+        result: Resultado de Runner.run_streamed
+        inicio: Instante (time.perf_counter) em que o processamento da pergunta começou
+
+    Returns:
+        Iterador assíncrono com os trechos da resposta
+    """
+    primeiro = True
+    async for event in result.stream_events():
+        if event.type != "raw_response_event" or not isinstance(event.data, ResponseTextDeltaEvent):
+            continue
+        if primeiro:
+            Metrics.observe("stream.ttft", time.perf_counter() - inicio)
+            primeiro = False
+        yield event.data.delta
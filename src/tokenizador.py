@@ -0,0 +1,37 @@
+"""
+Módulo para estimativa local de tokens.
+
+Este módulo implementa uma contagem aproximada de tokens que roda offline, sem
+chamadas à API, usada para limitar o tamanho do contexto enviado aos agentes.
+"""
+
+import re
+
+# Palavras, números ou sinais de pontuação isolados
+_PADRAO_TOKENS = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Média aproximada de caracteres por token em palavras longas
+CARACTERES_POR_TOKEN = 4
+
+
+def contar_tokens(texto: str) -> int:
+    """
+    Estima o número de tokens de um texto.
+
+    Cada sinal de pontuação conta como um token e cada palavra conta como um
+    token a cada CARACTERES_POR_TOKEN caracteres, aproximando a divisão em
+    subpalavras feita pelos tokenizadores BPE dos modelos da OpenAI.
+
+    Args:
+        texto: Texto a ser analisado
+
+    Returns:
+        int: Número estimado de tokens
+    """
+    if not texto:
+        return 0
+
+    total = 0
+    for parte in _PADRAO_TOKENS.findall(texto):
+        total += max(1, -(-len(parte) // CARACTERES_POR_TOKEN))
+    return total
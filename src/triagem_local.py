@@ -0,0 +1,327 @@
+"""
+Módulo para triagem local das perguntas, sem chamada ao modelo.
+
+Este módulo implementa um classificador Naive Bayes multinomial que escolhe o
+agente especialista a partir dos termos da pergunta. Ele é treinado com as
+instruções e descrições dos próprios especialistas e com uma amostra das
+conversas mais recentes (cada pergunta é rotulada pelo especialista cuja
+assinatura aparece na resposta seguinte), e continua aprendendo com as decisões
+da triagem feita pelo modelo. Quando a confiança passa do limiar configurado, a
+pergunta vai direto para o especialista, economizando a chamada ao agente de
+triagem.
+
+O treinamento com as conversas roda em segundo plano; até ele terminar, as
+perguntas seguem pela triagem do modelo.
+"""
+
+import math
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from agents import Agent
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config_manager import ConfigManager
+from src.conversation_store import ConversationStore
+from src.logger import Logger
+from src.metrics import Metrics
+from src.relevancia import tokenizar_termos
+
+# Configurar logger específico para este módulo
+logger = Logger.setup("triagem_local")
+
+# Suavização de Laplace das frequências dos termos
+SUAVIZACAO = 1.0
+
+# Peso dos documentos derivados das instruções dos agentes, em relação a uma pergunta
+PESO_INSTRUCOES = 3
+
+# Número de triagens registradas entre dois relatórios no log
+INTERVALO_RELATORIO = 100
+
+
+class ClassificadorTriagem:
+    """Classificador Naive Bayes multinomial de perguntas por especialista."""
+
+    def __init__(self, especialistas: List[Agent], palavras_chave: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            especialistas: Agentes especialistas entre os quais a pergunta é distribuída
+            palavras_chave: Termos típicos de cada especialista (nome do agente -> texto),
+                usados como exemplos iniciais junto com as instruções
+        """
+        self.especialistas = {agent.name: agent for agent in especialistas}
+        self._documentos: Counter = Counter()
+        self._termos: Dict[str, Counter] = {nome: Counter() for nome in self.especialistas}
+        self._total_termos: Counter = Counter()
+        self._vocabulario: set = set()
+        self._lock = threading.Lock()
+        self._pronto = threading.Event()
+
+        for agent in especialistas:
+            texto = f"{agent.handoff_description or ''} {agent.instructions}"
+            texto += " " + (palavras_chave or {}).get(agent.name, "")
+            for _ in range(PESO_INSTRUCOES):
+                self.adicionar_exemplo(texto, agent.name)
+
+    def adicionar_exemplo(self, pergunta: str, especialista: str) -> None:
+        """
+        Acrescenta uma pergunta rotulada ao modelo.
+
+        Args:
+            pergunta: Texto da pergunta
+            especialista: Nome do agente especialista que a respondeu
+        """
+        if especialista not in self.especialistas:
+            return
+        termos = Counter(tokenizar_termos(pergunta))
+        if not termos:
+            return
+        with self._lock:
+            self._documentos[especialista] += 1
+            self._termos[especialista].update(termos)
+            self._total_termos[especialista] += sum(termos.values())
+            self._vocabulario.update(termos)
+
+    @property
+    def pronto(self) -> bool:
+        """True depois que o treinamento com as conversas armazenadas terminou."""
+        return self._pronto.is_set()
+
+    def marcar_pronto(self) -> None:
+        self._pronto.set()
+
+    def treinar_com_conversas(self, max_conversas: Optional[int] = None,
+                              max_mensagens: Optional[int] = None) -> int:
+        """
+        Treina o modelo com as conversas armazenadas.
+
+        Cada pergunta do usuário é rotulada pelo especialista cujo nome aparece na
+        resposta seguinte (os especialistas assinam suas respostas). As conversas
+        são escolhidas pelo índice de resumos, da mais recente para a mais antiga,
+        e de cada uma são lidas apenas as mensagens mais recentes.
+
+        Args:
+            max_conversas: Número máximo de conversas usadas (None para todas)
+            max_mensagens: Número máximo de mensagens lidas por conversa (None para todas)
+
+        Returns:
+            int: Número de perguntas usadas no treinamento
+        """
+        exemplos = 0
+        for resumo in ConversationStore.list_conversation_summaries(limit=max_conversas):
+            mensagens = ConversationStore.get_recent_messages(resumo.id, n=max_mensagens)
+            for pergunta, resposta in zip(mensagens, mensagens[1:]):
+                if pergunta.role != "user" or resposta.role != "assistant":
+                    continue
+                especialista = self.especialista_da_resposta(resposta.content)
+                if especialista:
+                    self.adicionar_exemplo(pergunta.content, especialista)
+                    exemplos += 1
+        return exemplos
+
+    def especialista_da_resposta(self, resposta: str) -> Optional[str]:
+        """
+        Identifica o especialista pela assinatura presente na resposta.
+
+        Args:
+            resposta: Texto da resposta
+
+        Returns:
+            Nome do especialista, ou None se nenhuma (ou mais de uma) assinatura aparecer
+        """
+        encontrados = [nome for nome in self.especialistas if nome in resposta]
+        return encontrados[0] if len(encontrados) == 1 else None
+
+    def classificar(self, pergunta: str) -> Tuple[Optional[str], float]:
+        """
+        Estima o especialista mais provável para uma pergunta.
+
+        Args:
+            pergunta: Texto da pergunta
+
+        Returns:
+            (nome do especialista, probabilidade estimada); (None, 0.0) se a pergunta
+            não contém nenhum termo conhecido
+        """
+        with self._lock:
+            termos = [termo for termo in tokenizar_termos(pergunta) if termo in self._vocabulario]
+            if not termos:
+                return None, 0.0
+
+            total_documentos = sum(self._documentos.values())
+            tamanho_vocabulario = len(self._vocabulario)
+            pontuacoes = {}
+            for nome in self.especialistas:
+                denominador = self._total_termos[nome] + SUAVIZACAO * tamanho_vocabulario
+                pontuacao = math.log((self._documentos[nome] + 1) / (total_documentos + len(self.especialistas)))
+                for termo in termos:
+                    pontuacao += math.log((self._termos[nome][termo] + SUAVIZACAO) / denominador)
+                pontuacoes[nome] = pontuacao
+
+        # Normalizar as pontuações (log) em probabilidades
+        maximo = max(pontuacoes.values())
+        exponenciais = {nome: math.exp(p - maximo) for nome, p in pontuacoes.items()}
+        soma = sum(exponenciais.values())
+        melhor = max(exponenciais, key=exponenciais.get)
+        return melhor, exponenciais[melhor] / soma
+
+
+_classificador: Optional[ClassificadorTriagem] = None
+_classificador_lock = threading.Lock()
+
+
+def _treinar_em_segundo_plano(classificador: ClassificadorTriagem) -> None:
+    try:
+        exemplos = classificador.treinar_com_conversas(
+            ConfigManager.get_config("nova", "local_triage_training_conversations"),
+            ConfigManager.get_config("nova", "local_triage_training_messages")
+        )
+        logger.info(f"Triagem local treinada com {exemplos} perguntas das conversas armazenadas")
+    except Exception as e:
+        # Sem histórico utilizável, o modelo fica apenas com as instruções dos agentes
+        logger.warning(f"Falha ao treinar a triagem local com as conversas: {str(e)}")
+    finally:
+        classificador.marcar_pronto()
+
+
+def obter_classificador(especialistas: List[Agent],
+                        palavras_chave: Optional[Dict[str, str]] = None) -> ClassificadorTriagem:
+    """
+    Obtém o classificador de triagem local, iniciando seu treinamento na primeira chamada.
+
+    O treinamento com as conversas armazenadas roda em uma thread em segundo
+    plano; enquanto "pronto" for False, os chamadores devem usar a triagem pelo modelo.
+
+    Args:
+        especialistas: Agentes especialistas disponíveis
+        palavras_chave: Termos típicos de cada especialista (nome do agente -> texto)
+
+    Returns:
+        ClassificadorTriagem compartilhado pelo processo
+    """
+    global _classificador
+    with _classificador_lock:
+        if _classificador is None:
+            _classificador = ClassificadorTriagem(especialistas, palavras_chave)
+            threading.Thread(target=_treinar_em_segundo_plano, args=(_classificador,),
+                             name="treino-triagem-local", daemon=True).start()
+        return _classificador
+
+
+def triagem_local(pergunta: str, especialistas: List[Agent],
+                  palavras_chave: Optional[Dict[str, str]] = None) -> Optional[Agent]:
+    """
+    Escolhe o especialista localmente quando a confiança passa do limiar configurado.
+
+    Args:
+        pergunta: Texto da pergunta
+        especialistas: Agentes especialistas disponíveis
+        palavras_chave: Termos típicos de cada especialista (nome do agente -> texto)
+
+    Returns:
+        O agente especialista escolhido, ou None para usar a triagem pelo modelo
+    """
+    if not ConfigManager.get_config("nova", "local_triage_enabled"):
+        return None
+
+    classificador = obter_classificador(especialistas, palavras_chave)
+    if not classificador.pronto:
+        Metrics.increment("triage.llm_path")
+        logger.debug("Triagem local ainda em treinamento: usando a triagem pelo modelo")
+        return None
+
+    nome, confianca = classificador.classificar(pergunta)
+    limiar = ConfigManager.get_config("nova", "local_triage_threshold")
+    if nome is None or confianca < limiar:
+        Metrics.increment("triage.llm_path")
+        logger.debug(f"Triagem local sem confiança suficiente ({nome}, {confianca:.2f})")
+        return None
+
+    Metrics.increment("triage.fast_path")
+    logger.info(f"Triagem local: {nome} (confiança {confianca:.2f})")
+    return classificador.especialistas[nome]
+
+
+def especialista_fixo(pergunta: str, ultimo_especialista: Optional[str], especialistas: List[Agent],
+                      palavras_chave: Optional[Dict[str, str]] = None) -> Optional[Agent]:
+    """
+    Mantém a pergunta com o especialista que respondeu o turno anterior da conversa.
+
+    O classificador local serve como verificação barata de mudança de assunto:
+    se ele indica outro especialista com confiança acima de "topic_shift_threshold",
+    ou se não reconhece nenhum termo da pergunta (e portanto não pode confirmar o
+    assunto), a pergunta volta para a triagem normal.
+
+    Args:
+        pergunta: Texto da pergunta
+        ultimo_especialista: Nome do especialista do turno anterior (None se não houver)
+        especialistas: Agentes especialistas disponíveis
+        palavras_chave: Termos típicos de cada especialista (nome do agente -> texto)
+
+    Returns:
+        O agente do turno anterior, ou None para seguir a triagem normal
+    """
+    if not ultimo_especialista or not ConfigManager.get_config("nova", "sticky_routing_enabled"):
+        return None
+
+    classificador = obter_classificador(especialistas, palavras_chave)
+    # Sem o classificador treinado, não há como detectar mudança de assunto
+    if not classificador.pronto or ultimo_especialista not in classificador.especialistas:
+        return None
+
+    nome, confianca = classificador.classificar(pergunta)
+    if nome is None:
+        Metrics.increment("triage.topic_unknown")
+        logger.debug("Triagem local sem termos conhecidos: usando a triagem normal")
+        return None
+    if nome != ultimo_especialista and confianca >= ConfigManager.get_config("nova", "topic_shift_threshold"):
+        Metrics.increment("triage.topic_shift")
+        logger.info(f"Mudança de assunto detectada: {ultimo_especialista} -> {nome} (confiança {confianca:.2f})")
+        return None
+
+    Metrics.increment("triage.sticky")
+    logger.info(f"Mantendo o especialista do turno anterior: {ultimo_especialista}")
+    return classificador.especialistas[ultimo_especialista]
+
+
+def registrar_triagem(pergunta: str, especialista: str, latencia: float, caminho_rapido: bool) -> None:
+    """
+    Registra o resultado de uma triagem e a latência da resposta.
+
+    As decisões da triagem pelo modelo também alimentam o classificador local.
+    A cada INTERVALO_RELATORIO triagens, a taxa de uso do caminho rápido e a
+    latência média economizada são registradas no log.
+
+    Args:
+        pergunta: Texto da pergunta
+        especialista: Nome do agente que respondeu
+        latencia: Tempo total da resposta (segundos)
+        caminho_rapido: True se a triagem local foi usada
+    """
+    if caminho_rapido:
+        Metrics.observe("triage.fast_path_latency", latencia)
+    else:
+        Metrics.observe("triage.llm_path_latency", latencia)
+        if _classificador is not None:
+            _classificador.adicionar_exemplo(pergunta, especialista)
+
+    Metrics.increment("triage.recorded")
+    if int(Metrics.get_counter("triage.recorded")) % INTERVALO_RELATORIO:
+        return
+
+    rapidas = Metrics.get_counter("triage.fast_path") + Metrics.get_counter("triage.sticky")
+    total = rapidas + Metrics.get_counter("triage.llm_path")
+    media_llm = Metrics.mean("triage.llm_path_latency")
+    media_rapida = Metrics.mean("triage.fast_path_latency")
+    economia = media_llm - media_rapida if media_llm is not None and media_rapida is not None else None
+    logger.info(
+        f"Triagem local: taxa de uso {rapidas / total if total else 0.0:.0%} ({int(rapidas)}/{int(total)}), "
+        f"latência economizada estimada "
+        f"{f'{economia:.2f}s' if economia is not None else 'indisponível'} por pergunta"
+    )
@@ -84,6 +84,31 @@ async def processar_pergunta_padrao(pergunta, processador_func):
         print(f"\nOcorreu um erro inesperado: {str(e)}")
         return False, str(e)
 
+async def exibir_resposta_em_streaming(eventos, prefixo="\nResposta:\n"):
+    """
+    Exibe os trechos de uma resposta em streaming à medida que chegam.
+    
+    Args:
+        eventos: Iterador assíncrono de eventos ("delta", texto) / ("fim", resultado)
+        prefixo (str): Texto exibido antes do primeiro trecho da resposta
+        
+    Returns:
+        O resultado final da função de processamento (valor do evento "fim")
+    """
+    resultado = None
+    inicio_exibido = False
+    async for tipo, valor in eventos:
+        if tipo == "delta":
+            if not inicio_exibido:
+                print(prefixo, end="", flush=True)
+                inicio_exibido = True
+            print(valor, end="", flush=True)
+        else:
+            resultado = valor
+    if inicio_exibido:
+        print()
+    return resultado
+
 def verificar_comando_saida(pergunta):
     """
     Verifica se o usuário digitou o comando para sair do programa.
@@ -0,0 +1,38 @@
+"""
+Configuração compartilhada dos testes.
+
+Os testes usam modelos, relógios e arquivos falsos: nenhuma chamada é feita à
+API da OpenAI.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Adicionar o diretório raiz ao path para permitir importações dos módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# src/main.py encerra o processo sem a chave; os testes não chamam a API
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")
+
+from src.config_manager import API_CONFIG
+from src.metrics import Metrics
+
+
+@pytest.fixture
+def configurar(monkeypatch):
+    """Altera configurações de API_CONFIG["nova"] apenas durante o teste."""
+    def _configurar(**valores):
+        for chave, valor in valores.items():
+            monkeypatch.setitem(API_CONFIG["nova"], chave, valor)
+    return _configurar
+
+
+@pytest.fixture(autouse=True)
+def metricas_limpas():
+    """Cada teste começa com as métricas zeradas."""
+    Metrics._counters.clear()
+    Metrics._gauges.clear()
+    Metrics._samples.clear()
+    yield
@@ -0,0 +1,146 @@
+"""Testes das requisições redundantes aos especialistas (src/hedging.py)."""
+
+import asyncio
+
+import pytest
+from agents import ModelSettings
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+
+from src import hedging, provedor_modelos
+from src.hedging import ModeloComHedge
+from src.limitador_taxa import LimitadorTaxa
+from src.metrics import Metrics
+from src.provedor_modelos import ProvedorModelosControlado
+
+METRICA = "teste.latencia"
+
+
+class ModeloFalso(Model):
+    """
+    Modelo falso: cada chamada usa o próximo comportamento da lista, registrando os cancelamentos.
+
+    Um comportamento é uma duração, um erro ou uma tupla (duração, erro) para falhar após a espera.
+    """
+
+    def __init__(self, comportamentos):
+        self.comportamentos = list(comportamentos)
+        self.chamadas = 0
+        self.canceladas = 0
+
+    async def get_response(self, *args, **kwargs):
+        comportamento = self.comportamentos[min(self.chamadas, len(self.comportamentos) - 1)]
+        self.chamadas += 1
+        indice = self.chamadas
+        duracao, erro = comportamento if isinstance(comportamento, tuple) else (comportamento, None)
+        if isinstance(duracao, Exception):
+            duracao, erro = 0.0, duracao
+        try:
+            await asyncio.sleep(duracao)
+        except asyncio.CancelledError:
+            self.canceladas += 1
+            raise
+        if erro is not None:
+            raise erro
+        return ModelResponse(output=[], usage=Usage(requests=1, input_tokens=1, output_tokens=1, total_tokens=2),
+                             referenceable_id=f"resposta-{indice}")
+
+    def stream_response(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+class ProvedorFalso(ModelProvider):
+    def __init__(self, modelo: ModeloFalso):
+        self.modelo = modelo
+
+    def get_model(self, model_name):
+        return self.modelo
+
+
+@pytest.fixture
+def modelo(monkeypatch, configurar):
+    """Instala um modelo falso no provedor e registra latências de 10 ms para o p95."""
+    configurar(hedging_enabled=True, hedging_percentile=95, hedging_budget_percent=100.0,
+               hedging_min_samples=5, rate_limit_enabled=False, adaptive_concurrency_enabled=False)
+
+    def instalar(*comportamentos) -> ModeloFalso:
+        falso = ModeloFalso(comportamentos)
+        monkeypatch.setattr(provedor_modelos, "_provedor", ProvedorModelosControlado(ProvedorFalso(falso)))
+        for _ in range(5):
+            Metrics.observe(METRICA, 0.01)
+        return falso
+    return instalar
+
+
+async def responder(modelo_hedge: ModeloComHedge) -> ModelResponse:
+    return await modelo_hedge.get_response(None, "pergunta", ModelSettings(), [], None, [], None)
+
+
+def test_copia_vence_e_a_chamada_lenta_e_cancelada(modelo):
+    falso = modelo(1.0, 0.01)
+    resposta = asyncio.run(responder(ModeloComHedge(metrica=METRICA)))
+    assert resposta.referenceable_id == "resposta-2"
+    assert falso.chamadas == 2 and falso.canceladas == 1
+    assert Metrics.get_counter("hedging.issued") == 1
+    assert Metrics.get_counter("hedging.wins") == 1
+
+
+def test_chamada_rapida_nao_gera_copia(modelo):
+    falso = modelo(0.001)
+    asyncio.run(responder(ModeloComHedge(metrica=METRICA)))
+    assert falso.chamadas == 1
+    assert Metrics.get_counter("hedging.issued") == 0
+
+
+def test_falha_de_uma_chamada_e_coberta_pela_outra(modelo):
+    falso = modelo(0.05, RuntimeError("falha da cópia"))
+    resposta = asyncio.run(responder(ModeloComHedge(metrica=METRICA)))
+    assert resposta.referenceable_id == "resposta-1"
+    assert falso.chamadas == 2
+    assert Metrics.get_counter("hedging.wins") == 0
+
+
+def test_falha_das_duas_chamadas_e_propagada(modelo):
+    falso = modelo((0.05, RuntimeError("falha da original")), RuntimeError("falha da cópia"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(responder(ModeloComHedge(metrica=METRICA)))
+    assert falso.chamadas == 2
+    assert Metrics.get_counter("hedging.wins") == 0
+
+
+def test_cancelamento_do_chamador_cancela_as_duas_chamadas(modelo):
+    falso = modelo(1.0, 1.0)
+
+    async def cenario():
+        tarefa = asyncio.ensure_future(responder(ModeloComHedge(metrica=METRICA)))
+        await asyncio.sleep(0.1)
+        tarefa.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarefa
+
+    asyncio.run(cenario())
+    assert falso.chamadas == 2 and falso.canceladas == 2
+
+
+def test_sem_copia_enquanto_os_limitadores_tem_fila(modelo, monkeypatch):
+    falso = modelo(0.1)
+    monkeypatch.setattr(hedging, "_limitadores_em_fila", lambda: True)
+    asyncio.run(responder(ModeloComHedge(metrica=METRICA)))
+    assert falso.chamadas == 1
+    assert Metrics.get_counter("hedging.skipped_queueing") == 1
+
+
+def test_latencia_nao_inclui_a_espera_pelo_limitador(modelo, monkeypatch):
+    modelo(0.01)
+    # Duas requisições por segundo, sem rajada: a segunda chamada espera cerca de 0,5 s
+    limitador = LimitadorTaxa(rpm=120, tpm=10 ** 9, rajada_segundos=0)
+    monkeypatch.setattr(LimitadorTaxa, "get_default", staticmethod(lambda: limitador))
+
+    async def cenario():
+        modelo_hedge = ModeloComHedge(metrica=METRICA)
+        await responder(modelo_hedge)
+        await responder(modelo_hedge)
+
+    asyncio.run(cenario())
+    assert max(list(Metrics._samples[METRICA])[-2:]) < 0.2
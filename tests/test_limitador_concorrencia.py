@@ -0,0 +1,98 @@
+"""Testes do limitador adaptativo de concorrência (src/limitador_concorrencia.py)."""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from src.error_handler import DeadlineExceededError
+from src.limitador_concorrencia import LimitadorConcorrencia
+from src.prazo import com_prazo, limite_para
+
+
+def novo_limitador(inicial: float = 1) -> LimitadorConcorrencia:
+    return LimitadorConcorrencia(inicial=inicial, minimo=1, maximo=8, tolerancia=2.0, reducao=0.5)
+
+
+async def executar(limitador: LimitadorConcorrencia, nome: str, ordem: list, liberar: asyncio.Event):
+    async with limitador.limitar():
+        ordem.append(nome)
+        await liberar.wait()
+
+
+def test_vagas_passam_para_a_fila_na_ordem_de_chegada():
+    async def cenario():
+        limitador, ordem, liberar = novo_limitador(), [], asyncio.Event()
+        tarefas = []
+        for nome in "abc":
+            tarefas.append(asyncio.ensure_future(executar(limitador, nome, ordem, liberar)))
+            await asyncio.sleep(0)
+        assert ordem == ["a"] and limitador.na_fila() == 2
+        liberar.set()
+        await asyncio.gather(*tarefas)
+        return limitador, ordem
+
+    limitador, ordem = asyncio.run(cenario())
+    assert ordem == ["a", "b", "c"]
+    assert limitador.em_andamento == 0 and limitador.na_fila() == 0
+
+
+def test_vaga_recebida_por_execucao_cancelada_e_devolvida():
+    async def cenario():
+        limitador, ordem, liberar = novo_limitador(), [], asyncio.Event()
+        primeira = asyncio.ensure_future(executar(limitador, "a", ordem, liberar))
+        await asyncio.sleep(0)
+        segunda = asyncio.ensure_future(executar(limitador, "b", ordem, asyncio.Event()))
+        await asyncio.sleep(0)
+        terceira = asyncio.ensure_future(executar(limitador, "c", ordem, liberar))
+        await asyncio.sleep(0)
+
+        # A vaga da primeira é transferida para a segunda, que é cancelada antes de retomar
+        liberar.set()
+        await primeira
+        segunda.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await segunda
+        await terceira
+        return limitador, ordem
+
+    limitador, ordem = asyncio.run(cenario())
+    assert ordem == ["a", "c"]
+    assert limitador.em_andamento == 0
+
+
+def test_prazo_esgotado_na_fila_remove_a_espera():
+    async def cenario():
+        limitador, ordem, liberar = novo_limitador(), [], asyncio.Event()
+        ocupada = asyncio.ensure_future(executar(limitador, "a", ordem, liberar))
+        await asyncio.sleep(0)
+        with com_prazo(limite_para(0.02)):
+            with pytest.raises(DeadlineExceededError):
+                await executar(limitador, "b", ordem, liberar)
+        na_fila = limitador.na_fila()
+        liberar.set()
+        await ocupada
+        return limitador, ordem, na_fila
+
+    limitador, ordem, na_fila = asyncio.run(cenario())
+    assert ordem == ["a"]
+    assert na_fila == 0
+    assert limitador.em_andamento == 0
+
+
+def test_limite_reduzido_apos_429():
+    erro = openai.RateLimitError.__new__(openai.RateLimitError)
+    Exception.__init__(erro, "limite de requisições")
+    erro.status_code, erro.code, erro.response = 429, None, httpx.Response(429)
+
+    async def cenario():
+        limitador = novo_limitador(inicial=4)
+        with pytest.raises(openai.RateLimitError):
+            async with limitador.limitar():
+                raise erro
+        return limitador
+
+    limitador = asyncio.run(cenario())
+    assert limitador.limite == 2
+    assert limitador.em_andamento == 0
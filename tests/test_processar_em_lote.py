@@ -0,0 +1,70 @@
+"""Testes da retomada do processamento em lote (src/processar_em_lote.py)."""
+
+import asyncio
+import json
+
+from src import processar_em_lote
+from src.processar_em_lote import executar_lote, ids_concluidos
+
+
+def escrever(caminho, conteudo: str) -> None:
+    caminho.write_bytes(conteudo.encode("utf-8"))
+
+
+def test_arquivo_inexistente_nao_tem_concluidos(tmp_path):
+    assert ids_concluidos(str(tmp_path / "respostas.jsonl")) == set()
+
+
+def test_linha_final_incompleta_e_removida(tmp_path):
+    caminho = tmp_path / "respostas.jsonl"
+    escrever(caminho, '{"id": "1", "resposta": "a"}\n{"id": "2", "resposta": "b"}\n{"id": "3", "resp')
+    assert ids_concluidos(str(caminho)) == {"1", "2"}
+    assert caminho.read_text(encoding="utf-8") == '{"id": "1", "resposta": "a"}\n{"id": "2", "resposta": "b"}\n'
+
+
+def test_linhas_invalidas_e_registros_sem_id_sao_ignorados(tmp_path):
+    caminho = tmp_path / "respostas.jsonl"
+    conteudo = '{"id": "1", "resposta": "a"}\nlixo\n["lista"]\n{"resposta": "sem id"}\n{"id": 4, "resposta": "d"}\n'
+    escrever(caminho, conteudo)
+    assert ids_concluidos(str(caminho)) == {"1", "4"}
+    # Linhas inválidas no meio do arquivo não são removidas
+    assert caminho.read_text(encoding="utf-8") == conteudo
+
+
+def test_perguntas_com_erro_nao_sao_concluidas(tmp_path):
+    caminho = tmp_path / "respostas.jsonl"
+    escrever(caminho, '{"id": "1", "resposta": "a"}\n{"id": "2", "erro": "falha"}\n')
+    assert ids_concluidos(str(caminho)) == {"1"}
+
+
+def test_ultima_linha_completa_sem_quebra_recebe_a_quebra(tmp_path):
+    caminho = tmp_path / "respostas.jsonl"
+    escrever(caminho, '{"id": "1", "resposta": "a"}\n{"id": "2", "resposta": "b"}')
+    assert ids_concluidos(str(caminho)) == {"1", "2"}
+    assert caminho.read_text(encoding="utf-8").endswith('"b"}\n')
+
+
+def test_lote_retomado_processa_apenas_as_pendentes(tmp_path, monkeypatch):
+    processadas = []
+
+    async def processar_pergunta(pergunta):
+        processadas.append(pergunta)
+        return f"resposta de {pergunta}", "trace"
+
+    async def aguardar_auditorias():
+        return None
+
+    monkeypatch.setattr(processar_em_lote, "processar_pergunta", processar_pergunta)
+    monkeypatch.setattr(processar_em_lote, "aguardar_auditorias", aguardar_auditorias)
+
+    entrada, saida = tmp_path / "perguntas.jsonl", tmp_path / "respostas.jsonl"
+    escrever(entrada, "".join(json.dumps({"id": str(i), "pergunta": f"p{i}"}) + "\n" for i in range(1, 5)))
+    # Execução anterior interrompida: "2" falhou e "3" ficou pela metade
+    escrever(saida, '{"id": "1", "resposta": "a"}\n{"id": "2", "erro": "falha"}\n{"id": "3", "res')
+
+    asyncio.run(executar_lote(str(entrada), str(saida), concorrencia=2))
+
+    assert sorted(processadas) == ["p2", "p3", "p4"]
+    registros = [json.loads(linha) for linha in saida.read_text(encoding="utf-8").splitlines()]
+    assert len(registros) == 5
+    assert ids_concluidos(str(saida)) == {"1", "2", "3", "4"}
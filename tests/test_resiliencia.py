@@ -0,0 +1,204 @@
+"""Testes das novas tentativas e do circuit breaker (src/resiliencia.py)."""
+
+import httpx
+import openai
+import pytest
+
+from src import resiliencia
+from src.error_handler import AppError, CircuitOpenError, DeadlineExceededError
+from src.prazo import com_prazo, limite_para
+from src.resiliencia import (
+    ATRIBUTO_ESGOTADO,
+    CircuitBreaker,
+    erro_transitorio,
+    executar_com_retry,
+    tempo_de_espera,
+)
+
+
+class RelogioFalso:
+    """Substitui o módulo time em src/resiliencia.py: sleep apenas avança o relógio."""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def monotonic(self) -> float:
+        return self.agora
+
+    def sleep(self, segundos: float) -> None:
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+def erro_status(classe, status: int, cabecalhos=None, code=None):
+    """Cria um erro de status da OpenAI sem depender do cliente HTTP usado pela biblioteca."""
+    erro = classe.__new__(classe)
+    Exception.__init__(erro, f"erro {status}")
+    erro.status_code = status
+    erro.code = code
+    erro.response = httpx.Response(status, headers=cabecalhos or {})
+    return erro
+
+
+def erro_de_rede():
+    return httpx.ConnectTimeout("tempo esgotado ao conectar")
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(resiliencia, "time", relogio)
+    return relogio
+
+
+@pytest.fixture(autouse=True)
+def disjuntores(monkeypatch, configurar):
+    monkeypatch.setattr(CircuitBreaker, "_instancias", {})
+    configurar(retry_max_attempts=3, retry_base_delay=0.5, retry_max_delay=8.0,
+               circuit_breaker_failure_threshold=5, circuit_breaker_reset_timeout=30.0)
+
+
+class FuncaoInstavel:
+    """Falha com os erros informados, na ordem, e depois retorna "ok"."""
+
+    def __init__(self, *erros):
+        self.erros = list(erros)
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return "ok"
+
+
+def test_erro_encapsulado_e_classificado_pela_causa():
+    try:
+        try:
+            raise erro_de_rede()
+        except httpx.ConnectTimeout as e:
+            raise AppError("falha ao chamar a API") from e
+    except AppError as e:
+        assert erro_transitorio(e)
+
+
+@pytest.mark.parametrize("erro, esperado", [
+    (erro_status(openai.InternalServerError, 500), True),
+    (erro_status(openai.RateLimitError, 429), True),
+    (erro_status(openai.RateLimitError, 429, code="insufficient_quota"), False),
+    (erro_status(openai.BadRequestError, 400), False),
+    (DeadlineExceededError("prazo"), False),
+    (CircuitOpenError("aberto"), False),
+    (ValueError("bug"), False),
+])
+def test_classificacao_de_erros(erro, esperado):
+    assert erro_transitorio(erro) is esperado
+
+
+def test_backoff_exponencial_com_jitter_completo(monkeypatch):
+    limites = []
+    monkeypatch.setattr(resiliencia.random, "uniform", lambda a, b: limites.append((a, b)) or b)
+    esperas = [tempo_de_espera(tentativa, erro_de_rede()) for tentativa in range(1, 7)]
+    assert esperas == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+    assert all(inicio == 0 for inicio, _ in limites)
+
+
+def test_retry_after_respeitado_e_acima_do_limite_encerra(monkeypatch):
+    monkeypatch.setattr(resiliencia.random, "uniform", lambda a, b: 0.0)
+    assert tempo_de_espera(1, erro_status(openai.RateLimitError, 429, {"retry-after": "3"})) == 3.0
+    assert tempo_de_espera(1, erro_status(openai.RateLimitError, 429, {"retry-after-ms": "250"})) == 0.25
+    assert tempo_de_espera(1, erro_status(openai.RateLimitError, 429, {"retry-after": "30"})) is None
+
+
+def test_falhas_transitorias_sao_repetidas(relogio):
+    funcao = FuncaoInstavel(erro_de_rede(), erro_status(openai.InternalServerError, 503))
+    assert executar_com_retry("teste", funcao) == "ok"
+    assert funcao.chamadas == 3
+    assert len(relogio.esperas) == 2
+
+
+def test_erro_nao_transitorio_nao_e_repetido(relogio):
+    funcao = FuncaoInstavel(erro_status(openai.BadRequestError, 400))
+    with pytest.raises(openai.BadRequestError):
+        executar_com_retry("teste", funcao)
+    assert funcao.chamadas == 1
+    assert relogio.esperas == []
+
+
+def test_tentativas_esgotadas_marcam_o_erro(relogio):
+    funcao = FuncaoInstavel(*(erro_de_rede() for _ in range(5)))
+    with pytest.raises(httpx.ConnectTimeout) as excinfo:
+        executar_com_retry("teste", funcao)
+    assert funcao.chamadas == 3
+    assert getattr(excinfo.value, ATRIBUTO_ESGOTADO, False)
+
+
+def test_camada_externa_nao_multiplica_as_tentativas(relogio):
+    funcao = FuncaoInstavel(*(erro_de_rede() for _ in range(10)))
+
+    def camada_interna():
+        try:
+            return executar_com_retry("interno", funcao)
+        except httpx.ConnectTimeout as e:
+            raise AppError("falha na camada interna") from e
+
+    with pytest.raises(AppError):
+        executar_com_retry("externo", camada_interna)
+    assert funcao.chamadas == 3
+
+
+def test_nova_tentativa_apos_o_prazo_nao_e_feita(relogio, monkeypatch):
+    monkeypatch.setattr(resiliencia.random, "uniform", lambda a, b: b)
+    funcao = FuncaoInstavel(erro_de_rede(), erro_de_rede())
+    with com_prazo(limite_para(0.2)):
+        with pytest.raises(httpx.ConnectTimeout):
+            executar_com_retry("teste", funcao)
+    assert funcao.chamadas == 1
+
+
+def test_circuito_abre_testa_e_fecha(relogio):
+    disjuntor = CircuitBreaker("teste", limite_falhas=2, tempo_abertura=30.0)
+    disjuntor.registrar_falha()
+    disjuntor.permitir()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == CircuitBreaker.ABERTO
+    with pytest.raises(CircuitOpenError):
+        disjuntor.permitir()
+
+    # Depois do tempo de abertura, apenas uma chamada de teste é liberada
+    relogio.agora += 30.0
+    disjuntor.permitir()
+    assert disjuntor.estado == CircuitBreaker.SEMIABERTO
+    with pytest.raises(CircuitOpenError):
+        disjuntor.permitir()
+
+    # Falha no teste reabre o circuito; sucesso no teste seguinte o fecha
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == CircuitBreaker.ABERTO
+    relogio.agora += 30.0
+    disjuntor.permitir()
+    disjuntor.registrar_sucesso()
+    assert disjuntor.estado == CircuitBreaker.FECHADO
+    disjuntor.permitir()
+
+
+def test_teste_sem_resultado_nao_bloqueia_o_circuito(relogio):
+    disjuntor = CircuitBreaker("teste", limite_falhas=1, tempo_abertura=30.0)
+    disjuntor.registrar_falha()
+    relogio.agora += 30.0
+    disjuntor.permitir()  # chamada de teste cancelada, sem registrar resultado
+    relogio.agora += 30.0
+    disjuntor.permitir()
+    assert disjuntor.estado == CircuitBreaker.SEMIABERTO
+
+
+def test_circuito_aberto_rejeita_sem_chamar(relogio, configurar):
+    configurar(circuit_breaker_failure_threshold=2, retry_max_attempts=1)
+    funcao = FuncaoInstavel(*(erro_de_rede() for _ in range(5)))
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectTimeout):
+            executar_com_retry("teste", funcao)
+    with pytest.raises(CircuitOpenError):
+        executar_com_retry("teste", funcao)
+    assert funcao.chamadas == 2
@@ -0,0 +1,104 @@
+"""Testes do agrupamento de requisições idênticas (src/single_flight.py)."""
+
+import asyncio
+
+import pytest
+
+from src.error_handler import DeadlineExceededError
+from src.prazo import com_prazo, limite_para, tempo_restante
+from src.single_flight import SingleFlight
+
+
+class Trabalho:
+    """Trabalho falso que registra as execuções, o prazo herdado e o cancelamento."""
+
+    def __init__(self, duracao: float):
+        self.duracao = duracao
+        self.execucoes = 0
+        self.prazos = []
+        self.cancelado = False
+
+    async def __call__(self):
+        self.execucoes += 1
+        self.prazos.append(tempo_restante())
+        try:
+            await asyncio.sleep(self.duracao)
+        except asyncio.CancelledError:
+            self.cancelado = True
+            raise
+        return "resposta"
+
+
+async def chamar(grupo: SingleFlight, trabalho: Trabalho, prazo: float = None, atraso: float = 0.0):
+    await asyncio.sleep(atraso)
+    with com_prazo(limite_para(prazo) if prazo is not None else None):
+        return await grupo.executar("chave", trabalho)
+
+
+def test_chamadas_simultaneas_executam_uma_vez():
+    async def cenario():
+        grupo, trabalho = SingleFlight("teste"), Trabalho(0.05)
+        resultados = await asyncio.gather(*(chamar(grupo, trabalho, atraso=0.001 * i) for i in range(5)))
+        return grupo, trabalho, resultados
+
+    grupo, trabalho, resultados = asyncio.run(cenario())
+    assert trabalho.execucoes == 1
+    assert [lider for _, lider in resultados] == [True, False, False, False, False]
+    assert all(resultado == "resposta" for resultado, _ in resultados)
+    assert grupo.em_andamento() == 0
+
+
+def test_prazo_da_lider_nao_encerra_a_execucao_compartilhada():
+    async def cenario():
+        grupo, trabalho = SingleFlight("teste"), Trabalho(0.2)
+        resultados = await asyncio.gather(
+            chamar(grupo, trabalho, prazo=0.05),
+            chamar(grupo, trabalho, prazo=2.0, atraso=0.01),
+            return_exceptions=True,
+        )
+        return trabalho, resultados
+
+    trabalho, (lider, seguidora) = asyncio.run(cenario())
+    assert isinstance(lider, DeadlineExceededError)
+    assert seguidora == ("resposta", False)
+    assert trabalho.prazos == [None]
+    assert not trabalho.cancelado
+
+
+def test_execucao_e_cancelada_quando_ninguem_mais_aguarda():
+    async def cenario():
+        grupo, trabalho = SingleFlight("teste"), Trabalho(0.5)
+        resultados = await asyncio.gather(
+            chamar(grupo, trabalho, prazo=0.05),
+            chamar(grupo, trabalho, prazo=0.1, atraso=0.01),
+            return_exceptions=True,
+        )
+        await asyncio.sleep(0)
+        em_andamento = grupo.em_andamento()
+
+        # Uma nova chamada com a mesma chave inicia outra execução
+        nova = await chamar(grupo, Trabalho(0.01))
+        return trabalho, resultados, em_andamento, nova
+
+    trabalho, resultados, em_andamento, nova = asyncio.run(cenario())
+    assert all(isinstance(r, DeadlineExceededError) for r in resultados)
+    assert trabalho.cancelado
+    assert em_andamento == 0
+    assert nova == ("resposta", True)
+
+
+def test_cancelar_a_lider_nao_afeta_as_demais():
+    async def cenario():
+        grupo, trabalho = SingleFlight("teste"), Trabalho(0.1)
+        lider = asyncio.ensure_future(chamar(grupo, trabalho))
+        seguidora = asyncio.ensure_future(chamar(grupo, trabalho, atraso=0.01))
+        await asyncio.sleep(0.02)
+        lider.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        return trabalho, await seguidora
+
+    trabalho, resultado = asyncio.run(cenario())
+    assert resultado == ("resposta", False)
+    assert not trabalho.cancelado
+    assert trabalho.execucoes == 1